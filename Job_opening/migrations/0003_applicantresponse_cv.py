@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:07
+
+import Job_opening.models
+import call.blobstore
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Job_opening', '0002_alter_jobopening_posteddate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicantresponse',
+            name='cv',
+            field=models.FileField(blank=True, null=True, storage=call.blobstore.blob_storage, upload_to=Job_opening.models.cv_upload_path),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:54
+
+import Job_opening.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Job_opening', '0003_applicantresponse_cv'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='applicantresponse',
+            name='cv',
+            field=models.FileField(blank=True, null=True, storage=Job_opening.models.cv_storage, upload_to=Job_opening.models.cv_upload_path),
+        ),
+    ]
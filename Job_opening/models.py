@@ -3,15 +3,19 @@ import uuid
 from client_auth.models import Company
 import os
 from django.conf import settings
+from django.core.files.storage import storages
 
 
-# def cv_upload_path(instance, filename):
-#     """Generate a structured path for CV uploads."""
-#     job_dir = f"Job_{instance.job_opening_id}"
-#     # Use a unique filename based on UUID or a timestamp if ID isn’t available yet
-#     applicant_id = instance.applicant_id or uuid.uuid4()  # Fallback to UUID if applicant_id isn’t set
-#     filename = f"cv_{applicant_id}.pdf"
-#     return os.path.join('cvs', job_dir, filename)
+def cv_storage():
+    """Storage of uploaded CVs, settings.STORAGES["blobs"] (the deduplicating blob store)."""
+    return storages["blobs"]
+
+
+def cv_upload_path(instance, filename):
+    """Generate a structured path for CV uploads."""
+    job_dir = f"Job_{instance.jobId_id}"
+    extension = os.path.splitext(filename)[1].lower() or ".pdf"
+    return os.path.join('cvs', job_dir, f"cv_{instance.applicantId}{extension}")
 
 
 class JobOpening(models.Model):
@@ -55,6 +59,7 @@ class ApplicantResponse(models.Model):
     appliedDate = models.DateField()
     cvKeywords = models.JSONField(null=True, blank=True)  # Parsed from resumeParseData
     resumeParseData = models.JSONField(null=True, blank=True)  # Raw data from frontend
+    cv = models.FileField(upload_to=cv_upload_path, storage=cv_storage, null=True, blank=True)  # Deduplicated in the blob store
     email = models.EmailField(max_length=255)
 
     def __str__(self):
@@ -70,9 +70,10 @@ class ApplicantResponseSerializer(serializers.ModelSerializer):
         model = ApplicantResponse
         fields = [
             "id", "jobId", "name", "role", "score", "appliedFor",
-            "appliedDate", "resumeParseData", "cvKeywords", "email"
+            "appliedDate", "cv", "resumeParseData", "cvKeywords", "email"
         ]
         read_only_fields = ["id", "cvKeywords"]  # cvKeywords is computed, not sent by frontend
+        extra_kwargs = {"cv": {"write_only": True}}
 
     def validate_jobId(self, value):
         if not JobOpening.objects.filter(id=value.id).exists():
@@ -1,6 +1,12 @@
 from django.contrib import admin
-from .models import Interview,EvaluationResult
+from .models import Interview,InterviewChunk,EvaluationResult,ProcessingJob,InferenceCacheEntry,QuestionScore,ResumableUpload,MediaBlob
 
 # Register your models here.
 admin.site.register(Interview)
-admin.site.register(EvaluationResult)
\ No newline at end of file
+admin.site.register(InterviewChunk)
+admin.site.register(EvaluationResult)
+admin.site.register(ProcessingJob)
+admin.site.register(InferenceCacheEntry)
+admin.site.register(QuestionScore)
+admin.site.register(ResumableUpload)
+admin.site.register(MediaBlob)
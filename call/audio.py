@@ -0,0 +1,239 @@
+# call/audio.py
+"""
+In-memory audio extraction for speech-to-text.
+
+ffmpeg decodes the video and writes a small, STT-friendly stream (16 kHz mono)
+to its stdout pipe; the bytes are handed straight to the transcription backend
+without an intermediate file. The sync (services, Celery) and async (websocket
+consumer) paths share the same command line.
+
+The output format is chosen by settings.INTERVIEW_STT_AUDIO_FORMAT:
+    'opus'  Ogg/Opus at 24 kbps, smallest upload (default)
+    'flac'  Lossless FLAC
+    'wav'   Raw 16-bit PCM in a WAV container
+
+With settings.INTERVIEW_VAD enabled, audio is first decoded to PCM so pauses
+can be trimmed and long recordings split into segments (see call/vad.py),
+then each segment is encoded to that format.
+"""
+import asyncio
+import functools
+import logging
+import subprocess
+import numpy as np
+from django.conf import settings
+from .vad import split_on_silence
+
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000  # Whisper resamples to 16 kHz internally
+
+AUDIO_FORMATS = {
+    "opus": {"filename": "audio.ogg", "args": ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"]},
+    "flac": {"filename": "audio.flac", "args": ["-c:a", "flac", "-f", "flac"]},
+    "wav": {"filename": "audio.wav", "args": ["-c:a", "pcm_s16le", "-f", "wav"]},
+}
+
+
+class AudioExtractionError(Exception):
+    """Raised when ffmpeg fails to extract audio from a recording."""
+
+
+def _audio_format(audio_format=None):
+    audio_format = audio_format or settings.INTERVIEW_STT_AUDIO_FORMAT
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format '{audio_format}', expected one of {sorted(AUDIO_FORMATS)}")
+    return audio_format
+
+
+def ffmpeg_audio_command(media_path, audio_format=None, start=None, end=None):
+    """
+    Builds the ffmpeg command writing mono 16 kHz audio of `media_path` to stdout.
+
+    Args:
+        media_path: Path to the audio or video file
+        audio_format: Key of AUDIO_FORMATS, defaults to settings.INTERVIEW_STT_AUDIO_FORMAT
+        start: Optional start of the range to extract, in seconds
+        end: Optional end of the range to extract, in seconds
+
+    Returns:
+        Argument list for subprocess
+    """
+    command = ["ffmpeg", "-nostdin", "-v", "error", "-i", media_path]
+    # Seek on the output side: only audio is decoded, and input seeking drops
+    # audio in recordings whose audio track starts after the video
+    if start is not None:
+        command += ["-ss", f"{start:.3f}"]
+    if end is not None:
+        command += ["-to", f"{end:.3f}"]
+    command += [
+        "-vn",  # No video
+        "-ac", "1",  # Mono channel
+        "-ar", str(SAMPLE_RATE),
+        *AUDIO_FORMATS[_audio_format(audio_format)]["args"],
+        "pipe:1"
+    ]
+    return command
+
+
+def ffmpeg_pcm_command(media_path, start=None, end=None):
+    """Builds the ffmpeg command decoding `media_path` to raw 16 kHz mono s16le PCM on stdout."""
+    command = ["ffmpeg", "-nostdin", "-v", "error", "-i", media_path]
+    if start is not None:
+        command += ["-ss", f"{start:.3f}"]
+    if end is not None:
+        command += ["-to", f"{end:.3f}"]
+    return command + ["-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"]
+
+
+def ffmpeg_encode_command(audio_format=None):
+    """Builds the ffmpeg command encoding raw 16 kHz mono s16le PCM from stdin to stdout."""
+    return [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-i", "pipe:0",
+        *AUDIO_FORMATS[_audio_format(audio_format)]["args"],
+        "pipe:1"
+    ]
+
+
+def _run_ffmpeg(command, input=None):
+    logger.debug(f"Running FFmpeg command: {' '.join(command)}")
+    result = subprocess.run(
+        command,
+        input=input,
+        stdin=None if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        raise AudioExtractionError(result.stderr.decode(errors="replace").strip())
+    return result.stdout
+
+
+async def _arun_ffmpeg(command, input=None):
+    logger.debug(f"Running FFmpeg command: {' '.join(command)}")
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate(input)
+    if process.returncode != 0:
+        raise AudioExtractionError(stderr.decode(errors="replace").strip())
+    return stdout
+
+
+def extract_audio(media_path, audio_format=None, start=None, end=None):
+    """
+    Extracts the audio of a recording into memory.
+
+    Args:
+        media_path: Path to the audio or video file
+        audio_format: Key of AUDIO_FORMATS, defaults to settings.INTERVIEW_STT_AUDIO_FORMAT
+        start: Optional start of the range to extract, in seconds
+        end: Optional end of the range to extract, in seconds
+
+    Returns:
+        Encoded audio bytes
+    """
+    return _run_ffmpeg(ffmpeg_audio_command(media_path, audio_format, start, end))
+
+
+async def aextract_audio(media_path, audio_format=None, start=None, end=None):
+    """Async variant of extract_audio that does not block the event loop."""
+    return await _arun_ffmpeg(ffmpeg_audio_command(media_path, audio_format, start, end))
+
+
+def decode_pcm(media_path, start=None, end=None):
+    """
+    Decodes the audio of a recording to 16 kHz mono samples.
+
+    Returns:
+        1-D int16 NumPy array
+    """
+    return np.frombuffer(_run_ffmpeg(ffmpeg_pcm_command(media_path, start, end)), dtype=np.int16)
+
+
+async def adecode_pcm(media_path, start=None, end=None):
+    """Async variant of decode_pcm."""
+    return np.frombuffer(await _arun_ffmpeg(ffmpeg_pcm_command(media_path, start, end)), dtype=np.int16)
+
+
+def encode_pcm(samples, audio_format=None):
+    """Encodes 16 kHz mono int16 samples into the STT upload format."""
+    return _run_ffmpeg(ffmpeg_encode_command(audio_format), input=samples.astype(np.int16).tobytes())
+
+
+async def aencode_pcm(samples, audio_format=None):
+    """Async variant of encode_pcm."""
+    return await _arun_ffmpeg(ffmpeg_encode_command(audio_format), input=samples.astype(np.int16).tobytes())
+
+
+def _offset_segments(segments, start):
+    offset = start or 0.0
+    return [(offset + segment_start, offset + segment_end, samples) for segment_start, segment_end, samples in segments]
+
+
+def prepare_speech(media_path, start=None, end=None):
+    """
+    Extracts the audio of a recording for speech-to-text. With INTERVIEW_VAD
+    enabled, long pauses are shortened, silent recordings are skipped and long
+    recordings are split at pauses into segments of at most
+    INTERVIEW_SEGMENTATION['MAX_SEGMENT_SECONDS'].
+
+    Args:
+        media_path: Path to the audio or video file
+        start: Optional start of the range to extract, in seconds
+        end: Optional end of the range to extract, in seconds
+
+    Returns:
+        Tuple of (list of (start seconds, end seconds or None, upload) segments in
+        order, empty when there is no speech; VAD stats dict, empty when VAD is disabled)
+    """
+    vad = settings.INTERVIEW_VAD
+    if not vad["ENABLED"]:
+        return [(start or 0.0, end, audio_upload(extract_audio(media_path, start=start, end=end)))], {}
+
+    segments, stats = split_on_silence(
+        decode_pcm(media_path, start, end),
+        SAMPLE_RATE,
+        settings.INTERVIEW_SEGMENTATION["MAX_SEGMENT_SECONDS"],
+        **vad["OPTIONS"]
+    )
+    return [
+        (segment_start, segment_end, audio_upload(encode_pcm(samples)))
+        for segment_start, segment_end, samples in _offset_segments(segments, start)
+    ], stats
+
+
+async def aprepare_speech(media_path, start=None, end=None):
+    """Async variant of prepare_speech; the VAD runs in the default executor."""
+    vad = settings.INTERVIEW_VAD
+    if not vad["ENABLED"]:
+        return [(start or 0.0, end, audio_upload(await aextract_audio(media_path, start=start, end=end)))], {}
+
+    samples = await adecode_pcm(media_path, start, end)
+    loop = asyncio.get_running_loop()
+    segments, stats = await loop.run_in_executor(None, functools.partial(
+        split_on_silence,
+        samples,
+        SAMPLE_RATE,
+        settings.INTERVIEW_SEGMENTATION["MAX_SEGMENT_SECONDS"],
+        **vad["OPTIONS"]
+    ))
+    segments = _offset_segments(segments, start)
+    uploads = await asyncio.gather(*(aencode_pcm(samples) for _, _, samples in segments))
+    return [
+        (segment_start, segment_end, audio_upload(data))
+        for (segment_start, segment_end, _), data in zip(segments, uploads)
+    ], stats
+
+
+def audio_upload(data, audio_format=None):
+    """
+    Wraps extracted audio as a (filename, bytes) upload; the extension tells the
+    STT service how to decode it.
+    """
+    return (AUDIO_FORMATS[_audio_format(audio_format)]["filename"], data)
@@ -0,0 +1,274 @@
+# call/audio_stream.py
+"""
+Real-time audio input for the interview websocket.
+
+Clients send binary frames made of a 12-byte little-endian header followed by
+the payload:
+
+    magic        4s  b"IAUD"
+    codec        B   1 = 16-bit PCM mono, 2 = Opus in Ogg/WebM (e.g. MediaRecorder output)
+    flags        B   bit 0: end of utterance (flush now), bit 1: end of stream
+    sample_rate  H   Sample rate of PCM payloads; ignored for Opus
+    sequence     I   Frame counter, used to detect lost frames
+
+Samples are decoded to 16 kHz and accumulate in a preallocated ring buffer.
+An utterance is cut when END_SILENCE_MS of silence follows speech, when the
+client flags its end, or when it reaches MAX_UTTERANCE_SECONDS, and is then
+handed to speech-to-text on its own. Speech is detected per 30 ms frame with
+an energy threshold that follows the noise floor (see call/vad.py for the
+offline variant).
+"""
+import asyncio
+import logging
+import struct
+import numpy as np
+from .audio import SAMPLE_RATE
+from .vad import DEFAULT_OPTIONS
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"IAUD"
+HEADER = struct.Struct("<4sBBHI")
+CODEC_PCM16 = 1
+CODEC_OPUS = 2
+FLAG_END_OF_UTTERANCE = 1
+FLAG_END_OF_STREAM = 2
+
+NOISE_FLOOR_RISE_DB = 0.1  # Per frame (about 3 dB/s); the floor drops at once to quieter frames
+
+
+class AudioFrameError(ValueError):
+    """Raised for binary audio frames with a malformed header or payload."""
+
+
+def is_audio_frame(data):
+    """Whether a binary websocket message is an audio frame (as opposed to a video chunk)."""
+    return data[:len(MAGIC)] == MAGIC
+
+
+def pack_audio_frame(payload, codec=CODEC_PCM16, flags=0, sample_rate=SAMPLE_RATE, sequence=0):
+    """Builds an audio frame; the client-side counterpart of parse_audio_frame."""
+    return HEADER.pack(MAGIC, codec, flags, sample_rate, sequence) + payload
+
+
+def parse_audio_frame(data):
+    """
+    Splits an audio frame into its header fields and payload.
+
+    Returns:
+        Tuple of (codec, flags, sample_rate, sequence, payload bytes)
+    """
+    if len(data) < HEADER.size:
+        raise AudioFrameError(f"Audio frame shorter than its {HEADER.size}-byte header")
+    magic, codec, flags, sample_rate, sequence = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise AudioFrameError("Not an audio frame")
+    payload = data[HEADER.size:]
+    if codec == CODEC_PCM16:
+        if not sample_rate:
+            raise AudioFrameError("PCM frames need a sample rate")
+        if len(payload) % 2:
+            raise AudioFrameError("PCM payload is not a whole number of 16-bit samples")
+    elif codec != CODEC_OPUS:
+        raise AudioFrameError(f"Unknown audio codec {codec}")
+    return codec, flags, sample_rate, sequence, payload
+
+
+def resample(samples, source_rate, target_rate=SAMPLE_RATE):
+    """Linear-interpolation resampling of int16 samples; plenty for speech-to-text input."""
+    if source_rate == target_rate or not len(samples):
+        return samples
+    count = int(round(len(samples) * target_rate / source_rate))
+    positions = np.arange(count) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity int16 ring buffer. Positions are absolute sample counts
+    since the start of the stream; `start` is the oldest sample still held.
+    """
+
+    def __init__(self, capacity):
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def free(self):
+        return self.capacity - len(self)
+
+    def _slices(self, start, end):
+        # The buffer positions holding absolute samples [start, end), as at most two slices
+        first = start % self.capacity
+        count = end - start
+        if first + count <= self.capacity:
+            return [slice(first, first + count)]
+        return [slice(first, self.capacity), slice(0, first + count - self.capacity)]
+
+    def write(self, samples):
+        if len(samples) > self.free:
+            raise OverflowError(f"{len(samples)} samples do not fit, {self.free} free")
+        offset = 0
+        for part in self._slices(self.end, self.end + len(samples)):
+            size = part.stop - part.start
+            self.buffer[part] = samples[offset:offset + size]
+            offset += size
+        self.end += len(samples)
+
+    def get(self, start, end):
+        """Copies out the samples between absolute positions `start` and `end`."""
+        start, end = max(start, self.start), min(end, self.end)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+        return np.concatenate([self.buffer[part] for part in self._slices(start, end)])
+
+    def discard_until(self, position):
+        self.start = min(max(self.start, position), self.end)
+
+
+class LiveAudioStream:
+    """
+    Cuts a continuous 16 kHz sample stream into utterances.
+
+    feed() and flush() return the finished utterances as
+    (start seconds, end seconds, int16 samples) tuples.
+    """
+
+    def __init__(self, max_utterance_seconds=15.0, end_silence_ms=600, min_utterance_ms=300, **options):
+        options = {**DEFAULT_OPTIONS, **options}
+        self.frame_length = int(SAMPLE_RATE * options["FRAME_MS"] / 1000)
+        self.padding = int(SAMPLE_RATE * options["PADDING_MS"] / 1000)
+        self.end_silence = int(SAMPLE_RATE * end_silence_ms / 1000)
+        self.min_speech = int(SAMPLE_RATE * min_utterance_ms / 1000)
+        self.margin_db = options["ENERGY_MARGIN_DB"]
+        self.min_energy_db = options["MIN_ENERGY_DBFS"]
+        self.ring = AudioRingBuffer(int(SAMPLE_RATE * max_utterance_seconds) + self.padding)
+        self.analyzed = 0  # Absolute position up to which frames were classified
+        # Start from the quietest level counted as speech, so speech at the very start is kept
+        self.noise_floor = self.min_energy_db - self.margin_db  # dBFS
+        self.speech_start = None  # Absolute position of the first speech frame of the current utterance
+        self.speech_end = 0  # End of the last speech frame
+        self.speech_samples = 0  # Speech in the current utterance
+
+    def feed(self, samples):
+        utterances = []
+        samples = np.asarray(samples, dtype=np.int16)
+        while len(samples):
+            if not self.ring.free:
+                # Utterance reached MAX_UTTERANCE_SECONDS without a pause
+                utterances += self._cut(self.ring.end)
+            take = min(len(samples), self.ring.free)
+            self.ring.write(samples[:take])
+            samples = samples[take:]
+            utterances += self._analyze()
+        return utterances
+
+    def flush(self):
+        """Ends the current utterance, e.g. when the client signals it."""
+        return self._cut(self.ring.end)
+
+    def _analyze(self):
+        utterances = []
+        count = (self.ring.end - self.analyzed) // self.frame_length
+        if not count:
+            return utterances
+        frames = self.ring.get(self.analyzed, self.analyzed + count * self.frame_length)
+        frames = frames.astype(np.float32).reshape(count, self.frame_length) / 32768.0
+        energy_db = 20 * np.log10(np.maximum(np.sqrt(np.mean(frames ** 2, axis=1)), 1e-10))
+
+        for energy in energy_db:
+            frame_start = self.analyzed
+            self.analyzed += self.frame_length
+            threshold = max(self.noise_floor + self.margin_db, self.min_energy_db)
+            self.noise_floor = min(float(energy), self.noise_floor + NOISE_FLOOR_RISE_DB)
+            if energy >= threshold:
+                if self.speech_start is None:
+                    self.speech_start = frame_start
+                self.speech_end = self.analyzed
+                self.speech_samples += self.frame_length
+            elif self.speech_start is not None and self.analyzed - self.speech_end >= self.end_silence:
+                utterances += self._cut(min(self.speech_end + self.padding, self.ring.end))
+            elif self.speech_start is None:
+                # Nothing to transcribe yet; keep only the padding before the next word
+                self.ring.discard_until(self.analyzed - self.padding)
+        return utterances
+
+    def _cut(self, end):
+        utterances = []
+        if self.speech_start is not None and self.speech_samples >= self.min_speech:
+            start = max(self.speech_start - self.padding, self.ring.start)
+            utterances.append((start / SAMPLE_RATE, end / SAMPLE_RATE, self.ring.get(start, end)))
+        self.ring.discard_until(end)
+        self.analyzed = max(self.analyzed, self.ring.start)
+        self.speech_start = None
+        self.speech_samples = 0
+        return utterances
+
+
+class StreamDecoder:
+    """
+    Decodes a streamed Opus (Ogg/WebM) recording to 16 kHz PCM with one long-
+    running ffmpeg process per connection. Decoded samples are passed to the
+    async `on_samples` callback as they come out.
+    """
+
+    def __init__(self, on_samples):
+        self.on_samples = on_samples
+        self.process = None
+        self.reader = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-v", "error",
+            "-probesize", "4096", "-analyzeduration", "0", "-fflags", "nobuffer",  # Start decoding after the first frames
+            "-i", "pipe:0",
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        remainder = b""
+        while True:
+            data = await self.process.stdout.read(16384)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % 2
+            remainder = data[usable:]
+            if usable:
+                await self.on_samples(np.frombuffer(data[:usable], dtype=np.int16))
+
+    async def write(self, payload):
+        if self.process is None:
+            await self.start()
+        self.process.stdin.write(payload)
+        await self.process.stdin.drain()
+
+    async def close(self):
+        """Decodes what is left and stops ffmpeg."""
+        if self.process is None:
+            return
+        if not self.process.stdin.is_closing():
+            self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.reader, timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning("Audio decoder did not finish in time")
+            self.process.kill()
+        await self.process.wait()
+        self.process = None
+
+    def kill(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+        if self.reader is not None:
+            self.reader.cancel()
@@ -0,0 +1,164 @@
+# call/backends.py
+"""
+Inference backends for speech-to-text and chat completions.
+
+The active backend is selected by settings.INFERENCE_BACKEND:
+
+    INFERENCE_BACKEND = {
+        'BACKEND': 'call.backends.OpenAIBackend',  # or 'call.backends.StubBackend'
+        'OPTIONS': {...},                          # passed to the backend constructor
+    }
+
+Besides complete(), backends implement stream_complete(), which passes the
+answer to an `on_delta` callback piece by piece as it is generated and then
+returns the whole text.
+
+StubBackend answers offline with canned, deterministic results after a
+simulated latency, so the rest of the pipeline (ffmpeg, database, queues)
+can be load tested without network access.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from .inference import get_async_client
+
+
+class InferenceBackendError(Exception):
+    """Raised by backends for failed inference calls (including simulated ones)."""
+
+
+def _audio_bytes(audio):
+    # Accepts raw bytes, an open file, or an OpenAI style (filename, content) tuple
+    if isinstance(audio, tuple):
+        audio = audio[1]
+    if isinstance(audio, (bytes, bytearray)):
+        return bytes(audio)
+    position = audio.tell()
+    data = audio.read()
+    audio.seek(position)
+    return data
+
+
+class OpenAIBackend:
+    """Calls the OpenAI API through the shared, pooled async client."""
+
+    def __init__(self, **options):
+        self.options = options
+
+    async def transcribe(self, audio, model):
+        return await get_async_client().audio.transcriptions.create(
+            file=audio,
+            model=model,
+            response_format="text"
+        )
+
+    async def complete(self, model, messages, purpose="chat", metadata=None, **kwargs):
+        response = await get_async_client().chat.completions.create(model=model, messages=messages, **kwargs)
+        return response.choices[0].message.content
+
+    async def stream_complete(self, model, messages, on_delta, purpose="chat", metadata=None, **kwargs):
+        stream = await get_async_client().chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+        parts = []
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+        return "".join(parts)
+
+
+class StubBackend:
+    """
+    Deterministic offline backend for load and throughput testing.
+
+    Options:
+        SEED: Base seed; together with the request content it fixes every result
+        ERROR_RATE: Probability (0-1) that a call raises InferenceBackendError
+        TRANSCRIBE_LATENCY / COMPLETE_LATENCY: Latency distributions, e.g.
+            {'DISTRIBUTION': 'constant', 'VALUE': 0.5}
+            {'DISTRIBUTION': 'uniform', 'MIN': 0.2, 'MAX': 1.0}
+            {'DISTRIBUTION': 'normal', 'MEAN': 0.8, 'STDDEV': 0.2}
+            {'DISTRIBUTION': 'lognormal', 'MEDIAN': 0.8, 'SIGMA': 0.5}
+        TRANSCRIPTS: Canned transcripts to choose from
+        SCORES: Canned scores to choose from
+    """
+
+    DEFAULT_TRANSCRIPTS = [
+        "I would start by profiling the slowest endpoints and adding caching where reads dominate.",
+        "In my last project we used token based authentication with short lived access tokens.",
+        "I reproduced the bug with a failing test first, then bisected the recent changes.",
+        "We versioned the API in the URL and kept the old version running during the migration.",
+    ]
+    DEFAULT_SCORES = ["4.5", "5.0", "6.5", "7.0", "7.5", "8.0", "8.5"]
+
+    def __init__(self, SEED=0, ERROR_RATE=0.0, TRANSCRIBE_LATENCY=None, COMPLETE_LATENCY=None,
+                 TRANSCRIPTS=None, SCORES=None, **options):
+        self.seed = SEED
+        self.error_rate = ERROR_RATE
+        self.transcribe_latency = TRANSCRIBE_LATENCY or {"DISTRIBUTION": "constant", "VALUE": 0}
+        self.complete_latency = COMPLETE_LATENCY or {"DISTRIBUTION": "constant", "VALUE": 0}
+        self.transcripts = TRANSCRIPTS or self.DEFAULT_TRANSCRIPTS
+        self.scores = SCORES or self.DEFAULT_SCORES
+
+    def _rng(self, *parts):
+        digest = hashlib.sha256(str(self.seed).encode())
+        for part in parts:
+            digest.update(part if isinstance(part, bytes) else str(part).encode())
+        return random.Random(digest.digest())
+
+    @staticmethod
+    def _latency(rng, spec):
+        distribution = spec.get("DISTRIBUTION", "constant")
+        if distribution == "uniform":
+            return rng.uniform(spec.get("MIN", 0), spec.get("MAX", 0))
+        if distribution == "normal":
+            return max(0.0, rng.gauss(spec.get("MEAN", 0), spec.get("STDDEV", 0)))
+        if distribution == "lognormal":
+            return rng.lognormvariate(math.log(spec.get("MEDIAN", 1)), spec.get("SIGMA", 0))
+        return spec.get("VALUE", 0)
+
+    async def _simulate(self, rng, latency_spec, operation):
+        await asyncio.sleep(self._latency(rng, latency_spec))
+        if rng.random() < self.error_rate:
+            raise InferenceBackendError(f"Simulated {operation} failure")
+
+    async def transcribe(self, audio, model):
+        rng = self._rng("transcribe", model, _audio_bytes(audio))
+        await self._simulate(rng, self.transcribe_latency, "transcription")
+        return rng.choice(self.transcripts)
+
+    async def complete(self, model, messages, purpose="chat", metadata=None, **kwargs):
+        rng = self._rng("complete", model, purpose, json.dumps(messages, sort_keys=True))
+        await self._simulate(rng, self.complete_latency, "completion")
+        return self._completion(rng, purpose, metadata or {})
+
+    async def stream_complete(self, model, messages, on_delta, purpose="chat", metadata=None, **kwargs):
+        # Same answer as complete(), with the latency spread over word-sized pieces
+        rng = self._rng("complete", model, purpose, json.dumps(messages, sort_keys=True))
+        latency = self._latency(rng, self.complete_latency)
+        if rng.random() < self.error_rate:
+            await asyncio.sleep(latency)
+            raise InferenceBackendError("Simulated completion failure")
+        content = self._completion(rng, purpose, metadata or {})
+        pieces = re.findall(r"\s*\S+", content) or [content]
+        for piece in pieces:
+            await asyncio.sleep(latency / len(pieces))
+            on_delta(piece)
+        return content
+
+    def _completion(self, rng, purpose, metadata):
+        if purpose == "score":
+            return rng.choice(self.scores)
+        if purpose == "score_batch":
+            return json.dumps({str(i): float(rng.choice(self.scores)) for i in range(1, metadata.get("count", 1) + 1)})
+        if purpose == "qa_pairs":
+            return json.dumps([{"interviewer": "Can you describe your approach?", "candidate": rng.choice(self.transcripts)}])
+        if purpose == "report_patterns":
+            return json.dumps({
+                "strengths": ["Clear communication", "Structured problem solving", "Relevant experience"],
+                "improvement_areas": ["Depth on scalability", "Concrete metrics"],
+            })
+        return "OK"
@@ -0,0 +1,171 @@
+# call/benchmark.py
+"""
+Measurement helpers for the benchmark_pipeline management command.
+
+Recordings are synthesized with ffmpeg's lavfi sources: a test pattern video
+and a tone that is on for two seconds and off for one, so voice activity
+detection and segmentation have pauses to work with. Every fixture gets its
+own tone frequency, which keeps the content-addressed caches and the blob
+store from short-circuiting repeated runs.
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+import numpy as np
+
+
+PERCENTILES = (50, 95, 99)
+MIN_REGRESSION_SECONDS = 0.005  # Slowdowns below this are timer noise, whatever the ratio
+
+
+def ffmpeg_fixture_command(output_path, duration, seed=0):
+    """Builds the ffmpeg command synthesizing an MP4 interview recording of `duration` seconds."""
+    frequency = 220 + 7 * seed
+    return [
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size=320x240:rate=15:duration={duration}",
+        "-f", "lavfi", "-i", f"aevalsrc=0.4*sin(2*PI*{frequency}*t)*gt(mod(t\\,3)\\,1):s=16000:d={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", "-movflags", "+faststart",
+        output_path,
+    ]
+
+
+def generate_fixture(directory, duration, seed=0):
+    """
+    Writes a synthetic recording.
+
+    Returns:
+        Path of the MP4 file
+    """
+    path = os.path.join(directory, f"fixture_{duration}s_{seed}.mp4")
+    subprocess.run(ffmpeg_fixture_command(path, duration, seed), check=True, stdin=subprocess.DEVNULL)
+    return path
+
+
+class StageTimer:
+    """Collects wall-clock durations per pipeline stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def wrap(self, stage, func):
+        """Returns `func` timed under `stage`, e.g. for mock.patch(..., new=timer.wrap(...))."""
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with self.measure(stage):
+                return func(*args, **kwargs)
+        return timed
+
+    def summary(self):
+        return {stage: percentiles(values) for stage, values in sorted(self.samples.items())}
+
+
+class QueryTimer:
+    """connection.execute_wrapper() hook adding up the time spent in SQL."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def percentiles(values):
+    """
+    Returns:
+        Dict with count, mean, max and p50/p95/p99 of `values` (seconds)
+    """
+    values = np.asarray(values, dtype=float)
+    result = {"count": int(len(values)), "mean": round(float(values.mean()), 6), "max": round(float(values.max()), 6)}
+    for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        result[f"p{percentile}"] = round(float(value), 6)
+    return result
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process; ffmpeg children are not included."""
+    unit = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in bytes on macOS, KiB elsewhere
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+
+
+def io_write_bytes():
+    """Bytes this process caused to be written to storage (Linux only), or None."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def directory_bytes(path):
+    """Bytes stored below `path`; hard links (see call/blobstore.py) are counted once."""
+    seen = set()
+    total = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            stat = os.lstat(os.path.join(dir_path, file_name))
+            if (stat.st_dev, stat.st_ino) not in seen:
+                seen.add((stat.st_dev, stat.st_ino))
+                total += stat.st_size
+    return total
+
+
+def compare_to_baseline(results, baseline, tolerance, metric="p95"):
+    """
+    Compares stage timings and resource usage with a stored run. Peak RSS and
+    disk usage are only compared when both runs used the same settings and
+    recording lengths.
+
+    Args:
+        results: Output of the benchmark, {"durations": {...}, "peak_rss_bytes": ..., "disk_bytes": ...}
+        baseline: Earlier results in the same format
+        tolerance: Allowed slowdown or growth as a fraction, e.g. 0.2 for 20%
+        metric: Timing statistic to compare
+
+    Returns:
+        List of (name, baseline value, current value, change ratio, regressed) tuples
+    """
+    rows = []
+    for duration, section in results["durations"].items():
+        baseline_stages = baseline.get("durations", {}).get(duration, {}).get("stages", {})
+        for stage, stats in section["stages"].items():
+            if stage not in baseline_stages:
+                continue
+            before, after = baseline_stages[stage][metric], stats[metric]
+            ratio = after / before - 1 if before else 0.0
+            regressed = ratio > tolerance and after - before > MIN_REGRESSION_SECONDS
+            rows.append((f"{duration}s {stage} {metric}", before, after, ratio, regressed))
+    if baseline.get("settings") != results.get("settings") or set(baseline.get("durations", {})) != set(results["durations"]):
+        return rows  # Totals are only comparable for the same set of runs
+    for name in ("peak_rss_bytes", "disk_bytes"):
+        before, after = baseline.get(name), results.get(name)
+        if before and after is not None:
+            ratio = after / before - 1
+            rows.append((name, before, after, ratio, ratio > tolerance))
+    return rows
@@ -0,0 +1,149 @@
+# call/blobstore.py
+"""
+Content-addressed store for uploaded media (interview chunks, CVs).
+
+Every distinct file is kept once, at MEDIA_ROOT/blobs/<aa>/<bb>/<sha256>, where
+aa and bb are the first two byte pairs of its SHA-256. The names the rest of
+the code uses (media/interview/<id>/video_chunk_..., media/cvs/Job_<id>/...)
+are hard links to that blob, so a retried upload or a CV sent to several job
+openings costs a directory entry instead of another copy. When a hard link
+cannot be created (e.g. the name lives on another filesystem), callers are
+given the blob path itself.
+
+MediaBlob rows count the references to each blob; the blob is removed
+together with its last reference.
+"""
+import logging
+import os
+import shutil
+import uuid
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from .uploadhandlers import file_sha256
+
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = "blobs"
+
+
+def blob_path(checksum):
+    """Returns the sharded path of the blob with the given SHA-256."""
+    return os.path.join(settings.MEDIA_ROOT, BLOB_DIR, checksum[:2], checksum[2:4], checksum)
+
+
+def _replace_with_link(source, target):
+    # Link under a temporary name first so `target` never disappears
+    temporary = f"{target}.{uuid.uuid4().hex}.tmp"
+    os.link(source, temporary)
+    os.replace(temporary, target)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def is_stored(path, checksum):
+    """Whether `path` already is (or links to) the stored blob of `checksum`."""
+    stored = blob_path(checksum)
+    try:
+        return os.path.samefile(path, stored)
+    except OSError:
+        return False
+
+
+def ingest(path, checksum=None):
+    """
+    Adds a file to the store and counts a reference to it. An identical blob
+    is reused and `path` is replaced by a hard link to it.
+
+    Args:
+        path: Path of the file, normally below MEDIA_ROOT
+        checksum: SHA-256 of the file when already known (e.g. computed while uploading)
+
+    Returns:
+        Tuple of (path to reference the content by, MediaBlob). The path is
+        `path` itself unless it could not be hard linked to the blob.
+    """
+    from .models import MediaBlob
+
+    checksum = checksum or file_sha256(path)
+    stored = blob_path(checksum)
+    with transaction.atomic():
+        # The row lock serializes ingests and releases of the same content
+        blob, created = MediaBlob.objects.select_for_update().get_or_create(
+            sha256=checksum, defaults={"size": os.path.getsize(path)}
+        )
+        if not os.path.exists(stored):
+            os.makedirs(os.path.dirname(stored), exist_ok=True)
+            try:
+                os.link(path, stored)
+            except OSError:
+                shutil.move(path, stored)
+                path = stored
+        elif not os.path.samefile(path, stored):
+            try:
+                _replace_with_link(stored, path)
+                logger.info(f"Deduplicated {path} against blob {checksum}")
+            except OSError:
+                _remove(path)
+                path = stored
+        MediaBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+    blob.refcount += 1
+    return path, blob
+
+
+def release(path, checksum=None):
+    """
+    Drops one reference to a stored file: `path` is unlinked, and the blob
+    itself once nothing refers to it any more.
+
+    Args:
+        path: Path returned by ingest()
+        checksum: SHA-256 of the content, read from the file when not given
+    """
+    from .models import MediaBlob
+
+    if not checksum:
+        if not os.path.exists(path):
+            return
+        checksum = file_sha256(path)
+    stored = blob_path(checksum)
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(sha256=checksum).first()
+        if blob is None:
+            return  # Not managed by the store (e.g. uploaded before it existed)
+        if os.path.abspath(path) != os.path.abspath(stored):
+            transaction.on_commit(lambda: _remove(path))
+        if blob.refcount > 1:
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") - 1)
+            return
+        blob.delete()
+        transaction.on_commit(lambda: _remove(stored))
+        logger.info(f"Removed unreferenced blob {checksum}")
+
+
+class BlobStorage(FileSystemStorage):
+    """
+    FileSystemStorage that writes through the blob store, for FileFields such
+    as ApplicantResponse.cv. Deleting the file drops its reference.
+    """
+
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        path, _ = ingest(self.path(name))
+        return os.path.relpath(path, self.location)
+
+    def delete(self, name):
+        if name:
+            release(self.path(name))
+
+
+def blob_storage():
+    """Storage callable referenced by old migrations; models use settings.STORAGES["blobs"]."""
+    return BlobStorage()
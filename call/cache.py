@@ -0,0 +1,201 @@
+# call/cache.py
+"""
+Content-addressed caches for expensive inference results (transcripts, ...).
+
+Each named cache in settings.INFERENCE_CACHES picks a backend:
+
+    INFERENCE_CACHES = {
+        'transcripts': {
+            'BACKEND': 'call.cache.DatabaseCacheBackend',  # or 'call.cache.DjangoCacheBackend'
+            'TIMEOUT': 60 * 60 * 24 * 30,                   # seconds, None for no expiry
+            'MAX_ENTRIES': 10000,                           # least recently used entries are evicted
+            'OPTIONS': {'CULL_EVERY': 100},                 # database backend: evict on every 100th write
+        },
+    }
+
+Entries can carry a tag (e.g. "job:12") so that everything derived from one
+object can be invalidated at once when that object changes.
+"""
+import itertools
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import InferenceCacheEntry
+
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseCacheBackend:
+    """
+    Stores entries in the InferenceCacheEntry table with TTL and LRU eviction.
+    Eviction runs on every `cull_every`-th write of the process rather than on
+    each one, so the table may briefly hold a few entries more than
+    MAX_ENTRIES; expired entries are never returned either way.
+    """
+
+    def __init__(self, namespace, timeout=None, max_entries=None, cull_every=100, **options):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.cull_every = max(1, cull_every)
+        self._writes = itertools.count(1)  # Thread-safe increment
+
+    def _entries(self):
+        return InferenceCacheEntry.objects.filter(namespace=self.namespace)
+
+    def get(self, key, tag=""):
+        entries = self._entries().filter(key=key)
+        if self.timeout is not None:
+            entries = entries.filter(created_at__gte=timezone.now() - timedelta(seconds=self.timeout))
+        entry = entries.only("id", "value").first()
+        if entry is None:
+            return None
+        # Touch the entry so LRU eviction keeps it around
+        self._entries().filter(id=entry.id).update(last_used_at=timezone.now(), hits=F("hits") + 1)
+        return entry.value
+
+    def set(self, key, value, tag=""):
+        now = timezone.now()
+        InferenceCacheEntry.objects.update_or_create(
+            namespace=self.namespace,
+            key=key,
+            defaults={"value": value, "tag": tag, "created_at": now, "last_used_at": now},
+        )
+        if next(self._writes) % self.cull_every == 0:
+            self._evict()
+
+    def invalidate(self, tag):
+        self._entries().filter(tag=tag).delete()
+
+    def _evict(self):
+        if self.timeout is not None:
+            self._entries().filter(created_at__lt=timezone.now() - timedelta(seconds=self.timeout)).delete()
+        if self.max_entries is not None and self._entries().count() > self.max_entries:
+            stale_ids = self._entries().order_by("-last_used_at").values_list("id", flat=True)[self.max_entries:]
+            stale_ids = list(stale_ids)
+            if stale_ids:
+                self._entries().filter(id__in=stale_ids).delete()
+
+
+class DjangoCacheBackend:
+    """
+    Stores entries in one of settings.CACHES. Expiry uses the cache timeout;
+    eviction is left to the cache itself (e.g. MAX_ENTRIES of LocMemCache, Redis maxmemory).
+    Tags are versioned: invalidating a tag bumps its version so older keys are never read again.
+    """
+
+    def __init__(self, namespace, timeout=None, cache_alias="default", **options):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+
+    def _tag_key(self, tag):
+        return f"inference:{self.namespace}:tag:{tag}"
+
+    def _key(self, key, tag):
+        if not tag:
+            return f"inference:{self.namespace}:{key}"
+        version = caches[self.cache_alias].get(self._tag_key(tag), 0)
+        return f"inference:{self.namespace}:{tag}:{version}:{key}"
+
+    def get(self, key, tag=""):
+        return caches[self.cache_alias].get(self._key(key, tag))
+
+    def set(self, key, value, tag=""):
+        caches[self.cache_alias].set(self._key(key, tag), value, self.timeout)
+
+    def invalidate(self, tag):
+        cache = caches[self.cache_alias]
+        cache.add(self._tag_key(tag), 0, None)
+        cache.incr(self._tag_key(tag))
+
+
+class ResultCache:
+    """Wraps a backend and keeps per-process hit/miss counters."""
+
+    def __init__(self, namespace, backend):
+        self.namespace = namespace
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, tag=""):
+        try:
+            value = self.backend.get(key, tag)
+        except Exception as e:
+            # A broken cache must never break the pipeline
+            logger.warning(f"{self.namespace} cache lookup failed: {e}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        logger.debug(f"{self.namespace} cache {'miss' if value is None else 'hit'} for {key} ({self.stats()})")
+        return value
+
+    def set(self, key, value, tag=""):
+        try:
+            self.backend.set(key, value, tag)
+        except Exception as e:
+            logger.warning(f"{self.namespace} cache store failed: {e}")
+
+    def invalidate(self, tag):
+        try:
+            self.backend.invalidate(tag)
+            logger.info(f"Invalidated {self.namespace} cache entries tagged {tag}")
+        except Exception as e:
+            logger.warning(f"{self.namespace} cache invalidation failed: {e}")
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache(namespace):
+    """
+    Returns the ResultCache configured under settings.INFERENCE_CACHES[namespace].
+
+    Args:
+        namespace: Name of the cache, e.g. "transcripts" or "scores"
+
+    Returns:
+        ResultCache instance shared by the whole process
+    """
+    with _caches_lock:
+        if namespace not in _caches:
+            config = settings.INFERENCE_CACHES.get(namespace, {})
+            backend_class = import_string(config.get("BACKEND", "call.cache.DatabaseCacheBackend"))
+            options = {k.lower(): v for k, v in config.get("OPTIONS", {}).items()}
+            backend = backend_class(
+                namespace,
+                timeout=config.get("TIMEOUT"),
+                max_entries=config.get("MAX_ENTRIES"),
+                **options
+            )
+            _caches[namespace] = ResultCache(namespace, backend)
+        return _caches[namespace]
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting == "INFERENCE_CACHES":
+        with _caches_lock:
+            _caches.clear()
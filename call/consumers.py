@@ -3,19 +3,124 @@ import asyncio
 import base64
 import numpy as np
 import cv2
-import subprocess
 import tempfile
+import time
 import os
 import speech_recognition as sr
-import openai  # Import OpenAI client
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.conf import settings
+from Job_opening.serializers import JobDescriptionSerializer
+from .audio import AudioExtractionError, aencode_pcm, aprepare_speech, audio_upload
+from .audio_stream import (
+    CODEC_OPUS, CODEC_PCM16, FLAG_END_OF_STREAM, FLAG_END_OF_UTTERANCE,
+    AudioFrameError, LiveAudioStream, StreamDecoder, is_audio_frame, parse_audio_frame, resample,
+)
+from .models import Interview
+from .services import TRANSCRIPTION_ERRORS, calculate_candidate_score, normalize_answer, parse_score, probe_duration
+from .inference import astream_chat_completion, atranscribe
+from .transcription import atranscribe_segments
+
+# Work items queued per connection
+WORK_TRANSCRIBE = "transcribe"  # Transcribe the audio received since the last pass
+WORK_UTTERANCE = "utterance"  # Transcribe one utterance of the live audio stream
+
+_connections = {}  # Channel name -> consumer, for the connections open in this process
+
+
+def connection_metrics():
+    """Queue metrics of every websocket connection open in this process."""
+    return [consumer.metrics() for consumer in list(_connections.values())]
+
+
+class JSONArrayStream:
+    """
+    Incremental parser for a JSON array arriving in pieces, e.g. a streamed
+    completion. feed() returns the array items completed by the new text;
+    anything before the opening bracket (such as a ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = None  # Where the next item starts, once the opening bracket was seen
+        self.items = []
+        self.decoder = json.JSONDecoder()
+
+    def feed(self, text):
+        self.buffer += text
+        if self.position is None:
+            bracket = self.buffer.find("[")
+            if bracket < 0:
+                return []
+            self.position = bracket + 1
+        items = []
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\r\n,":
+                self.position += 1
+            if self.position >= len(self.buffer) or self.buffer[self.position] == "]":
+                break
+            if self.buffer.find("}", self.position) < 0 and self.buffer[self.position] == "{":
+                break  # The object cannot be complete yet
+            try:
+                item, self.position = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                break  # Wait for more text
+            items.append(item)
+        self.items += items
+        return items
 
 
 class InterviewConsumer(AsyncWebsocketConsumer):
+    """
+    Receives an interview's media over a websocket and streams results back
+    as soon as each is ready:
+
+        {"type": "chunk_received"}  A video chunk was stored
+        {"type": "transcript"}      A segment or utterance was transcribed
+        {"type": "qa_delta"}        Text of the QA extraction, as the model generates it
+        {"type": "qa_pair"}         A question/answer pair is complete
+        {"type": "score"}           A QA pair was scored
+        {"audio_text": [...]}       All QA pairs of the pass
+
+    Binary messages are either video chunks, appended to a temporary recording,
+    or audio frames (see call/audio_stream.py), cut into utterances that are
+    transcribed one by one as the candidate speaks.
+
+    receive() only stores the incoming data and queues work; a dedicated task
+    per connection drains a bounded queue, so a slow pipeline (ffmpeg, speech-
+    to-text, GPT) never blocks the socket. Transcription passes are coalesced:
+    while one is queued, newer frames are covered by it, and utterances that
+    find the queue full are merged into the last queued one. When the queue
+    fills up the client is asked to slow down, and messages that do not fit
+    are dropped with a notice.
+    """
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.temp_video_file = None  # Temporary file for storing video chunks
+        self.transcribed_until = 0.0  # Seconds of the recording already sent to speech-to-text
+        self.transcript_segments = []  # Append-only transcript, one entry per transcribed segment
+        self.queue = None
+        self.worker = None
+        self.transcribe_pending = False  # A transcription pass is queued and will pick up new frames
+        self.pending_utterance = None  # Last queued utterance not yet started; later ones can merge into it
+        self.live_audio = None
+        self.audio_decoder = None  # Streaming Opus decoder, started by the first Opus frame
+        self.audio_sequence = None  # Sequence number of the last audio frame
+        self.backpressure = False
+        self.job_description = None  # (JobDescriptionSerializer payload, job opening id), loaded for live scoring
+        self.scored_answers = set()  # (question, normalized answer) pairs already scored on this connection
+        self.stats = {
+            "received": 0,
+            "processed": 0,
+            "failed": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "lost_audio_frames": 0,
+            "max_queue_depth": 0,
+            "lag_seconds": 0.0,  # Queueing delay of the last item started
+            "max_lag_seconds": 0.0,
+        }
 
     async def connect(self):
         print("Attempting to connect")
@@ -26,11 +131,27 @@ class InterviewConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        size = max(1, settings.INTERVIEW_WS_QUEUE_SIZE)
+        self.queue = asyncio.Queue(maxsize=size)
+        self.high_watermark = max(1, size * 3 // 4)  # Ask the client to slow down from here
+        self.low_watermark = size // 4  # ... and to resume once drained to here
+        self.worker = asyncio.create_task(self.process_queue())
+        _connections[self.channel_name] = self
         await self.accept()
         print(f"Connection accepted for interview ID: {self.interview_id}")
 
     async def disconnect(self, close_code):
         print("Disconnecting...")
+        _connections.pop(self.channel_name, None)
+        if self.audio_decoder:
+            self.audio_decoder.kill()
+        if self.worker:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            print(f"Connection metrics: {self.metrics()}")
         # Clean up temporary files when disconnecting
         if self.temp_video_file and os.path.exists(self.temp_video_file.name):
             print(f"Removing temporary video file: {self.temp_video_file.name}")
@@ -51,28 +172,159 @@ class InterviewConsumer(AsyncWebsocketConsumer):
                     print("Received heartbeat from client")
                     return
 
+                if message_type == 'metrics':
+                    await self.send(text_data=json.dumps({'type': 'metrics', **self.metrics()}))
+                    return
+
                 if message_type == 'audio_chunk':
+                    # Base64 audio in JSON; binary audio frames avoid the encoding overhead
                     audio_data = data.get('audio_data', None)
                     if audio_data:
                         print("Received audio chunk.")
-                        await self.process_audio_chunk(audio_data)
+                        codec = CODEC_PCM16 if data.get('format') == 'pcm_s16le' else CODEC_OPUS
+                        flags = FLAG_END_OF_UTTERANCE if data.get('end_of_utterance') else 0
+                        await self.receive_audio(codec, flags, int(data.get('sample_rate', 16000)), base64.b64decode(audio_data))
+
+            elif bytes_data and is_audio_frame(bytes_data):
+                await self.receive_audio_frame(bytes_data)
 
             elif bytes_data:
                 print("Received video frame.")
-                await self.process_video_frame(bytes_data)
+                size = self.append_video_frame(bytes_data)
+                await self.send(text_data=json.dumps({'type': 'chunk_received', 'bytes': len(bytes_data), 'total_bytes': size}))
+                await self.enqueue(WORK_TRANSCRIBE)
 
         except Exception as e:
             print(f"Error in receive method: {e}")
 
+    async def enqueue(self, kind, payload=None):
+        """Queues work for the connection's worker without waiting for it to run."""
+        self.stats["received"] += 1
+        if kind == WORK_TRANSCRIBE and self.transcribe_pending:
+            self.stats["coalesced"] += 1  # The queued pass also covers the new frames
+            return
+        try:
+            self.queue.put_nowait((kind, payload, time.monotonic()))
+        except asyncio.QueueFull:
+            if kind == WORK_UTTERANCE and self.pending_utterance is not None:
+                # Never lose speech: transcribe it together with the last queued utterance
+                self.pending_utterance["end"] = payload["end"]
+                self.pending_utterance["samples"] = np.concatenate([self.pending_utterance["samples"], payload["samples"]])
+                self.stats["coalesced"] += 1
+                return
+            self.stats["dropped"] += 1
+            await self.send_status("dropped", kind=kind)
+            return
+        if kind == WORK_TRANSCRIBE:
+            self.transcribe_pending = True
+        elif kind == WORK_UTTERANCE:
+            self.pending_utterance = payload
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queue.qsize())
+        if not self.backpressure and self.queue.qsize() >= self.high_watermark:
+            self.backpressure = True
+            await self.send_status("slow_down")
 
-    async def process_audio_chunk(self, audio_data):
-        print("Processing audio chunk...")
-        loop = asyncio.get_event_loop()
-        text_response = await loop.run_in_executor(None, self.process_audio, audio_data)
-        await self.send(text_data=json.dumps({'text_response': text_response}))
-        print(f"Audio processing result")
+    async def process_queue(self):
+        """Worker task: runs the queued work of this connection one item at a time."""
+        while True:
+            kind, payload, enqueued = await self.queue.get()
+            if kind == WORK_TRANSCRIBE:
+                self.transcribe_pending = False  # Frames arriving from now on need another pass
+            elif payload is self.pending_utterance:
+                self.pending_utterance = None
+            lag = time.monotonic() - enqueued
+            self.stats["lag_seconds"] = round(lag, 3)
+            self.stats["max_lag_seconds"] = round(max(self.stats["max_lag_seconds"], lag), 3)
+            try:
+                if kind == WORK_TRANSCRIBE:
+                    await self.transcribe_new_audio()
+                else:
+                    await self.transcribe_utterance(payload)
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"Error processing {kind}: {e}")
+            finally:
+                self.queue.task_done()
+            if self.backpressure and self.queue.qsize() <= self.low_watermark:
+                self.backpressure = False
+                await self.send_status("resume")
+
+    async def send_status(self, state, **extra):
+        """Tells the client about the queue: slow_down, resume or dropped."""
+        await self.send(text_data=json.dumps({
+            'type': 'status',
+            'state': state,
+            'queue_depth': self.queue.qsize(),
+            'lag_seconds': self.stats["lag_seconds"],
+            **extra,
+        }))
+
+    def metrics(self):
+        """Returns queue depth, lag and work counters of this connection."""
+        return {
+            "interview_id": self.interview_id,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "backpressure": self.backpressure,
+            "transcribed_until": round(self.transcribed_until, 3),
+            **self.stats,
+        }
 
-    async def process_video_frame(self, video_frame):
+
+    async def receive_audio_frame(self, frame):
+        try:
+            codec, flags, sample_rate, sequence, payload = parse_audio_frame(frame)
+        except AudioFrameError as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'error': str(e)}))
+            return
+        if self.audio_sequence is not None and sequence > self.audio_sequence + 1:
+            self.stats["lost_audio_frames"] += sequence - self.audio_sequence - 1
+        self.audio_sequence = sequence
+        await self.receive_audio(codec, flags, sample_rate, payload)
+
+    async def receive_audio(self, codec, flags, sample_rate, payload):
+        """Feeds audio into the live stream; finished utterances are queued for transcription."""
+        if self.live_audio is None:
+            live = settings.INTERVIEW_LIVE_AUDIO
+            self.live_audio = LiveAudioStream(
+                max_utterance_seconds=live['MAX_UTTERANCE_SECONDS'],
+                end_silence_ms=live['END_SILENCE_MS'],
+                min_utterance_ms=live['MIN_UTTERANCE_MS'],
+                **settings.INTERVIEW_VAD['OPTIONS']
+            )
+        if codec == CODEC_PCM16:
+            await self.queue_utterances(self.live_audio.feed(resample(np.frombuffer(payload, dtype='<i2'), sample_rate)))
+        elif payload:
+            if self.audio_decoder is None:
+                self.audio_decoder = StreamDecoder(self.receive_decoded_audio)
+            await self.audio_decoder.write(payload)
+
+        if flags & FLAG_END_OF_STREAM and self.audio_decoder is not None:
+            await self.audio_decoder.close()  # Decodes the rest of the stream first
+            self.audio_decoder = None
+        if flags & (FLAG_END_OF_UTTERANCE | FLAG_END_OF_STREAM):
+            await self.queue_utterances(self.live_audio.flush())
+
+    async def receive_decoded_audio(self, samples):
+        await self.queue_utterances(self.live_audio.feed(samples))
+
+    async def queue_utterances(self, utterances):
+        for start, end, samples in utterances:
+            await self.enqueue(WORK_UTTERANCE, {"start": start, "end": end, "samples": samples})
+
+    async def transcribe_utterance(self, utterance):
+        """Sends one utterance of the live audio to speech-to-text and the transcript to the client."""
+        upload = audio_upload(await aencode_pcm(utterance["samples"]))
+        text = (await atranscribe(upload, "whisper-1")).strip()
+        if text:
+            self.transcript_segments.append(text)
+        await self.send_transcript({'start': round(utterance["start"], 3), 'end': round(utterance["end"], 3), 'text': text})
+
+    async def send_transcript(self, segment):
+        """Sends one transcribed segment ({"start", "end", "text"}) to the client."""
+        await self.send(text_data=json.dumps({'type': 'transcript', **segment}))
+
+    def append_video_frame(self, video_frame):
         # Append incoming video frame to a temporary file
         if not self.temp_video_file:
             # Create a temporary file for storing video chunks
@@ -82,85 +334,83 @@ class InterviewConsumer(AsyncWebsocketConsumer):
         with open(self.temp_video_file.name, 'ab') as f:
             f.write(video_frame)
             print(f"Appended video frame to {self.temp_video_file.name}")
-        
-        # Extract audio from the video file after receiving each chunk (or after a certain condition)
-        audio_text = await self.extract_audio_and_process(self.temp_video_file.name)
-        
-        # Send the extracted audio text back to the client
-        await self.send(text_data=json.dumps({'audio_text': await self.extract_qa_pairs_from_audio(audio_text)}))
+            return f.tell()
+
+    async def transcribe_new_audio(self):
+        """Transcribes the recording received so far and sends the QA pairs to the client."""
+        if not settings.INTERVIEW_INCREMENTAL_TRANSCRIPTION:
+            # Re-transcribe the whole recording after every chunk
+            audio_text = await self.extract_audio_and_process(self.temp_video_file.name)
+            await self.send(text_data=json.dumps({'audio_text': await self.extract_qa_pairs_from_audio(audio_text)}))
+            print(f"Extracted audio text sent to client")
+            return
+
+        # Only transcribe the part of the recording that arrived since the last pass
+        loop = asyncio.get_event_loop()
+        duration = await loop.run_in_executor(None, probe_duration, self.temp_video_file.name)
+        if duration is None or duration - self.transcribed_until < settings.INTERVIEW_MIN_SEGMENT_SECONDS:
+            print(f"Waiting for more audio (transcribed until {self.transcribed_until:.2f}s)")
+            return
+
+        audio_text = await self.extract_audio_and_process(
+            self.temp_video_file.name, start=self.transcribed_until, end=duration
+        )
+        if audio_text.startswith(TRANSCRIPTION_ERRORS):
+            # Keep the offset so the same range is retried with the next chunk
+            print(f"Transcription of {self.transcribed_until:.2f}s-{duration:.2f}s failed: {audio_text}")
+            return
+        self.transcribed_until = duration
+        if not audio_text:
+            # No speech in the new range; the QA pairs of the unchanged window were already sent
+            print(f"No new speech up to {duration:.2f}s, skipping QA extraction")
+            return
+        self.transcript_segments.append(audio_text)
+
+        # Extract QA pairs from a sliding window over the most recent segments
+        window = self.transcript_segments[-settings.INTERVIEW_QA_WINDOW_SEGMENTS:]
+        await self.send(text_data=json.dumps({'audio_text': await self.extract_qa_pairs_from_audio(" ".join(window))}))
         print(f"Extracted audio text sent to client")
 
-    async def extract_audio_and_process(self, video_path):
+    async def extract_audio_and_process(self, video_path, start=None, end=None):
         """
-        Extracts audio from the video file and processes it for speech-to-text.
+        Extracts audio from the video file into memory and processes it for speech-to-text.
+        When start/end (in seconds) are given only that range is extracted.
         """
         print(f"Extracting audio from video file: {video_path}")
         
         try:
-            # Create a temporary file for the extracted audio
-            temp_audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")  # Use MP3 format
-            temp_audio_path = temp_audio_file.name
-            temp_audio_file.close()
-            # Use FFmpeg to extract audio from the video file
-            command = [
-                "ffmpeg",
-                "-i", video_path,
-                "-vn",  # No video
-                "-ac", "1",  # Mono channel
-                "-ar", "12000",  # Sampling rate (12kHz for Whisper)
-                "-b:a", "16k",  # Bitrate (16 kbps)
-                "-y", temp_audio_path  # Overwrite output file if exists
-            ]
-            
-            print("Running FFmpeg command:", ' '.join(command))
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-
-            if result.returncode != 0:
-                print("FFmpeg error:", result.stderr.decode())
-                return "Error extracting audio"
+            segments, stats = await aprepare_speech(video_path, start=start, end=end)
+            if not segments:
+                print(f"No speech detected in {video_path}, skipping transcription")
+                return ""
+            if stats:
+                print(f"Trimmed {stats['trimmed_ratio']:.0%} of the audio as silence")
 
             # Process the extracted audio for speech-to-text (STT)
-            audio_text = await self.speech_to_text(temp_audio_file.name)
+            audio_text = await self.speech_to_text(segments)
 
             print(f"Transcribed audio text: {audio_text}")
 
-        except subprocess.CalledProcessError as e:
-            print(f"FFmpeg error: {e.stderr.decode()}")
+        except AudioExtractionError as e:
+            print(f"FFmpeg error: {e}")
             return "Error extracting audio"
         
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
             return "Processing failed"
 
-        finally:
-            # Clean up temporary files regardless of success/failure
-            if temp_audio_file and os.path.exists(temp_audio_path):
-                try:
-                    os.remove(temp_audio_path)
-                    print(f"Deleted temporary audio file: {temp_audio_path}")
-                except Exception as e:
-                    print(f"Error deleting temp file: {str(e)}")
-
         return audio_text
 
-    async def speech_to_text(self, audio_path):
+    async def speech_to_text(self, segments):
         """
-        Converts audio to text using OpenAI's Whisper API.
+        Converts audio to text using the configured inference backend.
+        `segments` are returned by call.audio.aprepare_speech and transcribed in parallel.
         """
-          # Set your OpenAI API key here
-        client = openai.OpenAI(api_key = settings.OPEN_AI_KEY)  # Instantiate the OpenAI client
-
-        print(f"Transcribing audio from: {audio_path}")
-        
         try:
-            with open(audio_path, "rb") as audio_file:
-                transcription = client.audio.transcriptions.create(
-                    file=audio_file,
-                    model="whisper-1",
-                    response_format="text"  # You can adjust this based on your needs
-                )
+            transcription, timeline = await atranscribe_segments(segments, "whisper-1", on_segment=self.send_transcript)
+            print(f"Transcribed {len(timeline)} segments: {[(part['start'], part['end']) for part in timeline]}")
             
-            return transcription # Return the transcribed text directly
+            return transcription # Return the stitched text directly
         
         except Exception as e:
             print(f"Error during transcription: {e}")
@@ -169,41 +419,82 @@ class InterviewConsumer(AsyncWebsocketConsumer):
     async def extract_qa_pairs_from_audio(self, audio_text):
         """
         Uses OpenAI's GPT model to extract question-answer pairs from audio_text.
+        The answer is streamed: text is forwarded as it arrives, and each pair
+        is sent (and scored, with INTERVIEW_WS_LIVE_SCORES) once it is complete.
         """
-        client = openai.OpenAI(api_key = settings.OPEN_AI_KEY)  # Instantiate the OpenAI client
-        
+
         prompt = (
             "Convert the following interview transcript into a structured JSON format where each exchange has 'interviewer' and 'candidate' fields. Identify when the interviewer is asking questions and when the candidate is responding. Format the output as an array of JSON objects with the structure {'interviewer': '[interviewer's question]', 'candidate': '[candidate's response]'}."
             f"{audio_text}"
         )
-        
+
+        parser = JSONArrayStream()
+        scoring = []
         try:
-            response = client.chat.completions.create(
+            async for delta in astream_chat_completion(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
                         "role": "user", 
                         "content": prompt
                     }
-                ]
-            )
-            if isinstance(response.choices, list):
-                qa_pairs_response = response.choices[0].message.content
-            # If it's not a list but has a direct message attribute
-            else:
-                qa_pairs_response = response.choices.message.content
-            
-            print(f"Extracted QA Pairs Response: {qa_pairs_response}")  # Log response
-            
-            # Here you would need to parse qa_pairs_response into your qa_pairs list.
-            # This is a placeholder; you will need to implement parsing logic based on how you want to structure it.
-            
-            # Assuming the response is in JSON format
-            self.qa_pairs = json.loads(qa_pairs_response)  # Convert string response to list of dictionaries
+                ],
+                purpose="qa_pairs",
+            ):
+                await self.send(text_data=json.dumps({'type': 'qa_delta', 'delta': delta}))
+                for qa_pair in parser.feed(delta):
+                    index = len(parser.items) - 1
+                    await self.send(text_data=json.dumps({'type': 'qa_pair', 'index': index, 'qa_pair': qa_pair}))
+                    if settings.INTERVIEW_WS_LIVE_SCORES:
+                        scoring.append(asyncio.create_task(self.score_qa_pair(index, qa_pair)))
+
+            print(f"Extracted QA Pairs: {parser.items}")  # Log response
+            await asyncio.gather(*scoring, return_exceptions=True)  # A failed score must not lose the QA pairs
+            self.qa_pairs = parser.items
             return self.qa_pairs
-            
+
         except Exception as e:
             print(f"Error during QA extraction: {e}")
 
-    async def calculate_candidate_score_from_interview(self, qa_pairs):
-        client = openai.OpenAI(api_key = settings.OPEN_AI_KEY)
\ No newline at end of file
+        finally:
+            for task in scoring:
+                task.cancel()
+
+    async def score_qa_pair(self, index, qa_pair):
+        """Scores the candidate's answer in one QA pair and sends the score to the client."""
+        if not isinstance(qa_pair, dict):
+            return
+        question, answer = qa_pair.get('interviewer'), qa_pair.get('candidate')
+        if not question or not answer or (question, normalize_answer(answer)) in self.scored_answers:
+            return
+        if self.job_description is None:
+            self.job_description = await self.load_job_description()
+        job_description, job_opening_id = self.job_description
+        if job_description is None:
+            return  # Unknown interview; nothing to score against
+
+        # The score cache queries the database; this closes the worker thread's connection afterwards.
+        # Not thread-sensitive, so scoring does not wait for the other database calls of the process
+        score = await database_sync_to_async(calculate_candidate_score, thread_sensitive=False)(
+            job_description, question, answer, job_opening_id
+        )
+        if "error" in score:
+            await self.send(text_data=json.dumps({'type': 'score', 'index': index, 'question': question, 'error': score["error"]}))
+            return
+        self.scored_answers.add((question, normalize_answer(answer)))
+        await self.send(text_data=json.dumps({
+            'type': 'score',
+            'index': index,
+            'question': question,
+            'score': parse_score(score["evaluation"]),
+        }))
+
+    @database_sync_to_async
+    def load_job_description(self):
+        interview = Interview.objects.select_related(
+            "applicant_job_pipeline_id__jobId"
+        ).filter(id=self.interview_id).first()
+        if interview is None:
+            return None, None
+        job_opening = interview.applicant_job_pipeline_id.jobId
+        return JobDescriptionSerializer(job_opening).data, job_opening.id
@@ -1,35 +1,75 @@
+import hashlib
 import json
-import openai
-from django.conf import settings
+import numpy as np
 from .models import EvaluationResult
+from .inference import create_chat_completion
+from .scheduler import PRIORITY_REPORT
 
-def generate_final_report(evaluation_result, job_description):
+# Score distribution buckets (0-2, 2-4, ..., 8-10); the last one includes 10
+SCORE_BINS = np.arange(0, 12, 2)
+
+
+def report_inputs_hash(scores, job_description):
+    """
+    Fingerprint of everything the final report is generated from.
+
+    Args:
+        scores: Dict of answer score by question text, as EvaluationResult.verbal_scores
+        job_description: JobDescriptionSerializer payload of the job opening
+
+    Returns:
+        SHA-256 hex digest; equal digests mean the stored report is still current
+    """
+    payload = json.dumps({"scores": scores, "job": job_description}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def score_statistics(scores):
+    """
+    Numeric summary of the answer scores, computed locally.
+
+    Args:
+        scores: Dict of answer score by question text
+
+    Returns:
+        Dict with answered, average, median, std, min, max and distribution
+        (answers per score bucket); the statistics are None without scores
+    """
+    values = np.array(list(scores.values()), dtype=float)
+    counts, _ = np.histogram(np.clip(values, 0, 10), bins=SCORE_BINS)
+    distribution = {f"{low}-{high}": int(count) for low, high, count in zip(SCORE_BINS[:-1], SCORE_BINS[1:], counts)}
+    if not len(values):
+        return {"answered": 0, "average": None, "median": None, "std": None, "min": None, "max": None, "distribution": distribution}
+    return {
+        "answered": int(len(values)),
+        "average": round(float(values.mean()), 2),
+        "median": round(float(np.median(values)), 2),
+        "std": round(float(values.std()), 2),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "distribution": distribution,
+    }
+
+
+def generate_final_report(evaluation_result, job_description, scores=None, statistics=None):
     """
     Generate a comprehensive evaluation report using stored scores and job context.
     
     Args:
         evaluation_result (EvaluationResult): The evaluation result instance.
         job_description (str): The job description for the position.
+        scores (dict): Answer scores by question, read from QuestionScore when not given.
+        statistics (dict): score_statistics() of the scores, computed when not given.
     
     Returns:
         dict: Structured final report in JSON format.
     """
-    verbal_scores = evaluation_result.verbal_scores
+    flat_scores = evaluation_result.verbal_scores if scores is None else scores
+    statistics = statistics or score_statistics(flat_scores)
     
-    # Convert string scores to floats
-    if isinstance(verbal_scores, dict):
-        try:
-            flat_scores = {q: float(v) for q, v in verbal_scores.items()}  # Convert all values to float
-        except ValueError:
-            raise ValueError("One or more scores in verbal_scores cannot be converted to a number.")
-    else:
-        flat_scores = {}  # Default to an empty dictionary if verbal_scores is not a dict
+    total_questions = statistics["answered"]
     
-    total_questions = len(flat_scores)
-    
-    average_score = sum(flat_scores.values()) / total_questions if total_questions > 0 else 0
-    max_score = max(flat_scores.values(), default=0)
-    min_score = min(flat_scores.values(), default=0)
+    average_score = statistics["average"] or 0
 
     # Identify strengths and improvement areas dynamically
     strengths, improvement_areas = _identify_patterns(flat_scores, job_description)
@@ -47,8 +87,6 @@ def generate_final_report(evaluation_result, job_description):
 
 def _identify_patterns(scores, job_desc):
     """Identify strengths/weaknesses based on score patterns."""
-    client = openai.OpenAI(api_key=settings.OPEN_AI_KEY)
-    
     prompt = f"""
     Analyze these interview scores for a {job_desc} role:
     {json.dumps(scores, indent=2)}
@@ -65,10 +103,14 @@ def _identify_patterns(scores, job_desc):
     }}
     """
     
-    response = client.chat.completions.create(
+    # Report generation yields to interactive scoring when the rate budget is tight
+    content = create_chat_completion(
         model="gpt-4",
-        messages=[{"role": "user", "content": prompt}]
+        messages=[{"role": "user", "content": prompt}],
+        priority=PRIORITY_REPORT,
+        completion_tokens=300,
+        purpose="report_patterns",
     )
     
-    analysis = json.loads(response.choices[0].message.content)
+    analysis = json.loads(content)
     return analysis["strengths"], analysis["improvement_areas"]
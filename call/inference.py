@@ -0,0 +1,211 @@
+# call/inference.py
+"""
+Shared OpenAI clients.
+
+Calls share one AsyncOpenAI client (and keep-alive connection pool) per event
+loop instead of building a new client (and TLS session) per request; sync code
+reaches it through the scheduler's loop. Pool limits, timeouts and the base
+URL come from settings, so the whole layer can be pointed at a local stub
+server by setting OPENAI_BASE_URL.
+
+Transcriptions and chat completions are sent to the backend selected by
+settings.INFERENCE_BACKEND (see call/backends.py) through the rate-limited
+scheduler in call/scheduler.py.
+"""
+import asyncio
+import os
+import threading
+import weakref
+import httpx
+import openai
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .scheduler import PRIORITY_INTERACTIVE, estimate_tokens, get_scheduler
+
+
+_lock = threading.Lock()
+# AsyncOpenAI clients are bound to the event loop they were first used on
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _client_options():
+    return {
+        "api_key": settings.OPEN_AI_KEY,
+        "base_url": settings.OPENAI_BASE_URL or None,
+        "timeout": httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT),
+        "max_retries": settings.OPENAI_MAX_RETRIES,
+    }
+
+
+def _pool_limits():
+    return httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_async_client():
+    """
+    Returns the shared asynchronous OpenAI client for the running event loop.
+
+    Returns:
+        openai.AsyncOpenAI instance backed by a pooled keep-alive HTTP client
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = openai.AsyncOpenAI(
+            http_client=openai.DefaultAsyncHttpxClient(limits=_pool_limits()),
+            **_client_options()
+        )
+        _async_clients[loop] = client
+    return client
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    Returns the inference backend configured by settings.INFERENCE_BACKEND.
+
+    Returns:
+        Backend instance, e.g. call.backends.OpenAIBackend or call.backends.StubBackend
+    """
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                config = settings.INFERENCE_BACKEND
+                _backend = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+    return _backend
+
+
+def submit_chat_completion(model, messages, priority=PRIORITY_INTERACTIVE, completion_tokens=256,
+                           purpose="chat", metadata=None, **kwargs):
+    """
+    Queues a chat completion on the inference scheduler without waiting for it.
+    
+    Args:
+        model: Chat model name
+        messages: Chat messages
+        priority: Scheduler priority, PRIORITY_INTERACTIVE or PRIORITY_REPORT
+        completion_tokens: Expected size of the answer, counted against the token budget
+        purpose: What the completion is for ("score", "score_batch", "qa_pairs", ...), used by the stub backend
+        metadata: Extra details for the stub backend, e.g. {"count": 3} for batched scoring
+        
+    Returns:
+        concurrent.futures.Future resolving to the completion text
+    """
+    return get_scheduler().submit(
+        get_backend().complete,
+        model,
+        messages,
+        purpose=purpose,
+        metadata=metadata,
+        priority=priority,
+        tokens=estimate_tokens(messages, completion_tokens),
+        **kwargs
+    )
+
+
+def create_chat_completion(model, messages, priority=PRIORITY_INTERACTIVE, completion_tokens=256,
+                           purpose="chat", metadata=None, **kwargs):
+    """Runs a chat completion through the inference scheduler and returns its text."""
+    return submit_chat_completion(model, messages, priority, completion_tokens, purpose, metadata, **kwargs).result()
+
+
+async def astream_chat_completion(model, messages, priority=PRIORITY_INTERACTIVE, completion_tokens=256,
+                                  purpose="chat", metadata=None, **kwargs):
+    """
+    Runs a streaming chat completion through the inference scheduler.
+
+    Yields:
+        Pieces of the answer text as the model generates them. Raises the
+        backend's error once the pieces received before it are consumed.
+    """
+    loop = asyncio.get_running_loop()
+    deltas = asyncio.Queue()
+    done = object()
+
+    def on_delta(delta):
+        # Called on the scheduler's event loop
+        loop.call_soon_threadsafe(deltas.put_nowait, delta)
+
+    future = get_scheduler().submit(
+        get_backend().stream_complete,
+        model,
+        messages,
+        on_delta,
+        purpose=purpose,
+        metadata=metadata,
+        priority=priority,
+        tokens=estimate_tokens(messages, completion_tokens),
+        **kwargs
+    )
+    # Queued after every delta, so it arrives last
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(deltas.put_nowait, done))
+    try:
+        while (delta := await deltas.get()) is not done:
+            yield delta
+        future.result()
+    finally:
+        future.cancel()  # The caller stopped early, e.g. its connection closed
+
+
+def submit_transcription(audio, model, priority=PRIORITY_INTERACTIVE):
+    """
+    Queues a speech-to-text request on the inference scheduler. Transcriptions share
+    the concurrency limit but are not counted against the chat rate budget.
+    
+    Args:
+        audio: Audio as bytes, an open file or a (filename, bytes) tuple
+        model: Speech-to-text model name
+        
+    Returns:
+        concurrent.futures.Future resolving to the transcript text
+    """
+    return get_scheduler().submit(get_backend().transcribe, audio, model, priority=priority, requests=0)
+
+
+def transcribe(audio, model, priority=PRIORITY_INTERACTIVE):
+    """Transcribes audio through the inference scheduler and returns the text."""
+    return submit_transcription(audio, model, priority).result()
+
+
+async def atranscribe(audio, model, priority=PRIORITY_INTERACTIVE):
+    """Awaitable variant of transcribe for consumers running on another event loop."""
+    return await asyncio.wrap_future(submit_transcription(audio, model, priority))
+
+
+def reset_clients():
+    """
+    Drops the shared clients and backend so the next call builds new ones from settings.
+    Open connections are left to the garbage collector.
+    """
+    global _backend
+    with _lock:
+        _backend = None
+        _async_clients.clear()
+
+
+def _reset_after_fork():
+    # The child must not reuse the parent's sockets or a lock held at fork time
+    global _lock, _backend
+    _lock = threading.Lock()
+    _backend = None
+    _async_clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    # Celery prefork workers get their own connection pool
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting in ("OPEN_AI_KEY", "INFERENCE_BACKEND") or setting.startswith("OPENAI_"):
+        reset_clients()
@@ -0,0 +1,292 @@
+# call/management/commands/benchmark_pipeline.py
+import asyncio
+import gc
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date
+from functools import wraps
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from call import services, tasks, views
+from call.benchmark import (
+    QueryTimer, StageTimer, compare_to_baseline, directory_bytes, generate_fixture, io_write_bytes, peak_rss_bytes,
+)
+from call.models import Interview
+from client_auth.models import Company
+from Job_opening.models import ApplicantResponse, JobOpening
+from video_conf.celery import app as celery_app
+
+QUESTIONS = ["Tell us about a recent project.", "How do you approach testing?"]
+WARMUP_SECONDS = 3  # Long enough for the first tone burst, so the warm-up is transcribed and scored
+
+# Websocket messages whose first arrival is timed, by stage
+WEBSOCKET_STAGES = {
+    "chunk_received": "ws_first_event",
+    "transcript": "ws_first_transcript",
+    "qa_delta": "ws_first_qa_delta",
+    "score": "ws_first_score",
+    "audio_text": "ws_qa_pairs",
+}
+
+
+class Command(BaseCommand):
+    task_depth = 0
+    task_seconds = 0.0
+    help = (
+        "Benchmarks the interview pipeline end to end on synthetic recordings: uploads through "
+        "InterviewProcessingAPI (Celery tasks run inline) and video chunks through InterviewConsumer. "
+        "Inference runs on the stub backend and everything is written to a temporary test database "
+        "and MEDIA_ROOT. Reports p50/p95/p99 per stage, peak RSS and bytes written, optionally "
+        "against a baseline from an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--durations", nargs="+", type=int, default=[5, 30, 120],
+            help="Lengths of the synthetic recordings in seconds (default: 5 30 120)",
+        )
+        parser.add_argument("--iterations", type=int, default=5, help="Recordings per length (default: 5)")
+        parser.add_argument(
+            "--inference-latency", type=float, default=0.0,
+            help="Simulated latency of every speech-to-text and chat call in seconds (default: 0)",
+        )
+        parser.add_argument("--skip-websocket", action="store_true", help="Only benchmark the upload API")
+        parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for a websocket result")
+        parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+        parser.add_argument("--save", help="Write the results to this JSON file (e.g. to use as the next baseline)")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="Allowed p95 slowdown or resource growth against the baseline (default: 0.2 = 20%%)",
+        )
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error on regressions")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs")
+
+    def handle(self, *args, durations, iterations, inference_latency, skip_websocket, timeout, baseline, save,
+               tolerance, fail_on_regression, keepdb, **options):
+        if baseline:
+            with open(baseline) as f:
+                baseline = json.load(f)
+
+        work_dir = tempfile.mkdtemp(prefix="interview-benchmark-")
+        fixture_dir = os.path.join(work_dir, "fixtures")
+        media_root = os.path.join(work_dir, "media")
+        os.makedirs(fixture_dir)
+        per_duration = iterations * (1 if skip_websocket else 2)  # Websocket runs get recordings of their own
+        self.stdout.write(f"Generating {len(durations) * per_duration} recordings in {fixture_dir}")
+        fixtures = {
+            duration: [generate_fixture(fixture_dir, duration, seed) for seed in range(per_duration)]
+            for duration in durations
+        }
+        warmup = [generate_fixture(fixture_dir, WARMUP_SECONDS, seed) for seed in range(per_duration // iterations)]
+
+        latency = {"DISTRIBUTION": "constant", "VALUE": inference_latency}
+        overrides = override_settings(
+            MEDIA_ROOT=media_root,
+            INFERENCE_BACKEND={
+                "BACKEND": "call.backends.StubBackend",
+                "OPTIONS": {
+                    **settings.INFERENCE_BACKEND.get("OPTIONS", {}),
+                    "ERROR_RATE": 0.0,
+                    "TRANSCRIBE_LATENCY": latency,
+                    "COMPLETE_LATENCY": latency,
+                },
+            },
+            # Measure the pipeline, not the provider's rate budget
+            INFERENCE_SCHEDULER={**settings.INFERENCE_SCHEDULER, "REQUESTS_PER_MINUTE": 0, "TOKENS_PER_MINUTE": 0},
+            CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+            INTERVIEW_INCREMENTAL_TRANSCRIPTION=False,  # One chunk per connection; no need to probe durations
+        )
+        always_eager = celery_app.conf.task_always_eager
+        setup_test_environment()
+        old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+        try:
+            celery_app.conf.task_always_eager = True
+            with overrides:
+                from channels.layers import channel_layers
+                channel_layers.backends.clear()
+                # First requests pay for imports, connections and ffmpeg's page cache; keep them out of the numbers
+                self.run_duration(WARMUP_SECONDS, warmup, 1, skip_websocket, timeout)
+                # Collect the start-up garbage now and keep what survives out of later collections,
+                # otherwise a full collection lands in whichever stage of the first upload triggers it
+                gc.collect()
+                gc.freeze()
+                warmup_bytes = directory_bytes(media_root)
+                written_before = io_write_bytes()
+                results = {"durations": {}}
+                for duration in durations:
+                    self.stdout.write(f"Benchmarking {duration}s recordings")
+                    results["durations"][str(duration)] = self.run_duration(
+                        duration, fixtures[duration], iterations, skip_websocket, timeout
+                    )
+                written_after = io_write_bytes()
+                results["peak_rss_bytes"] = peak_rss_bytes()
+                results["disk_bytes"] = directory_bytes(media_root) - warmup_bytes
+                if written_before is not None:
+                    results["io_write_bytes"] = written_after - written_before
+                results["settings"] = {
+                    "iterations": iterations,
+                    "inference_latency": inference_latency,
+                    "scoring_mode": settings.INTERVIEW_SCORING_MODE,
+                    "non_verbal": settings.INTERVIEW_NON_VERBAL["ENABLED"],
+                    "websocket": not skip_websocket,
+                    "database": connection.vendor,
+                }
+        finally:
+            celery_app.conf.task_always_eager = always_eager
+            connection.creation.destroy_test_db(old_database_name, verbosity=0, keepdb=keepdb)
+            teardown_test_environment()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        self.report(results)
+        if save:
+            with open(save, "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {save}")
+        if baseline:
+            regressions = self.compare(results, baseline, tolerance)
+            if regressions and fail_on_regression:
+                raise CommandError(f"{len(regressions)} regression(s) against the baseline")
+
+    def create_interview(self, seed):
+        # A job opening per recording, so the score cache does not answer for later runs
+        user = User.objects.create_user(f"benchmark-{seed}-{time.monotonic_ns()}")
+        company = Company.objects.create(user=user, name="Benchmark", email=f"{user.username}@example.com")
+        job_opening = JobOpening.objects.create(
+            company=company, title="QA Engineer", description=f"Benchmark opening {user.username}", questions=QUESTIONS
+        )
+        applicant = ApplicantResponse.objects.create(
+            jobId=job_opening, name="Candidate", role="QA Engineer", appliedFor="QA Engineer",
+            appliedDate=date.today(), email=f"candidate@{user.username}.example.com",
+        )
+        return Interview.objects.create(applicant_job_pipeline_id=applicant)
+
+    def run_duration(self, duration, fixtures, iterations, skip_websocket, timeout):
+        timer = StageTimer()
+        patches = [
+            mock.patch.object(services, "prepare_speech", timer.wrap("extraction", services.prepare_speech)),
+            mock.patch.object(services, "transcribe_segments", timer.wrap("stt", services.transcribe_segments)),
+            mock.patch.object(tasks, "calculate_candidate_score", timer.wrap("scoring", tasks.calculate_candidate_score)),
+            mock.patch.object(tasks, "calculate_candidate_scores", timer.wrap("scoring", tasks.calculate_candidate_scores)),
+            mock.patch.object(tasks, "generate_final_report", timer.wrap("report", tasks.generate_final_report)),
+            mock.patch.object(tasks, "analyze_video", timer.wrap("non_verbal", tasks.analyze_video)),
+            mock.patch.object(tasks, "concatenate_recording", timer.wrap("concatenation", tasks.concatenate_recording)),
+            mock.patch.object(views, "ingest", timer.wrap("blob_store", views.ingest)),
+        ]
+        for task in (tasks.process_interview_chunk, tasks.score_interview, tasks.generate_interview_report,
+                     tasks.analyze_non_verbal, tasks.concatenate_interview_recording):
+            patches.append(mock.patch.object(task, "run", self.time_task(task.run)))
+
+        client = Client()
+        for patch in patches:
+            patch.start()
+        try:
+            for seed, path in enumerate(fixtures[:iterations]):
+                interview = self.create_interview(seed)
+                queries = QueryTimer()
+                self.task_seconds = 0.0
+                start = time.perf_counter()
+                with connection.execute_wrapper(queries), open(path, "rb") as video:
+                    response = client.post(
+                        f"/call/process/?interview_id={interview.id}",
+                        {"video_file": video, "question": QUESTIONS[0], "final_flag": "true"},
+                    )
+                elapsed = time.perf_counter() - start
+                if response.status_code != 202:
+                    raise CommandError(f"Upload failed with {response.status_code}: {response.content[:200]!r}")
+                timer.add("upload_end_to_end", elapsed)
+                timer.add("ingest", elapsed - self.task_seconds)
+                timer.add("db", queries.seconds)
+
+            if not skip_websocket:
+                from video_conf.asgi import application
+                for seed, path in enumerate(fixtures[iterations:], start=iterations):
+                    interview = self.create_interview(seed)
+                    with open(path, "rb") as video:
+                        data = video.read()
+                    asyncio.run(self.run_websocket(application, interview.id, data, timer, timeout))
+        finally:
+            for patch in reversed(patches):
+                patch.stop()
+        return {"stages": timer.summary()}
+
+    def time_task(self, run):
+        # Celery tasks run inline inside the upload request; what remains of the request is ingest.
+        # Tasks queued by other tasks run nested and are only counted once.
+        @wraps(run)
+        def timed(*args, **kwargs):
+            self.task_depth += 1
+            start = time.perf_counter()
+            try:
+                return run(*args, **kwargs)
+            finally:
+                self.task_depth -= 1
+                if not self.task_depth:
+                    self.task_seconds += time.perf_counter() - start
+        return timed
+
+    async def run_websocket(self, application, interview_id, data, timer, timeout):
+        from channels.testing import WebsocketCommunicator
+
+        communicator = WebsocketCommunicator(
+            application, f"/ws/interviews/{interview_id}/", headers=[(b"origin", b"http://testserver")]
+        )
+        connected, _ = await communicator.connect(timeout)
+        if not connected:
+            raise CommandError("Websocket connection was rejected")
+        seen = set()
+        start = time.perf_counter()
+        await communicator.send_to(bytes_data=data)
+        try:
+            while "ws_qa_pairs" not in seen:
+                message = await communicator.receive_json_from(timeout)
+                stage = WEBSOCKET_STAGES.get("audio_text" if "audio_text" in message else message.get("type"))
+                if stage and stage not in seen:
+                    seen.add(stage)
+                    timer.add(stage, time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            raise CommandError(f"No QA pairs from the websocket after {timeout}s (got {sorted(seen)})")
+        finally:
+            await communicator.disconnect()
+
+    def report(self, results):
+        for duration, section in results["durations"].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{duration}s recordings (milliseconds)"))
+            self.stdout.write(f"  {'stage':<22}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+            for stage, stats in section["stages"].items():
+                self.stdout.write(
+                    f"  {stage:<22}{stats['count']:>5}"
+                    + "".join(f"{stats[key] * 1000:>10.1f}" for key in ("p50", "p95", "p99", "max"))
+                )
+        self.stdout.write(f"\nPeak RSS: {results['peak_rss_bytes'] / 1024 ** 2:.1f} MB")
+        self.stdout.write(f"Media stored: {results['disk_bytes'] / 1024 ** 2:.1f} MB")
+        if "io_write_bytes" in results:
+            self.stdout.write(f"Bytes written by this process: {results['io_write_bytes'] / 1024 ** 2:.1f} MB")
+
+    def compare(self, results, baseline, tolerance):
+        rows = compare_to_baseline(results, baseline, tolerance)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nAgainst the baseline (tolerance {tolerance:.0%})"))
+        regressions = []
+        for name, before, after, ratio, regressed in rows:
+            if name.endswith("bytes"):
+                before, after = f"{before / 1024 ** 2:.1f} MB", f"{after / 1024 ** 2:.1f} MB"
+            else:
+                before, after = f"{before * 1000:.1f} ms", f"{after * 1000:.1f} ms"
+            line = f"  {name:<30}{before:>14}{after:>14}{ratio:>+10.1%}"
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line + "  REGRESSION"))
+            else:
+                self.stdout.write(line)
+        if not rows:
+            self.stdout.write("  Nothing to compare; the baseline covers other recording lengths")
+        elif not regressions:
+            self.stdout.write(self.style.SUCCESS("  No regressions"))
+        return regressions
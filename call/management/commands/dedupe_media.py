@@ -0,0 +1,54 @@
+# call/management/commands/dedupe_media.py
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from call.blobstore import BLOB_DIR, blob_path, ingest, is_stored
+from call.models import InterviewChunk, ProcessingJob, ResumableUpload
+from call.uploadhandlers import file_sha256
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves media uploaded before the blob store existed (interview chunks, CVs) into it, "
+        "replacing identical copies with hard links. Safe to run repeatedly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directories", nargs="*", default=["interview", "cvs"],
+            help="Directories below MEDIA_ROOT to scan (default: interview cvs)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report how much space would be freed")
+
+    def handle(self, *args, directories, dry_run, **options):
+        seen = set()
+        files = reclaimed = 0
+        for directory in directories:
+            root = os.path.join(settings.MEDIA_ROOT, directory)
+            for dir_path, dir_names, file_names in os.walk(root):
+                dir_names[:] = [name for name in dir_names if name != BLOB_DIR]
+                for file_name in file_names:
+                    path = os.path.join(dir_path, file_name)
+                    if ResumableUpload.objects.filter(path=path, processing_job__isnull=True).exists():
+                        continue  # Still being uploaded
+                    checksum = file_sha256(path)
+                    if is_stored(path, checksum):
+                        continue
+                    files += 1
+                    if checksum in seen or os.path.exists(blob_path(checksum)):
+                        reclaimed += os.path.getsize(path)
+                    seen.add(checksum)
+                    if dry_run:
+                        continue
+                    stored_path, _ = ingest(path, checksum)
+                    if stored_path != path:
+                        # Hard link failed; point existing references at the blob
+                        InterviewChunk.objects.filter(path=path).update(path=stored_path)
+                        ProcessingJob.objects.filter(video_path=path).update(video_path=stored_path)
+                    InterviewChunk.objects.filter(path=stored_path, checksum="").update(checksum=checksum)
+
+        verb = "Would ingest" if dry_run else "Ingested"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {files} files, {reclaimed / 1024 ** 2:.1f} MB of duplicates {'to reclaim' if dry_run else 'reclaimed'}"
+        ))
+
@@ -0,0 +1,182 @@
+# call/media.py
+"""
+Playback of stored interview recordings.
+
+media_response() serves a file with HTTP Range support, so players can seek
+without downloading the whole recording. With settings.INTERVIEW_MEDIA_SENDFILE
+the transfer is handed to the front web server instead, which then takes
+care of ranges itself:
+
+    'x-accel-redirect'  nginx; INTERVIEW_MEDIA_ACCEL_PREFIX must be an internal
+                        location aliased to MEDIA_ROOT
+    'x-sendfile'        Apache mod_xsendfile, lighttpd
+
+concatenate_recording() joins an interview's chunks into one fast-start file
+with stream copy (no re-encoding).
+"""
+import logging
+import mimetypes
+import os
+import re
+import subprocess
+import tempfile
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, quote_etag
+
+
+logger = logging.getLogger(__name__)
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+STREAM_BLOCK_SIZE = 256 * 1024
+
+
+class ConcatenationError(Exception):
+    """Raised when ffmpeg cannot join the chunks of a recording."""
+
+
+def parse_range(header, size):
+    """
+    Parses a single-range Range header.
+
+    Args:
+        header: Value of the Range header, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-500"
+        size: Size of the file in bytes
+
+    Returns:
+        Tuple of (first byte, last byte) inclusive; None when the header is
+        absent, malformed or asks for several ranges (the whole file is sent);
+        or False when the range cannot be satisfied
+    """
+    match = RANGE_RE.match((header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length and size else False
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        return False
+    return first, last
+
+
+def _iter_file(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(STREAM_BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def _sendfile_response(path, content_type):
+    backend = settings.INTERVIEW_MEDIA_SENDFILE
+    response = HttpResponse(content_type=content_type)
+    if backend == "x-accel-redirect":
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+        response["X-Accel-Redirect"] = settings.INTERVIEW_MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + relative
+    elif backend == "x-sendfile":
+        response["X-Sendfile"] = os.path.abspath(path)
+    else:
+        raise ValueError(f"Unsupported INTERVIEW_MEDIA_SENDFILE '{backend}', expected 'x-accel-redirect' or 'x-sendfile'")
+    return response
+
+
+def media_response(request, path, content_type=None):
+    """
+    Builds the response serving a stored media file.
+
+    Args:
+        request: The incoming request (its Range and If-Range headers are honored)
+        path: Path of the file below MEDIA_ROOT
+        content_type: MIME type, guessed from the file name when not given
+
+    Returns:
+        200 response with the whole file, 206 with the requested range, or
+        416 when the range lies outside the file
+    """
+    content_type = content_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if settings.INTERVIEW_MEDIA_SENDFILE:
+        return _sendfile_response(path, content_type)
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = quote_etag(f"{stat.st_mtime_ns:x}-{size:x}")
+    byte_range = parse_range(request.headers.get("Range"), size)
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        byte_range = None  # The client's copy is outdated; send the whole file
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif byte_range is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(_iter_file(path, first, last - first + 1), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Content-Length"] = str(last - first + 1)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
+
+
+def ffmpeg_concat_command(list_path, output_path, output_format):
+    """Builds the ffmpeg command joining the files in a concat list with stream copy."""
+    command = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-c", "copy",
+    ]
+    if output_format == "mp4":
+        command += ["-movflags", "+faststart"]  # Index at the front so playback and seeking start immediately
+    return command + ["-f", output_format, output_path]
+
+
+def concatenate_recording(paths, output_path):
+    """
+    Joins recording chunks into one file without re-encoding. MP4 is tried
+    first; chunks whose codecs MP4 cannot hold (e.g. VP8 from MediaRecorder)
+    are joined into WebM instead.
+
+    Args:
+        paths: Chunk paths in playback order
+        output_path: Path of the joined file, without extension
+
+    Returns:
+        Path of the joined file (output_path plus ".mp4" or ".webm")
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as concat_list:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            concat_list.write(f"file '{escaped}'\n")
+    try:
+        errors = []
+        for output_format, extension in (("mp4", ".mp4"), ("webm", ".webm")):
+            target = output_path + extension
+            # A file of its own, so concurrent joins of the same interview cannot mix their output
+            fd, partial = tempfile.mkstemp(suffix=f"{extension}.part", dir=os.path.dirname(target) or ".")
+            os.close(fd)
+            result = subprocess.run(
+                ffmpeg_concat_command(concat_list.name, partial, output_format),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+            if result.returncode == 0:
+                os.replace(partial, target)
+                return target
+            if os.path.exists(partial):
+                os.remove(partial)
+            errors.append(f"{output_format}: {result.stderr.decode(errors='replace').strip()}")
+        raise ConcatenationError("; ".join(errors))
+    finally:
+        os.remove(concat_list.name)
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('call', '0005_processingjob_checksum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InferenceCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=128)),
+                ('value', models.JSONField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('last_used_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['namespace', 'last_used_at'], name='call_infere_namespa_e2fefd_idx')],
+                'constraints': [models.UniqueConstraint(fields=('namespace', 'key'), name='unique_inference_cache_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('call', '0006_inferencecacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inferencecacheentry',
+            name='tag',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:01
+
+import django.db.models.deletion
+import django.utils.timezone
+import re
+from django.db import migrations, models
+
+
+def _to_float(value):
+    match = re.search(r"-?\d+(?:\.\d+)?", str(value))
+    return float(match.group()) if match else None
+
+
+def copy_verbal_scores(apps, schema_editor):
+    # Move EvaluationResult.verbal_scores ({question text: score}) into QuestionScore rows
+    EvaluationResult = apps.get_model('call', 'EvaluationResult')
+    ProcessingJob = apps.get_model('call', 'ProcessingJob')
+    QuestionScore = apps.get_model('call', 'QuestionScore')
+
+    rows = []
+    results = EvaluationResult.objects.select_related('interview__applicant_job_pipeline_id__jobId')
+    for result in results.iterator():
+        questions = list(result.interview.applicant_job_pipeline_id.jobId.questions or [])
+        for question, score in (result.verbal_scores or {}).items():
+            if question not in questions:
+                questions.append(question)  # Question was removed from the job opening since
+            rows.append(QuestionScore(
+                interview_id=result.interview_id,
+                question_index=questions.index(question),
+                question=question,
+                score=_to_float(score),
+            ))
+    QuestionScore.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+    jobs = ProcessingJob.objects.select_related('interview__applicant_job_pipeline_id__jobId')
+    updated = []
+    for job in jobs.iterator():
+        questions = job.interview.applicant_job_pipeline_id.jobId.questions or []
+        if job.question in questions:
+            job.question_index = questions.index(job.question)
+            updated.append(job)
+    ProcessingJob.objects.bulk_update(updated, ['question_index'], batch_size=500)
+
+
+def restore_verbal_scores(apps, schema_editor):
+    EvaluationResult = apps.get_model('call', 'EvaluationResult')
+    QuestionScore = apps.get_model('call', 'QuestionScore')
+    for result in EvaluationResult.objects.iterator():
+        scores = QuestionScore.objects.filter(interview_id=result.interview_id).order_by('question_index')
+        result.verbal_scores = {row.question: str(row.score) for row in scores if row.score is not None}
+        result.save(update_fields=['verbal_scores'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('call', '0007_inferencecacheentry_tag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='question_index',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='QuestionScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_index', models.PositiveIntegerField()),
+                ('question', models.TextField()),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('answered_at', models.DateTimeField(blank=True, null=True)),
+                ('scored_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('interview', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_scores', to='call.interview')),
+                ('processing_job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='question_scores', to='call.processingjob')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('interview', 'question_index'), name='unique_question_score')],
+            },
+        ),
+        migrations.RunPython(copy_verbal_scores, restore_verbal_scores),
+        migrations.RemoveField(
+            model_name='evaluationresult',
+            name='verbal_scores',
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:02
+
+import os
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_video_files(apps, schema_editor):
+    # Turn Interview.video_file (a list of paths) into InterviewChunk rows and link the processing jobs
+    Interview = apps.get_model('call', 'Interview')
+    InterviewChunk = apps.get_model('call', 'InterviewChunk')
+    ProcessingJob = apps.get_model('call', 'ProcessingJob')
+
+    for interview in Interview.objects.exclude(video_file=[]).iterator():
+        jobs = {job.video_path: job for job in ProcessingJob.objects.filter(interview_id=interview.id)}
+        chunks = []
+        for seq, path in enumerate(interview.video_file or [], start=1):
+            job = jobs.get(path)
+            chunks.append(InterviewChunk(
+                interview_id=interview.id,
+                seq=seq,
+                path=path,
+                size=os.path.getsize(path) if os.path.exists(path) else 0,
+                checksum=job.checksum if job else '',
+                question=job.question if job else '',
+                # Chunks uploaded before background processing were processed in the request
+                state=job.status if job else 'Completed',
+            ))
+        for chunk in InterviewChunk.objects.bulk_create(chunks):
+            job = jobs.get(chunk.path)
+            if job:
+                job.chunk_id = chunk.id
+                job.save(update_fields=['chunk'])
+
+
+def restore_video_files(apps, schema_editor):
+    Interview = apps.get_model('call', 'Interview')
+    InterviewChunk = apps.get_model('call', 'InterviewChunk')
+    for interview in Interview.objects.iterator():
+        interview.video_file = list(
+            InterviewChunk.objects.filter(interview_id=interview.id).order_by('seq').values_list('path', flat=True)
+        )
+        interview.save(update_fields=['video_file'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('call', '0008_questionscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('path', models.CharField(max_length=500)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('checksum', models.CharField(blank=True, default='', max_length=64)),
+                ('question', models.TextField(blank=True, default='')),
+                ('state', models.CharField(choices=[('Pending', 'Pending'), ('Processing', 'Processing'), ('Completed', 'Completed'), ('Failed', 'Failed')], default='Pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('interview', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='call.interview')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='processingjob',
+            name='chunk',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='processing_jobs', to='call.interviewchunk'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewchunk',
+            index=models.Index(fields=['interview', 'state'], name='call_interv_intervi_256d94_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='interviewchunk',
+            constraint=models.UniqueConstraint(fields=('interview', 'seq'), name='unique_interview_chunk_seq'),
+        ),
+        migrations.RunPython(copy_video_files, restore_video_files),
+        migrations.RemoveField(
+            model_name='interview',
+            name='video_file',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('call', '0011_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interview',
+            name='recording_chunks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interview',
+            name='recording_path',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('call', '0013_evaluationresult_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evaluationresult',
+            name='report_inputs_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='evaluationresult',
+            name='score_statistics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('call', '0014_evaluationresult_report_inputs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interview',
+            name='recording_joining_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from Job_opening.models import ApplicantResponse
 import os
+import uuid
 from django.utils import timezone
 
 
@@ -9,18 +10,193 @@ def interview_video_upload_path(instance, filename):
     timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
     return f"Interview/{instance.id}/vid_{timestamp}.mp4"
 
+PROCESSING_STATES = (("Pending", "Pending"), ("Processing", "Processing"), ("Completed", "Completed"), ("Failed", "Failed"))
+
+
 class Interview(models.Model):
     applicant_job_pipeline_id = models.ForeignKey(ApplicantResponse, on_delete=models.CASCADE)
-    video_file = models.JSONField(default=list)
     status = models.CharField(max_length=20, default="In Progress")
     created_at = models.DateTimeField(auto_now_add=True)
+    recording_path = models.CharField(max_length=500, blank=True, default="")  # All chunks joined for playback
+    recording_chunks = models.PositiveIntegerField(default=0)  # Number of chunks the recording covers
+    recording_joining_since = models.DateTimeField(null=True, blank=True)  # Set while a join task is queued or running
     
     def __str__(self):
         return f"Interview {self.id} for {self.applicant_job_pipeline_id}"
+
+    @property
+    def video_file(self):
+        """Paths of the uploaded chunks in upload order (read from InterviewChunk)."""
+        return list(self.chunks.order_by("seq").values_list("path", flat=True))
+
+    @property
+    def recording_ready(self):
+        """Whether the joined recording exists and covers every uploaded chunk."""
+        return bool(self.recording_path) and self.recording_chunks == self.chunks.count()
     
 
+class InterviewChunk(models.Model):
+    """One uploaded recording chunk of an interview, numbered in upload order."""
+    interview = models.ForeignKey(Interview, on_delete=models.CASCADE, related_name="chunks")
+    seq = models.PositiveIntegerField()  # 1, 2, ... per interview
+    path = models.CharField(max_length=500)
+    size = models.PositiveBigIntegerField(default=0)  # Bytes
+    duration = models.FloatField(null=True, blank=True)  # Seconds, filled in once the chunk is processed
+    checksum = models.CharField(max_length=64, blank=True, default="")  # SHA-256 of the file
+    question = models.TextField(blank=True, default="")
+    state = models.CharField(max_length=20, choices=PROCESSING_STATES, default="Pending")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["interview", "seq"], name="unique_interview_chunk_seq"),
+        ]
+        indexes = [
+            models.Index(fields=["interview", "state"]),  # Chunks still to process
+        ]
+
+    def __str__(self):
+        return f"Chunk {self.seq} of interview {self.interview_id} ({self.state})"
+
+    @classmethod
+    def register(cls, interview, attempts=5, **fields):
+        """
+        Inserts the next chunk of an interview. Concurrent uploads can pick the same
+        sequence number; the loser's insert violates the unique constraint and is retried.
+        """
+        for attempt in range(attempts):
+            last_seq = cls.objects.filter(interview=interview).aggregate(last=models.Max("seq"))["last"] or 0
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(interview=interview, seq=last_seq + 1, **fields)
+            except IntegrityError:
+                if attempt == attempts - 1:
+                    raise
+
+
 class EvaluationResult(models.Model):
     interview = models.OneToOneField(Interview, on_delete=models.CASCADE)
-    verbal_scores = models.JSONField(default=dict)
     non_verbal_scores = models.JSONField(default=dict)
-    final_report = models.JSONField(default=dict)
+    final_report = models.JSONField(default=dict)  # LLM narrative (strengths, skill gaps, ...)
+    score_statistics = models.JSONField(default=dict, blank=True)  # Average, min, max and distribution of the answer scores
+    report_inputs_hash = models.CharField(max_length=64, blank=True, default="")  # Scores and job description the report was generated from
+    updated_at = models.DateTimeField(auto_now=True)  # Also moved by touch() when answer scores change
+
+    @classmethod
+    def touch(cls, interview_id):
+        """Marks the report of an interview as changed, e.g. after its QuestionScore rows were written."""
+        cls.objects.filter(interview_id=interview_id).update(updated_at=timezone.now())
+
+    @property
+    def verbal_scores(self):
+        """Answer scores by question text, in question order (read from QuestionScore)."""
+        return dict(
+            QuestionScore.objects.filter(interview_id=self.interview_id, score__isnull=False)
+            .order_by("question_index")
+            .values_list("question", "score")
+        )
+
+    def score_summary(self):
+        """Average, highest and lowest answer score and the number of scored answers, in one aggregate query."""
+        return QuestionScore.objects.filter(interview_id=self.interview_id, score__isnull=False).aggregate(
+            average=models.Avg("score"),
+            highest=models.Max("score"),
+            lowest=models.Min("score"),
+            answered=models.Count("id"),
+        )
+
+
+class ProcessingJob(models.Model):
+    """Tracks the background processing of one uploaded interview chunk."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    interview = models.ForeignKey(Interview, on_delete=models.CASCADE, related_name="processing_jobs")
+    chunk = models.ForeignKey(
+        InterviewChunk, on_delete=models.CASCADE, null=True, blank=True, related_name="processing_jobs"
+    )
+    question = models.TextField()
+    question_index = models.PositiveIntegerField(null=True, blank=True)  # Position of the question in JobOpening.questions
+    video_path = models.CharField(max_length=500)
+    checksum = models.CharField(max_length=64, blank=True, default="")  # SHA-256 of the uploaded chunk
+    final_flag = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=PROCESSING_STATES, default="Pending")
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ProcessingJob {self.id} ({self.status}) for interview {self.interview_id}"
+
+
+class ResumableUpload(models.Model):
+    """An interview chunk uploaded over several requests; becomes an InterviewChunk once finalized."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    interview = models.ForeignKey(Interview, on_delete=models.CASCADE, related_name="resumable_uploads")
+    question = models.TextField()
+    question_index = models.PositiveIntegerField()
+    final_flag = models.BooleanField(default=False)
+    path = models.CharField(max_length=500)
+    length = models.PositiveBigIntegerField()  # Declared total size in bytes
+    offset = models.PositiveBigIntegerField(default=0)  # Bytes received so far
+    processing_job = models.OneToOneField(
+        ProcessingJob, on_delete=models.SET_NULL, null=True, blank=True, related_name="resumable_upload"
+    )  # Set when the upload is finalized
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ResumableUpload {self.id} ({self.offset}/{self.length} bytes) for interview {self.interview_id}"
+
+
+class QuestionScore(models.Model):
+    """Score of one answered interview question; there is one row per interview and question."""
+    interview = models.ForeignKey(Interview, on_delete=models.CASCADE, related_name="question_scores")
+    question_index = models.PositiveIntegerField()  # Position of the question in JobOpening.questions
+    question = models.TextField()
+    score = models.FloatField(null=True, blank=True)  # None when the evaluation was not a number
+    processing_job = models.ForeignKey(
+        ProcessingJob, on_delete=models.SET_NULL, null=True, blank=True, related_name="question_scores"
+    )  # Upload whose transcript was scored
+    answered_at = models.DateTimeField(null=True, blank=True)  # When the answer was uploaded
+    scored_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["interview", "question_index"], name="unique_question_score"),
+        ]
+
+    def __str__(self):
+        return f"Question {self.question_index} of interview {self.interview_id}: {self.score}"
+
+
+class InferenceCacheEntry(models.Model):
+    """A cached inference result (e.g. a transcript) keyed by a content hash."""
+    namespace = models.CharField(max_length=50)
+    key = models.CharField(max_length=128)
+    value = models.JSONField()
+    tag = models.CharField(max_length=100, blank=True, default="", db_index=True)  # e.g. "job:<id>", for bulk invalidation
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    last_used_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["namespace", "key"], name="unique_inference_cache_key"),
+        ]
+        indexes = [
+            models.Index(fields=["namespace", "last_used_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.namespace}:{self.key}"
+
+
+class MediaBlob(models.Model):
+    """A file in the content-addressed media store (see call/blobstore.py) and its reference count."""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()  # Bytes
+    refcount = models.PositiveIntegerField(default=0)  # Interview chunks and CVs linking to the blob
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Blob {self.sha256} ({self.size} bytes, {self.refcount} references)"
@@ -0,0 +1,150 @@
+# call/nonverbal.py
+"""
+Non-verbal analysis of interview recordings.
+
+Only keyframes are decoded (ffmpeg -skip_frame nokey), thinned to at most
+MAX_FPS and downscaled to a small grayscale frame, so the cost per recording
+is bounded by its keyframe count rather than its frame count. Frames are read
+from the ffmpeg pipe in batches and every metric except face detection is
+computed on the whole batch at once with NumPy:
+
+    face_presence  Share of frames with a detected face (OpenCV Haar cascade)
+    centering      How close the face is to the frame center (1 = centered)
+    motion         Mean absolute change between consecutive sampled frames (0-1)
+    lighting       Share of frames that are neither too dark/bright nor flat
+"""
+import logging
+import subprocess
+import cv2
+import numpy as np
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+_face_cascade = None
+
+
+def _get_face_cascade():
+    global _face_cascade
+    if _face_cascade is None:
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    return _face_cascade
+
+
+def ffmpeg_keyframes_command(video_path, width, height, max_fps):
+    """Builds the ffmpeg command writing sampled grayscale keyframes of `video_path` as raw video to stdout."""
+    return [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-skip_frame", "nokey",  # Decode keyframes only
+        "-i", video_path,
+        "-an",
+        "-vf", (
+            f"select='isnan(prev_selected_t)+gte(t-prev_selected_t\\,{1 / max_fps:.3f})',"
+            f"scale={width}:{height},format=gray"
+        ),
+        "-fps_mode", "vfr",
+        "-f", "rawvideo",
+        "pipe:1"
+    ]
+
+
+def iter_keyframe_batches(video_path, width, height, max_fps, batch_size):
+    """
+    Yields sampled keyframes of a recording in batches.
+
+    Yields:
+        uint8 NumPy arrays of shape (frames, height, width)
+    """
+    frame_size = width * height
+    process = subprocess.Popen(
+        ffmpeg_keyframes_command(video_path, width, height, max_fps),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    try:
+        while True:
+            data = process.stdout.read(frame_size * batch_size)
+            count = len(data) // frame_size
+            if count:
+                yield np.frombuffer(data[:count * frame_size], dtype=np.uint8).reshape(count, height, width)
+            if len(data) < frame_size * batch_size:
+                break
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read().decode(errors="replace").strip()
+        if process.wait() != 0:
+            logger.warning(f"FFmpeg could not decode all frames of {video_path}: {stderr}")
+
+
+def _face_metrics(frames):
+    # Largest face per frame: presence flag and distance of its center from the frame center
+    cascade = _get_face_cascade()
+    height, width = frames.shape[1:]
+    min_size = (max(12, width // 10), max(12, width // 10))
+    presence = np.zeros(len(frames), dtype=bool)
+    offsets = np.zeros(len(frames))
+    for index, frame in enumerate(frames):
+        faces = cascade.detectMultiScale(frame, scaleFactor=1.15, minNeighbors=4, minSize=min_size)
+        if len(faces):
+            x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+            presence[index] = True
+            offsets[index] = np.hypot((x + w / 2) / width - 0.5, (y + h / 2) / height - 0.5) / np.hypot(0.5, 0.5)
+    return presence, offsets
+
+
+def analyze_video(video_path):
+    """
+    Computes non-verbal metrics for a recording.
+
+    Args:
+        video_path: Path to the video file
+
+    Returns:
+        Dict with frames analyzed, face_presence, centering, motion, lighting
+        (all 0-1) and a combined score between 0-10, or None when no frame
+        could be decoded
+    """
+    options = settings.INTERVIEW_NON_VERBAL
+    width, height = options["FRAME_WIDTH"], options["FRAME_HEIGHT"]
+
+    frame_count = 0
+    face_frames = 0
+    offset_sum = 0.0
+    motion_sum = 0.0
+    well_lit = 0
+    previous = None
+    for batch in iter_keyframe_batches(video_path, width, height, options["MAX_FPS"], options["BATCH_SIZE"]):
+        brightness = batch.mean(axis=(1, 2))
+        contrast = batch.std(axis=(1, 2))
+        well_lit += int(np.count_nonzero((brightness >= 60) & (brightness <= 200) & (contrast >= 20)))
+
+        frames = batch.astype(np.int16)
+        if previous is not None:
+            frames = np.concatenate([previous[None], frames])
+        motion_sum += float(np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2)).sum()) / 255
+        previous = frames[-1]
+
+        presence, offsets = _face_metrics(batch)
+        face_frames += int(presence.sum())
+        offset_sum += float(offsets[presence].sum())
+        frame_count += len(batch)
+
+    if not frame_count:
+        return None
+
+    face_presence = face_frames / frame_count
+    centering = 1 - offset_sum / face_frames if face_frames else 0.0
+    motion = motion_sum / (frame_count - 1) if frame_count > 1 else 0.0
+    lighting = well_lit / frame_count
+    # Steady, centered, visible and well lit; motion above ~25% change per frame counts as restless
+    score = 10 * (0.4 * face_presence + 0.25 * centering + 0.2 * lighting + 0.15 * (1 - min(motion * 4, 1)))
+    return {
+        "frames": frame_count,
+        "face_presence": round(face_presence, 3),
+        "centering": round(centering, 3),
+        "motion": round(motion, 3),
+        "lighting": round(lighting, 3),
+        "score": round(score, 1),
+    }
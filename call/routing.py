@@ -2,5 +2,5 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
-    re_path(r'ws/video/(?P<room_key>\w+)/$', consumers.InterviewConsumer.as_asgi()),
-]
\ No newline at end of file
+    re_path(r'ws/interviews/(?P<interview_id>\d+)/$', consumers.InterviewConsumer.as_asgi()),
+]
@@ -0,0 +1,245 @@
+# call/scheduler.py
+"""
+Rate-limited, prioritized scheduler for LLM calls.
+
+Every process runs one scheduler on a dedicated event loop thread. Sync code
+(views, Celery tasks) and async code (consumers) submit coroutine functions to
+it; they run concurrently up to MAX_CONCURRENCY while staying inside the
+configured requests-per-minute and tokens-per-minute budget. When calls have
+to queue, interactive work (answer scoring) is started before report generation.
+A call first waits for its share of the rate budget, in priority order, and
+only then takes a concurrency slot, so throttled calls never hold a slot while
+they sleep.
+
+Budgets are per process: with N worker processes, configure roughly 1/N of the
+provider limit.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REPORT = 10
+
+
+def estimate_tokens(messages, completion_tokens=256):
+    """Rough token estimate (about 4 characters per token) used for the tokens-per-minute budget."""
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return prompt_chars // 4 + completion_tokens
+
+
+class TokenBucket:
+    """
+    Bucket refilled continuously at `per_minute` units per minute.
+
+    Callers ask how long until `amount` is available and take it once it is;
+    the scheduler decides who gets to take next.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.available = float(per_minute or 0)
+        self.rate = (per_minute or 0) / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` can be taken."""
+        if not self.capacity or not amount:
+            return 0.0  # Unlimited, or nothing to take
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.available) / self.rate)
+
+    def take(self, amount):
+        if self.capacity and amount:
+            self._refill()
+            self.available -= min(amount, self.capacity)
+
+
+class InferenceScheduler:
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, max_concurrency=8):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self._in_flight = 0
+        self._waiting = []  # Heap of (priority, sequence, future) waiting for a slot
+        self._budget_waiting = []  # Heap of [priority, sequence, future] waiting for rate budget
+        self._sequence = itertools.count()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+            "throttled": 0,
+            "throttle_seconds": 0.0,
+            "total_queue_seconds": 0.0,
+        }
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    async def _acquire_slot(self, priority):
+        if self._in_flight < self.max_concurrency and not self._waiting:
+            self._in_flight += 1
+            return
+        waiter = self._loop.create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), waiter))
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._waiting))
+        try:
+            await waiter  # The slot is handed over directly by _release_slot
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self):
+        while self._waiting:
+            _, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _wake_budget_head(self):
+        # The first waiter re-checks the budget, e.g. after the one ahead of it left
+        if self._budget_waiting and not self._budget_waiting[0][2].done():
+            self._budget_waiting[0][2].set_result(None)
+
+    async def _wait_for_budget(self, priority, tokens, requests):
+        """
+        Waits until the rate budget covers the call and takes it. Only the
+        highest-priority waiter takes budget; a more urgent call arriving
+        while it sleeps goes ahead of it.
+
+        Returns:
+            Seconds spent waiting for budget
+        """
+        if not max(self.requests.wait_time(requests), self.tokens.wait_time(tokens)) and not self._budget_waiting:
+            self.requests.take(requests)
+            self.tokens.take(tokens)
+            return 0.0
+
+        entry = [priority, next(self._sequence), self._loop.create_future()]
+        previous_head = self._budget_waiting[0] if self._budget_waiting else None
+        heapq.heappush(self._budget_waiting, entry)
+        if previous_head is not None and self._budget_waiting[0] is entry and not previous_head[2].done():
+            previous_head[2].set_result(None)  # Overtaken while sleeping on budget this call now gets first
+        start = time.monotonic()
+        try:
+            while True:
+                delay = None  # Not first: wait to be woken
+                if self._budget_waiting[0] is entry:
+                    delay = max(self.requests.wait_time(requests), self.tokens.wait_time(tokens))
+                    if not delay:
+                        self.requests.take(requests)
+                        self.tokens.take(tokens)
+                        return time.monotonic() - start
+                entry[2] = self._loop.create_future()
+                await asyncio.wait([entry[2]], timeout=delay)
+        finally:
+            self._budget_waiting.remove(entry)
+            heapq.heapify(self._budget_waiting)
+            self._wake_budget_head()
+
+    async def _run(self, func, args, kwargs, priority, tokens, requests):
+        enqueued = time.monotonic()
+        self._stats["submitted"] += 1
+        throttled = await self._wait_for_budget(priority, tokens, requests)
+        if throttled:
+            self._stats["throttled"] += 1
+            self._stats["throttle_seconds"] += throttled
+            logger.info(f"Rate budget exhausted, inference call was delayed by {throttled:.2f}s")
+        await self._acquire_slot(priority)
+        try:
+            self._stats["total_queue_seconds"] += time.monotonic() - enqueued
+            result = await func(*args, **kwargs)
+            self._stats["completed"] += 1
+            return result
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._release_slot()
+
+    def submit(self, func, *args, priority=PRIORITY_INTERACTIVE, tokens=0, requests=1, **kwargs):
+        """
+        Schedules `func(*args, **kwargs)` (a coroutine function) on the scheduler loop.
+
+        Args:
+            func: Coroutine function performing the inference call
+            priority: PRIORITY_INTERACTIVE or PRIORITY_REPORT (lower runs first)
+            tokens: Estimated tokens consumed by the call
+            requests: Requests counted against the requests-per-minute budget (0 to exempt the call)
+
+        Returns:
+            concurrent.futures.Future resolving to the call's result
+        """
+        return asyncio.run_coroutine_threadsafe(self._run(func, args, kwargs, priority, tokens, requests), self._loop)
+
+    def metrics(self):
+        """Returns queue depth, in-flight calls and throttling counters."""
+        stats = dict(self._stats)
+        started = stats["completed"] + stats["failed"]
+        stats["queue_depth"] = len(self._waiting)
+        stats["throttled_waiting"] = len(self._budget_waiting)
+        stats["in_flight"] = self._in_flight
+        stats["avg_queue_seconds"] = round(stats.pop("total_queue_seconds") / started, 3) if started else 0.0
+        stats["throttle_seconds"] = round(stats["throttle_seconds"], 3)
+        return stats
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_scheduler = None
+_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Returns the process-wide scheduler configured by settings.INFERENCE_SCHEDULER.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _lock:
+            if _scheduler is None:
+                config = settings.INFERENCE_SCHEDULER
+                _scheduler = InferenceScheduler(
+                    requests_per_minute=config.get("REQUESTS_PER_MINUTE", 0),
+                    tokens_per_minute=config.get("TOKENS_PER_MINUTE", 0),
+                    max_concurrency=config.get("MAX_CONCURRENCY", 8),
+                )
+    return _scheduler
+
+
+def _reset_after_fork():
+    # The loop thread does not survive fork; start a fresh scheduler lazily
+    global _scheduler, _lock
+    _lock = threading.Lock()
+    _scheduler = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    global _scheduler
+    if setting == "INFERENCE_SCHEDULER" and _scheduler is not None:
+        _scheduler.close()
+        _scheduler = None
@@ -1,12 +1,21 @@
 from rest_framework import serializers
-from .models import Interview, EvaluationResult
+from .models import Interview, EvaluationResult, ProcessingJob
 
 class InterviewSerializer(serializers.ModelSerializer):
+    video_file = serializers.ListField(child=serializers.CharField(), read_only=True)  # From InterviewChunk
+
     class Meta:
         model = Interview
         fields = ['applicant_job_pipeline_id','status', 'video_file', 'created_at']
 
 class EvaluationResultSerializer(serializers.ModelSerializer):
+    verbal_scores = serializers.DictField(child=serializers.FloatField(), read_only=True)  # From QuestionScore
+
     class Meta:
         model = EvaluationResult
-        fields = ['interview','verbal_scores', 'final_report']
\ No newline at end of file
+        fields = ['interview','verbal_scores', 'score_statistics', 'final_report']
+
+class ProcessingJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProcessingJob
+        fields = ['id', 'interview', 'question', 'checksum', 'final_flag', 'status', 'result', 'error', 'created_at', 'updated_at']
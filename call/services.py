@@ -1,67 +1,135 @@
-import tempfile
-import os
+import hashlib
+import json
+import re
 import subprocess
-import openai
 from django.conf import settings
+from .audio import AudioExtractionError, prepare_speech
+from .inference import create_chat_completion, submit_chat_completion, transcribe
+from .transcription import transcribe_segments
+from .scheduler import PRIORITY_INTERACTIVE
+from .cache import get_result_cache
 
-def extract_audio_and_process(video_path):
+# Sentinel prefixes returned by extract_audio_and_process/speech_to_text on failure
+TRANSCRIPTION_ERRORS = ("Error extracting audio", "Processing failed", "Transcription failed")
+
+WHISPER_MODEL = "whisper-1"
+SCORING_MODEL = "gpt-4"  # Using a more advanced model for evaluation
+SCORING_SYSTEM_PROMPT = "You are an expert hiring manager with exceptional skills in candidate evaluation."
+SCORING_CRITERIA = (
+    "Evaluation Criteria:\n"
+    "- Relevance to job requirements (30% weight)\n"
+    "- Technical accuracy for QA roles (25% weight)\n" 
+    "- Problem-solving approach (20% weight)\n"
+    "- Communication clarity (15% weight)\n"
+    "- Alignment with QA best practices (10% weight)\n\n"
+)
+
+
+def extract_audio_and_process(video_path, checksum=None, audio_stats=None):
         """
         Extracts audio from the video file and processes it for speech-to-text.
+        The audio is piped from ffmpeg into memory and sent to the transcription
+        backend without touching the disk; pauses are trimmed first, silent
+        recordings are not transcribed at all and long recordings are split
+        into segments that are transcribed in parallel (see call/audio.py).
+        Transcripts are cached by the SHA-256 of the media (when known) or of the
+        extracted audio, so identical recordings are only transcribed once.
         
         Args:
             video_path: Path to the video file
+            checksum: Optional SHA-256 of the video file computed at upload time
+            audio_stats: Optional dict that receives the silence trimming stats and
+                the timestamped segment transcripts under "segments"
             
         Returns:
             Transcribed text from the extracted audio
         """
+        transcript_cache = get_result_cache("transcripts")
+        media_key = f"{WHISPER_MODEL}:media:{checksum}" if checksum else None
+        if media_key:
+            cached = transcript_cache.get(media_key)
+            if cached is not None:
+                print(f"Using cached transcript for {video_path}")
+                return cached
+
         print(f"Extracting audio from video file: {video_path}")
         
-        # Create a temporary file for the extracted audio
-        temp_audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        temp_audio_path = temp_audio_file.name
-        temp_audio_file.close()
-        
         try:
-            # Use FFmpeg to extract audio from the video file
-            command = [
-                "ffmpeg",
-                "-i", video_path,
-                "-vn",  # No video
-                "-ac", "1",  # Mono channel
-                "-ar", "12000",  # Sampling rate (12kHz for Whisper)
-                "-b:a", "16k",  # Bitrate (16 kbps)
-                "-y", temp_audio_path  # Overwrite output file if exists
-            ]
-            
-            print("Running FFmpeg command:", ' '.join(command))
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            segments, stats = prepare_speech(video_path)
+            if audio_stats is not None:
+                audio_stats.update(stats)
+            if not segments:
+                print(f"No speech detected in {video_path}, skipping transcription")
+                if media_key:
+                    transcript_cache.set(media_key, "")
+                return ""
+            print(f"Trimmed {stats.get('trimmed_ratio', 0):.0%} of the audio as silence")
 
-            if result.returncode != 0:
-                print("FFmpeg error:", result.stderr.decode())
-                return "Error extracting audio"
+            if not media_key:
+                digest = hashlib.sha256()
+                for _, _, (_, data) in segments:
+                    digest.update(data)
+            audio_key = media_key or f"{WHISPER_MODEL}:audio:{digest.hexdigest()}"
+            if not media_key:
+                cached = transcript_cache.get(audio_key)
+                if cached is not None:
+                    print(f"Using cached transcript for {video_path}")
+                    return cached
 
-            # Process the extracted audio for speech-to-text (STT)
-            audio_text = speech_to_text(temp_audio_path)
+            # Process the extracted audio for speech-to-text (STT), segments in parallel
+            audio_text, timeline = transcribe_segments(segments, WHISPER_MODEL)
+            if audio_stats is not None:
+                audio_stats["segments"] = timeline
+            transcript_cache.set(audio_key, audio_text)
             print(f"Transcribed audio text: {audio_text}")
             return audio_text
 
-        except subprocess.CalledProcessError as e:
-            print(f"FFmpeg error: {e.stderr.decode()}")
-            return f"Error extracting audio: {e.stderr.decode()}"
+        except AudioExtractionError as e:
+            print(f"FFmpeg error: {e}")
+            return f"Error extracting audio: {e}"
         
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
             return f"Processing failed: {str(e)}"
+    
+def probe_duration(media_path):
+    """
+    Returns the duration of a media file in seconds using ffprobe.
+    
+    Args:
+        media_path: Path to the audio or video file
+        
+    Returns:
+        Duration in seconds, or None if it could not be determined
+    """
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        media_path
+    ]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return float(result.stdout.decode().strip())
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        print(f"Could not determine duration of {media_path}: {e}")
+        return None
 
-        finally:
-            # Clean up temporary files
-            if os.path.exists(temp_audio_path):
-                try:
-                    os.remove(temp_audio_path)
-                    print(f"Deleted temporary audio file: {temp_audio_path}")
-                except Exception as e:
-                    print(f"Error deleting temp file: {str(e)}")
+def transcribe_audio(audio_path):
+    """
+    Transcribes an audio file with the configured inference backend, raising on failure.
     
+    Args:
+        audio_path: Path to the audio file
+        
+    Returns:
+        Transcribed text from the audio
+    """
+    print(f"Transcribing audio from: {audio_path}")
+    with open(audio_path, "rb") as audio_file:
+        return transcribe(audio_file, WHISPER_MODEL)
+
 def speech_to_text(audio_path):
     """
     Converts audio to text using OpenAI's Whisper API.
@@ -72,19 +140,8 @@ def speech_to_text(audio_path):
     Returns:
         Transcribed text from the audio
     """
-    client = openai.OpenAI(api_key=settings.OPEN_AI_KEY)
-
-    print(f"Transcribing audio from: {audio_path}")
-    
     try:
-        with open(audio_path, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
-                file=audio_file,
-                model="whisper-1",
-                response_format="text"
-            )
-        
-        return transcription
+        return transcribe_audio(audio_path)
     
     except Exception as e:
         print(f"Error during transcription: {e}")
@@ -170,30 +227,62 @@ def speech_to_text(audio_path):
 #         print(f"Error during QA extraction: {e}")
 #         return [{"error": f"QA extraction failed: {str(e)}"}]
 
-def calculate_candidate_score(job_description, question, answer):
+def parse_score(evaluation):
+    """
+    Returns the numeric score in a scoring model answer such as "7.5" or "Score: 7.5/10",
+    or None when it contains no number.
+    """
+    match = re.search(r"-?\d+(?:\.\d+)?", str(evaluation))
+    return float(match.group()) if match else None
+
+
+def normalize_answer(answer):
+    """Collapses whitespace and case so trivially different transcripts share a cache entry."""
+    return re.sub(r"\s+", " ", str(answer)).strip().casefold()
+
+
+def score_cache_key(job_description, question, answer, model=SCORING_MODEL):
+    """
+    Builds the scoring cache key from the job description payload, the question
+    and the normalized answer. The model name is part of the key so scores from
+    different models are never mixed.
+    """
+    digest = hashlib.sha256()
+    for part in (json.dumps(job_description, sort_keys=True, default=str), question, normalize_answer(answer)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f"{model}:{digest.hexdigest()}"
+
+
+def calculate_candidate_score(job_description, question, answer, job_opening_id=None):
     """
     Calculate a candidate score based on the interview QA pairs.
+    Scores are memoized per (job description, question, normalized answer, model);
+    entries are tagged with the job opening so they can be invalidated when it changes.
     
     Args:
-        qa_pairs: Structured QA pairs from the interview
+        job_description: JobDescriptionSerializer payload of the job opening
+        question: The interview question that was answered
+        answer: Transcript of the candidate's answer
+        job_opening_id: Optional id of the JobOpening, used to tag the cache entry
         
     Returns:
         Candidate assessment and scores
     """
-    client = openai.OpenAI(api_key=settings.OPEN_AI_KEY)
-    
+    score_cache = get_result_cache("scores")
+    cache_key = score_cache_key(job_description, question, answer)
+    cache_tag = f"job:{job_opening_id}" if job_opening_id else ""
+    cached = score_cache.get(cache_key, tag=cache_tag)
+    if cached is not None and cached.get("model") == SCORING_MODEL:
+        return {"evaluation": cached["evaluation"]}
+
     prompt = (
         "Act as expert QA hiring analyst. Analyze ONLY the candidate's answer in relation to: "
         f"1. Job requirements: {job_description}\n"
         f"2. Interview question: '{question}'\n"
         f"3. Candidate response: '{answer}'\n\n"
         
-        "Evaluation Criteria:\n"
-        "- Relevance to job requirements (30% weight)\n"
-        "- Technical accuracy for QA roles (25% weight)\n" 
-        "- Problem-solving approach (20% weight)\n"
-        "- Communication clarity (15% weight)\n"
-        "- Alignment with QA best practices (10% weight)\n\n"
+        f"{SCORING_CRITERIA}"
         
         "Output format: Only return numerical score between 0-10 (1 decimal allowed) "
         "based on weighted criteria. No explanations. Example: 7.5"
@@ -201,29 +290,137 @@ def calculate_candidate_score(job_description, question, answer):
 
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",  # Using a more advanced model for evaluation
+        evaluation = create_chat_completion(
+            model=SCORING_MODEL,
             messages=[
                 {
                     "role": "system", 
-                    "content": "You are an expert hiring manager with exceptional skills in candidate evaluation."
+                    "content": SCORING_SYSTEM_PROMPT
                 },
                 {
                     "role": "user", 
                     "content": prompt
                 }
-            ]
+            ],
+            priority=PRIORITY_INTERACTIVE,
+            completion_tokens=8,
+            purpose="score",
         )
         
-        if isinstance(response.choices, list):
-            evaluation = response.choices[0].message.content
-        else:
-            evaluation = response.choices.message.content
-        
+        score_cache.set(cache_key, {"evaluation": evaluation, "model": SCORING_MODEL}, tag=cache_tag)
         return {
             "evaluation": evaluation
         }
         
     except Exception as e:
         print(f"Error during candidate evaluation: {e}")
-        return {"error": f"Candidate evaluation failed: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Candidate evaluation failed: {str(e)}"}
+
+
+def _batch_scoring_messages(job_description, qa_pairs):
+    """
+    Builds a single structured request scoring several question/answer pairs.
+    
+    Args:
+        job_description: JobDescriptionSerializer payload of the job opening
+        qa_pairs: List of (question, answer) tuples
+        
+    Returns:
+        Chat messages for the request
+    """
+    numbered = "\n".join(
+        f"{index}. Interview question: '{question}'\n   Candidate response: '{answer}'"
+        for index, (question, answer) in enumerate(qa_pairs, start=1)
+    )
+    prompt = (
+        "Act as expert QA hiring analyst. Score each candidate answer independently, analyzing ONLY "
+        f"the answer in relation to the job requirements: {job_description}\n\n"
+        f"{numbered}\n\n"
+        
+        f"{SCORING_CRITERIA}"
+        
+        "Output format: Only return a JSON object mapping each answer number to a numerical score "
+        "between 0-10 (1 decimal allowed) based on weighted criteria. No explanations. "
+        'Example: {"1": 7.5, "2": 4.0}'
+    )
+
+    return [
+        {"role": "system", "content": SCORING_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _parse_batch_scores(content, count):
+    """Returns the score strings of a batched scoring response in request order."""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.strip("`").removeprefix("json").strip()
+    scores = json.loads(content)
+    return [str(scores[str(index)]) for index in range(1, count + 1)]
+
+
+def calculate_candidate_scores(job_description, qa_pairs, job_opening_id=None):
+    """
+    Scores all answers of an interview in as few requests as possible.
+    
+    Cached answers are reused; the rest are grouped into batches of
+    INTERVIEW_SCORING_BATCH_SIZE (0 means a single batch) that are sent
+    concurrently through the inference scheduler. A batch whose response cannot be parsed falls back to
+    scoring its answers one by one.
+    
+    Args:
+        job_description: JobDescriptionSerializer payload of the job opening
+        qa_pairs: List of (question, answer) tuples
+        job_opening_id: Optional id of the JobOpening, used to tag cache entries
+        
+    Returns:
+        Dict mapping each question to its result, as returned by calculate_candidate_score
+    """
+    score_cache = get_result_cache("scores")
+    cache_tag = f"job:{job_opening_id}" if job_opening_id else ""
+    results = {}
+    pending = []
+    for question, answer in qa_pairs:
+        cached = score_cache.get(score_cache_key(job_description, question, answer), tag=cache_tag)
+        if cached is not None and cached.get("model") == SCORING_MODEL:
+            results[question] = {"evaluation": cached["evaluation"]}
+        else:
+            pending.append((question, answer))
+
+    if not pending:
+        return results
+
+    batch_size = settings.INTERVIEW_SCORING_BATCH_SIZE or len(pending)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    # Fan out all batches at once; the scheduler enforces concurrency and rate limits
+    futures = [
+        submit_chat_completion(
+            SCORING_MODEL,
+            _batch_scoring_messages(job_description, batch),
+            priority=PRIORITY_INTERACTIVE,
+            completion_tokens=10 * len(batch),
+            purpose="score_batch",
+            metadata={"count": len(batch)},
+        )
+        for batch in batches
+    ]
+
+    for batch, future in zip(batches, futures):
+        try:
+            evaluations = _parse_batch_scores(future.result(), len(batch))
+        except Exception as e:
+            print(f"Batched evaluation failed, scoring answers individually: {e}")
+            evaluations = None
+        if evaluations is None:
+            for question, answer in batch:
+                results[question] = calculate_candidate_score(job_description, question, answer, job_opening_id)
+            continue
+        for (question, answer), evaluation in zip(batch, evaluations):
+            score_cache.set(
+                score_cache_key(job_description, question, answer),
+                {"evaluation": evaluation, "model": SCORING_MODEL},
+                tag=cache_tag,
+            )
+            results[question] = {"evaluation": evaluation}
+    return results
@@ -0,0 +1,55 @@
+# call/signals.py
+import os
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from Job_opening.models import ApplicantResponse, JobOpening
+from Job_opening.serializers import JobDescriptionSerializer
+from .blobstore import release
+from .cache import get_result_cache
+from .models import EvaluationResult, Interview, InterviewChunk, QuestionScore
+
+# Fields that feed the scoring prompt; saves touching only other fields
+# (e.g. the applicants counter) leave cached scores valid
+SCORING_FIELDS = set(JobDescriptionSerializer.Meta.fields) | {"questions"}
+
+
+@receiver(post_save, sender=JobOpening)
+@receiver(post_delete, sender=JobOpening)
+def invalidate_job_scores(sender, instance, update_fields=None, **kwargs):
+    """Cached answer scores depend on the job opening, so drop them whenever it changes."""
+    if update_fields is not None and not SCORING_FIELDS.intersection(update_fields):
+        return
+    get_result_cache("scores").invalidate(f"job:{instance.id}")
+
+
+@receiver(post_delete, sender=InterviewChunk)
+def release_chunk_blob(sender, instance, **kwargs):
+    """Drop the chunk's reference to its stored recording (see call/blobstore.py)."""
+    if instance.path:
+        release(instance.path, instance.checksum or None)
+
+
+@receiver(post_delete, sender=Interview)
+def remove_interview_recording(sender, instance, **kwargs):
+    if instance.recording_path and os.path.exists(instance.recording_path):
+        os.remove(instance.recording_path)
+
+
+@receiver(post_delete, sender=ApplicantResponse)
+def release_cv_blob(sender, instance, **kwargs):
+    if instance.cv:
+        instance.cv.delete(save=False)
+
+
+@receiver(post_save, sender=EvaluationResult)
+@receiver(post_delete, sender=EvaluationResult)
+def invalidate_report(sender, instance, **kwargs):
+    """Drop the cached InterviewReport payload; entries are also keyed by updated_at, so this only frees them early."""
+    get_result_cache("reports").invalidate(f"evaluation:{instance.id}")
+
+
+@receiver(post_save, sender=QuestionScore)
+@receiver(post_delete, sender=QuestionScore)
+def touch_report(sender, instance, **kwargs):
+    """Answer scores are part of the report (verbal_scores), so a changed score changes its version."""
+    EvaluationResult.touch(instance.interview_id)
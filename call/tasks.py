@@ -0,0 +1,383 @@
+# call/tasks.py
+import logging
+import os
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from Job_opening.serializers import JobDescriptionSerializer
+from .models import EvaluationResult, Interview, InterviewChunk, ProcessingJob, QuestionScore
+from .services import TRANSCRIPTION_ERRORS, extract_audio_and_process, calculate_candidate_score, calculate_candidate_scores, parse_score, probe_duration
+from .cache import get_result_cache
+from .final_report_gen import generate_final_report, report_inputs_hash, score_statistics
+from .media import ConcatenationError, concatenate_recording
+from .nonverbal import analyze_video
+
+
+logger = logging.getLogger(__name__)
+
+# Columns rewritten when an answer is scored again
+QUESTION_SCORE_FIELDS = ["question", "score", "processing_job", "answered_at", "scored_at"]
+SCORING_RETRY_DELAY = 30  # Seconds before score_interview retries answers whose scoring failed
+RECORDING_JOIN_TIMEOUT = timedelta(minutes=15)  # A join claimed longer ago is assumed lost (e.g. worker killed)
+
+
+def _get_evaluation_result(interview):
+    evaluation_result, _ = EvaluationResult.objects.get_or_create(
+        interview=interview,
+        defaults={"non_verbal_scores": {}, "final_report": ""},
+    )
+    return evaluation_result
+
+
+def _question_score(job, evaluation, questions):
+    question_index = job.question_index
+    if question_index is None:
+        question_index = questions.index(job.question)
+    return QuestionScore(
+        interview_id=job.interview_id,
+        question_index=question_index,
+        question=job.question,
+        score=parse_score(evaluation),
+        processing_job=job,
+        answered_at=job.created_at,
+        scored_at=timezone.now(),
+    )
+
+
+def _set_chunk_state(job, state, **fields):
+    if job.chunk_id:
+        values = {field: value for field, value in fields.items() if value is not None}
+        InterviewChunk.objects.filter(id=job.chunk_id).update(state=state, **values)
+
+
+def _lock_evaluation_result(interview):
+    # Chunk tasks of one interview run concurrently; call inside transaction.atomic()
+    _get_evaluation_result(interview)
+    return EvaluationResult.objects.select_for_update().get(interview=interview)
+
+
+def _fail_job(job, error):
+    job.status = "Failed"
+    job.error = error
+    job.save(update_fields=["status", "error", "updated_at"])
+    _set_chunk_state(job, "Failed")
+    # Score and report the answers that did get transcribed
+    if settings.INTERVIEW_SCORING_MODE != "batched":
+        _queue_report_if_complete(job.interview_id)
+    elif job.final_flag:
+        score_interview.delay(job.interview_id)
+
+
+def _queue_report_if_complete(interview_id):
+    # The report follows the last answer: once the final chunk arrived and no chunk is still in progress
+    if not ProcessingJob.objects.filter(interview_id=interview_id, final_flag=True).exists():
+        return False
+    if InterviewChunk.objects.filter(interview_id=interview_id, state__in=["Pending", "Processing"]).exists():
+        return False
+    transaction.on_commit(lambda: generate_interview_report.delay(interview_id))
+    return True
+
+
+@shared_task(ignore_result=True)
+def process_interview_chunk(job_id):
+    """
+    Transcribe and score one uploaded interview chunk outside of the request cycle.
+
+    With INTERVIEW_SCORING_MODE = "batched" the chunk is only transcribed here;
+    the final chunk hands over to score_interview, which scores every answer at once.
+
+    Args:
+        job_id: Primary key of the ProcessingJob describing the chunk
+
+    Returns:
+        None. Progress and results are stored on the ProcessingJob.
+    """
+    try:
+        job = ProcessingJob.objects.select_related(
+            "interview__applicant_job_pipeline_id__jobId"
+        ).get(id=job_id)
+    except ProcessingJob.DoesNotExist:
+        logger.error(f"Processing job {job_id} not found")
+        return
+
+    job.status = "Processing"
+    job.save(update_fields=["status", "updated_at"])
+    _set_chunk_state(job, "Processing")
+
+    try:
+        interview = job.interview
+        job_opening = interview.applicant_job_pipeline_id.jobId
+        job_description = JobDescriptionSerializer(job_opening).data
+
+        audio_stats = {}
+        audio_text = extract_audio_and_process(job.video_path, checksum=job.checksum, audio_stats=audio_stats)
+        if audio_text.startswith(TRANSCRIPTION_ERRORS):
+            # Not an answer; don't score it
+            logger.error(f"Processing job {job_id} failed: {audio_text}")
+            _fail_job(job, audio_text)
+            return
+        result = {"transcript": audio_text}
+        if "segments" in audio_stats:
+            result["segments"] = audio_stats.pop("segments")
+        if audio_stats:
+            result["audio"] = audio_stats
+
+        batched = settings.INTERVIEW_SCORING_MODE == "batched"
+        if batched:
+            if job.final_flag:
+                result["scoring"] = "queued"
+        else:
+            score = calculate_candidate_score(job_description, job.question, audio_text, job_opening_id=job_opening.id)
+            if "error" in score:
+                # A 0 would count as a real score in the statistics and the report
+                logger.error(f"Processing job {job_id} failed: {score['error']}")
+                _fail_job(job, score["error"])
+                return
+
+            row = _question_score(job, score["evaluation"], job_opening.questions)
+            _get_evaluation_result(interview)  # InterviewReport shows the scores as they arrive
+            QuestionScore.objects.update_or_create(
+                interview_id=row.interview_id,
+                question_index=row.question_index,
+                defaults={field: getattr(row, field) for field in QUESTION_SCORE_FIELDS},
+            )
+
+            result["score"] = score["evaluation"]
+
+        job.result = result
+        job.status = "Completed"
+        job.save(update_fields=["result", "status", "updated_at"])
+        _set_chunk_state(job, "Completed", duration=audio_stats.get("duration") or probe_duration(job.video_path))
+        logger.info(f"Processing job {job_id} completed for interview {interview.id}")
+        if batched and job.final_flag:
+            score_interview.delay(interview.id)
+        elif not batched:
+            _queue_report_if_complete(interview.id)
+
+    except Exception as e:
+        logger.exception(f"Processing job {job_id} failed")
+        _fail_job(job, str(e))
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=60, default_retry_delay=5)
+def score_interview(self, interview_id):
+    """
+    Score every transcribed but unscored answer of an interview in one pass and
+    generate the final report.
+
+    Waits (by retrying) while other chunks of the interview are still being transcribed,
+    and retries answers whose scoring failed before reporting without them.
+
+    Args:
+        interview_id: Primary key of the Interview
+    """
+    jobs = ProcessingJob.objects.filter(interview_id=interview_id).select_related(
+        "interview__applicant_job_pipeline_id__jobId"
+    ).order_by("created_at")
+    if InterviewChunk.objects.filter(interview_id=interview_id, state__in=["Pending", "Processing"]).exists():
+        logger.info(f"Interview {interview_id} still has chunks in progress, retrying scoring later")
+        raise self.retry()
+
+    # The latest completed upload of each question is the one that counts
+    latest_jobs = {}
+    for job in jobs.filter(status="Completed"):
+        latest_jobs[job.question] = job
+    if not latest_jobs:
+        logger.warning(f"No transcribed chunks to score for interview {interview_id}")
+        return
+    unscored = [job for job in latest_jobs.values() if "score" not in job.result]
+
+    interview = next(iter(latest_jobs.values())).interview
+    job_opening = interview.applicant_job_pipeline_id.jobId
+    job_description = JobDescriptionSerializer(job_opening).data
+
+    scores = calculate_candidate_scores(
+        job_description,
+        [(job.question, job.result.get("transcript", "")) for job in unscored],
+        job_opening_id=job_opening.id,
+    )
+    # Answers whose scoring failed stay unscored, so the next pass picks them up again
+    scored = []
+    for job in unscored:
+        score = scores.get(job.question, {})
+        if "evaluation" in score:
+            job.result["score"] = score["evaluation"]
+            scored.append(job)
+    if scored:
+        ProcessingJob.objects.bulk_update(scored, ["result"])
+
+        # Write all scores with a single upsert
+        _get_evaluation_result(interview)
+        QuestionScore.objects.bulk_create(
+            [_question_score(job, job.result["score"], job_opening.questions) for job in scored],
+            update_conflicts=True,
+            unique_fields=["interview", "question_index"],
+            update_fields=QUESTION_SCORE_FIELDS,
+        )
+        EvaluationResult.touch(interview_id)  # bulk_create sends no post_save
+    logger.info(f"Scored {len(scored)} of {len(unscored)} answers for interview {interview_id}")
+
+    if len(scored) < len(unscored):
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=SCORING_RETRY_DELAY)
+        logger.error(f"Giving up on {len(unscored) - len(scored)} unscored answers of interview {interview_id}")
+    generate_interview_report.delay(interview_id)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=3, default_retry_delay=30)
+def generate_interview_report(self, interview_id):
+    """
+    Compute the score statistics and generate the final report of an interview.
+
+    Idempotent: the report is memoized against a hash of the answer scores and
+    the job description, so running the task again (retries, duplicate
+    triggers) only calls the model when those changed. The statistics are
+    computed locally and stored right away; a failed report generation is
+    retried.
+
+    Args:
+        interview_id: Primary key of the Interview
+    """
+    try:
+        interview = Interview.objects.select_related("applicant_job_pipeline_id__jobId").get(id=interview_id)
+    except Interview.DoesNotExist:
+        logger.error(f"Interview {interview_id} not found")
+        return
+    job_description = JobDescriptionSerializer(interview.applicant_job_pipeline_id.jobId).data
+
+    with transaction.atomic():
+        evaluation_result = _lock_evaluation_result(interview)
+        scores = evaluation_result.verbal_scores
+        inputs_hash = report_inputs_hash(scores, job_description)
+        if evaluation_result.report_inputs_hash == inputs_hash:
+            logger.info(f"Final report of interview {interview_id} is up to date")
+            return
+        statistics = score_statistics(scores)
+        if evaluation_result.score_statistics != statistics:
+            evaluation_result.score_statistics = statistics
+            evaluation_result.save(update_fields=["score_statistics", "updated_at"])
+
+    # The model call runs outside the row lock
+    try:
+        final_report = generate_final_report(evaluation_result, job_description, scores=scores, statistics=statistics)
+    except Exception as e:
+        logger.error(f"An error occurred while generating the final report for interview {interview_id}: {e}")
+        raise self.retry(exc=e)
+
+    with transaction.atomic():
+        evaluation_result = _lock_evaluation_result(interview)
+        if report_inputs_hash(evaluation_result.verbal_scores, job_description) != inputs_hash:
+            # Scores changed meanwhile; the run they trigger writes the report
+            logger.info(f"Scores of interview {interview_id} changed during report generation, discarding it")
+            return
+        evaluation_result.final_report = final_report
+        evaluation_result.report_inputs_hash = inputs_hash
+        evaluation_result.save(update_fields=["final_report", "report_inputs_hash", "updated_at"])
+    logger.info(f"Final report of interview {interview_id} generated")
+
+
+@shared_task(ignore_result=True)
+def analyze_non_verbal(job_id):
+    """
+    Compute non-verbal metrics (face presence, centering, motion, lighting) for one
+    uploaded interview chunk and store them in EvaluationResult.non_verbal_scores
+    under the chunk's question.
+
+    Runs on the Celery worker pool next to transcription; CELERY_NON_VERBAL_QUEUE
+    can route it to dedicated workers.
+
+    Args:
+        job_id: Primary key of the ProcessingJob describing the chunk
+    """
+    try:
+        job = ProcessingJob.objects.get(id=job_id)
+    except ProcessingJob.DoesNotExist:
+        logger.error(f"Processing job {job_id} not found")
+        return
+
+    # Identical recordings (same content hash) are only analyzed once
+    options = settings.INTERVIEW_NON_VERBAL
+    cache = get_result_cache("non_verbal")
+    cache_key = (
+        f"{options['MAX_FPS']}:{options['FRAME_WIDTH']}x{options['FRAME_HEIGHT']}:media:{job.checksum}"
+        if job.checksum else None
+    )
+    metrics = cache.get(cache_key) if cache_key else None
+    if metrics is None:
+        try:
+            metrics = analyze_video(job.video_path)
+        except Exception:
+            logger.exception(f"Non-verbal analysis of processing job {job_id} failed")
+            return
+        if metrics is None:
+            logger.warning(f"No video frames decoded for processing job {job_id}")
+            return
+        if cache_key:
+            cache.set(cache_key, metrics)
+
+    with transaction.atomic():
+        evaluation_result = _lock_evaluation_result(job.interview)
+        evaluation_result.non_verbal_scores[job.question] = metrics
+        evaluation_result.save(update_fields=["non_verbal_scores", "updated_at"])
+    logger.info(f"Non-verbal analysis of processing job {job_id} completed: {metrics}")
+
+
+def queue_recording_join(interview_id):
+    """
+    Queues concatenate_interview_recording unless a join of the interview is
+    already queued or running, so polling players do not start one ffmpeg
+    process per request.
+
+    Returns:
+        Whether a join was queued
+    """
+    now = timezone.now()
+    claimed = Interview.objects.filter(id=interview_id).filter(
+        Q(recording_joining_since__isnull=True) | Q(recording_joining_since__lt=now - RECORDING_JOIN_TIMEOUT)
+    ).update(recording_joining_since=now)
+    if claimed:
+        transaction.on_commit(lambda: concatenate_interview_recording.delay(interview_id))
+    return bool(claimed)
+
+
+@shared_task(ignore_result=True)
+def concatenate_interview_recording(interview_id):
+    """
+    Join the uploaded chunks of an interview into one fast-start recording for
+    playback (stream copy, no re-encoding). Does nothing when the existing
+    recording already covers every chunk. Queue it with queue_recording_join().
+
+    Args:
+        interview_id: Primary key of the Interview
+    """
+    try:
+        interview = Interview.objects.get(id=interview_id)
+    except Interview.DoesNotExist:
+        logger.error(f"Interview {interview_id} not found")
+        return
+
+    paths = interview.video_file
+    try:
+        if not paths or (interview.recording_chunks == len(paths) and os.path.exists(interview.recording_path)):
+            return
+
+        output_dir = os.path.join(settings.MEDIA_ROOT, "recordings")
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            recording_path = concatenate_recording(paths, os.path.join(output_dir, f"interview_{interview.id}"))
+        except ConcatenationError:
+            logger.exception(f"Could not join the chunks of interview {interview_id}")
+            return
+
+        Interview.objects.filter(id=interview.id).update(recording_path=recording_path, recording_chunks=len(paths))
+        if interview.recording_path and interview.recording_path != recording_path and os.path.exists(interview.recording_path):
+            os.remove(interview.recording_path)  # Replaced by a recording in the other container
+        logger.info(f"Joined {len(paths)} chunks of interview {interview_id} into {recording_path}")
+    finally:
+        Interview.objects.filter(id=interview_id).update(recording_joining_since=None)
+
+    if interview.chunks.count() > len(paths):
+        queue_recording_join(interview_id)  # Chunks arrived while joining
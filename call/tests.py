@@ -1,3 +1,523 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from unittest import mock
+import numpy as np
+from celery.exceptions import Retry
+from channels.layers import channel_layers
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from client_auth.models import Company
+from Job_opening.models import ApplicantResponse, JobOpening
+from video_conf.asgi import application
+from .audio import SAMPLE_RATE
+from .audio_stream import FLAG_END_OF_UTTERANCE, AudioRingBuffer, LiveAudioStream, pack_audio_frame
+from .blobstore import blob_path, ingest, release
+from .consumers import InterviewConsumer, JSONArrayStream, connection_metrics
+from .media import media_response, parse_range
+from .models import EvaluationResult, Interview, MediaBlob, ProcessingJob, QuestionScore, ResumableUpload
+from .scheduler import PRIORITY_INTERACTIVE, PRIORITY_REPORT, InferenceScheduler
+from .tasks import process_interview_chunk, score_interview
+from .vad import split_on_silence, trim_silence
 
-# Create your tests here.
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    INTERVIEW_WS_QUEUE_SIZE=4,
+)
+class InterviewConsumerTests(SimpleTestCase):
+    def setUp(self):
+        channel_layers.backends.clear()  # Pick up the in-memory layer
+
+    def communicator(self, path='/ws/interviews/7/'):
+        return WebsocketCommunicator(application, path, headers=[(b'origin', b'http://testserver')])
+
+    async def receive_type(self, communicator, message_type):
+        # Skips the progress events sent in between
+        while (message := await communicator.receive_json_from()).get('type') != message_type:
+            pass
+        return message
+
+    async def test_connects_through_asgi_router(self):
+        communicator = self.communicator()
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await communicator.send_json_to({'type': 'heartbeat'})
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({'type': 'metrics'})
+        metrics = await communicator.receive_json_from()
+        self.assertEqual(metrics['type'], 'metrics')
+        self.assertEqual(metrics['interview_id'], '7')
+        self.assertEqual(metrics['queue_depth'], 0)
+
+        await communicator.disconnect()
+        self.assertEqual(connection_metrics(), [])
+
+    async def test_non_numeric_interview_id_has_no_route(self):
+        with self.assertRaises(ValueError):
+            await self.communicator('/ws/interviews/abc/').connect()
+
+    async def test_frames_are_coalesced_while_the_worker_is_busy(self):
+        release = asyncio.Event()
+        passes = []
+
+        async def transcribe_new_audio(consumer):
+            passes.append(consumer.stats['received'])
+            await release.wait()
+
+        with mock.patch.object(InterviewConsumer, 'transcribe_new_audio', transcribe_new_audio):
+            communicator = self.communicator()
+            await communicator.connect()
+            for _ in range(10):
+                await communicator.send_to(bytes_data=b'\x00' * 64)
+            await communicator.send_json_to({'type': 'metrics'})
+            metrics = await self.receive_type(communicator, 'metrics')
+            release.set()
+            await communicator.send_json_to({'type': 'metrics'})
+            await self.receive_type(communicator, 'metrics')
+            await communicator.disconnect()
+
+        # One pass started with the first frame, the other nine share one queued pass
+        self.assertEqual(len(passes), 2)
+        self.assertEqual(metrics['received'], 10)
+        self.assertEqual(metrics['coalesced'], 8)
+        self.assertEqual(metrics['dropped'], 0)
+
+    async def test_full_queue_asks_client_to_slow_down_and_merges_utterances(self):
+        release = asyncio.Event()
+        transcribed = []
+
+        async def transcribe_utterance(consumer, utterance):
+            await release.wait()
+            transcribed.append(utterance)
+
+        speech = (np.random.default_rng(0).normal(0, 8000, SAMPLE_RATE // 2)).astype('<i2').tobytes()
+        with mock.patch.object(InterviewConsumer, 'transcribe_utterance', transcribe_utterance):
+            communicator = self.communicator()
+            await communicator.connect()
+            # One utterance runs, four fill the queue, the last one is merged into the fourth
+            for sequence in range(6):
+                await communicator.send_to(bytes_data=pack_audio_frame(
+                    speech, flags=FLAG_END_OF_UTTERANCE, sequence=sequence
+                ))
+            slow_down = await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'metrics'})  # Answered once all frames are in
+            metrics = await communicator.receive_json_from()
+            release.set()
+            resume = await communicator.receive_json_from()
+            processed = {'processed': 0}
+            while processed['processed'] < 5:
+                await communicator.send_json_to({'type': 'metrics'})
+                processed = await communicator.receive_json_from()
+            await communicator.disconnect()
+
+        self.assertEqual((slow_down['type'], slow_down['state']), ('status', 'slow_down'))
+        self.assertEqual(resume['state'], 'resume')
+        self.assertEqual(metrics['coalesced'], 1)
+        self.assertEqual(metrics['dropped'], 0)
+        self.assertEqual(len(transcribed), 5)
+        self.assertEqual(len(transcribed[-1]['samples']), len(transcribed[0]['samples']) * 2)
+
+    @override_settings(INFERENCE_BACKEND={'BACKEND': 'call.backends.StubBackend'}, INTERVIEW_WS_LIVE_SCORES=True)
+    async def test_results_are_streamed_progressively(self):
+        async def transcribe_new_audio(consumer):
+            qa_pairs = await consumer.extract_qa_pairs_from_audio("Can you describe your approach? I profile first.")
+            await consumer.send(text_data=json.dumps({'audio_text': qa_pairs}))
+
+        async def load_job_description(consumer):
+            return {'title': 'QA engineer'}, None
+
+        with mock.patch.object(InterviewConsumer, 'transcribe_new_audio', transcribe_new_audio), \
+                mock.patch.object(InterviewConsumer, 'load_job_description', load_job_description), \
+                mock.patch('call.consumers.calculate_candidate_score', return_value={'evaluation': '7.5'}):
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.send_to(bytes_data=b'\x00' * 64)
+            messages = [await communicator.receive_json_from()]
+            while 'audio_text' not in messages[-1]:
+                messages.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+
+        types = [message.get('type') for message in messages]
+        self.assertEqual(messages[0], {'type': 'chunk_received', 'bytes': 64, 'total_bytes': 64})
+        self.assertGreater(types.count('qa_delta'), 1)
+        self.assertLess(types.index('qa_pair'), types.index('score'))
+        self.assertEqual(messages[types.index('score')]['score'], 7.5)
+        self.assertEqual(''.join(m['delta'] for m in messages if m.get('type') == 'qa_delta').count('candidate'), 1)
+        self.assertEqual(messages[-1]['audio_text'], [messages[types.index('qa_pair')]['qa_pair']])
+
+    async def test_malformed_audio_frame_is_reported(self):
+        communicator = self.communicator()
+        await communicator.connect()
+        await communicator.send_to(bytes_data=pack_audio_frame(b'\x00' * 8, codec=9))
+        error = await communicator.receive_json_from()
+        await communicator.disconnect()
+        self.assertEqual(error['type'], 'error')
+
+
+class JSONArrayStreamTests(SimpleTestCase):
+    def test_items_are_returned_once_complete(self):
+        stream = JSONArrayStream()
+        self.assertEqual(stream.feed('```json\n[{"interviewer": "Why'), [])
+        self.assertEqual(stream.feed(' QA?", "candidate": "Because [of] {this}"}, {"interv'), [
+            {'interviewer': 'Why QA?', 'candidate': 'Because [of] {this}'}
+        ])
+        self.assertEqual(stream.feed('iewer": "Next?", "candidate": ""}]\n```'), [{'interviewer': 'Next?', 'candidate': ''}])
+        self.assertEqual(len(stream.items), 2)
+
+
+class LiveAudioStreamTests(SimpleTestCase):
+    def test_utterances_are_cut_at_pauses(self):
+        rng = np.random.default_rng(0)
+        silence = (rng.normal(0, 30, SAMPLE_RATE)).astype(np.int16)
+        speech = (rng.normal(0, 6000, SAMPLE_RATE * 2)).astype(np.int16)
+        stream = LiveAudioStream(end_silence_ms=600)
+        audio = np.concatenate([silence, speech, silence, speech, silence])
+
+        utterances = []
+        for offset in range(0, len(audio), 320):  # 20 ms frames
+            utterances += stream.feed(audio[offset:offset + 320])
+        utterances += stream.flush()
+
+        self.assertEqual(len(utterances), 2)
+        (first_start, first_end, first), (second_start, _, _) = utterances
+        self.assertAlmostEqual(first_start, 0.8, delta=0.05)  # Speech starts at 1 s, minus padding
+        self.assertAlmostEqual(first_end, 3.2, delta=0.05)
+        self.assertAlmostEqual(second_start, 3.8, delta=0.05)
+        self.assertEqual(len(first), round((first_end - first_start) * SAMPLE_RATE))
+
+    def test_ring_buffer_wraps_around(self):
+        ring = AudioRingBuffer(10)
+        ring.write(np.arange(7, dtype=np.int16))
+        ring.discard_until(5)
+        ring.write(np.arange(7, 15, dtype=np.int16))
+        self.assertEqual(ring.get(5, 15).tolist(), list(range(5, 15)))
+        self.assertEqual(ring.free, 0)
+        with self.assertRaises(OverflowError):
+            ring.write(np.zeros(1, dtype=np.int16))
+
+
+class VoiceActivityTests(SimpleTestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def silence(self, seconds):
+        return self.rng.normal(0, 30, int(SAMPLE_RATE * seconds)).astype(np.int16)
+
+    def speech(self, seconds):
+        return self.rng.normal(0, 6000, int(SAMPLE_RATE * seconds)).astype(np.int16)
+
+    def test_long_pauses_are_shortened(self):
+        audio = np.concatenate([self.silence(1), self.speech(2), self.silence(3), self.speech(2), self.silence(1)])
+        trimmed, stats = trim_silence(audio, SAMPLE_RATE)
+        self.assertEqual(stats['duration'], 9.0)
+        # Both utterances plus padding and a pause shortened to MIN_SILENCE_MS
+        self.assertGreater(len(trimmed), SAMPLE_RATE * 4)
+        self.assertLess(len(trimmed), SAMPLE_RATE * 6)
+        self.assertEqual(stats['kept_duration'], len(trimmed) / SAMPLE_RATE)
+
+    def test_silent_chunk_keeps_nothing(self):
+        trimmed, stats = trim_silence(self.silence(3), SAMPLE_RATE)
+        self.assertEqual(len(trimmed), 0)
+        self.assertEqual(stats['speech_ratio'], 0.0)
+
+    def test_continuous_loud_audio_is_speech(self):
+        # No quiet frames to estimate the noise floor from
+        trimmed, stats = trim_silence(self.speech(3), SAMPLE_RATE)
+        self.assertEqual(len(trimmed), SAMPLE_RATE * 3)
+        self.assertEqual(stats['speech_ratio'], 1.0)
+
+    def test_segments_are_cut_in_pauses(self):
+        audio = np.concatenate([self.silence(1), self.speech(2), self.silence(3), self.speech(2), self.silence(1)])
+        segments, _ = split_on_silence(audio, SAMPLE_RATE, max_segment_seconds=4)
+        self.assertEqual(len(segments), 2)
+        (first_start, first_end, _), (second_start, second_end, _) = segments
+        self.assertAlmostEqual(first_start, 0.8, delta=0.05)  # Speech starts at 1 s, minus padding
+        self.assertTrue(3 < first_end < 6 and first_end <= second_start < 6)
+        self.assertEqual(second_end, 9.0)
+
+    def test_segments_without_pauses_are_cut_at_the_limit(self):
+        segments, _ = split_on_silence(self.speech(10), SAMPLE_RATE, max_segment_seconds=4)
+        self.assertEqual([round(end - start) for start, end, _ in segments], [4, 4, 2])
+        self.assertEqual(sum(len(samples) for _, _, samples in segments), SAMPLE_RATE * 10)
+
+
+class InterviewTestCase(TestCase):
+    """An interview of a company's job opening, with uploads going to a temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.user = User.objects.create_user('recruiter', password='secret')
+        company = Company.objects.create(user=self.user, name='Acme', email='hr@acme.test')
+        self.job_opening = JobOpening.objects.create(
+            company=company, title='QA engineer', description='Testing', questions=['Q1?', 'Q2?']
+        )
+        self.applicant = ApplicantResponse.objects.create(
+            jobId=self.job_opening, name='Candidate', role='QA', appliedFor='QA',
+            appliedDate='2025-01-01', email='candidate@example.test', score=50,
+        )
+        self.interview = Interview.objects.create(applicant_job_pipeline_id=self.applicant)
+        self.client = APIClient()
+
+
+class ResumableUploadTests(InterviewTestCase):
+    def create_upload(self, length=10, **data):
+        return self.client.post(
+            f'/call/uploads/?interview_id={self.interview.id}',
+            {'question': 'Q1?', 'filename': 'answer.webm', **data},
+            HTTP_UPLOAD_LENGTH=str(length),
+        )
+
+    def patch(self, url, offset, data):
+        return self.client.generic(
+            'PATCH', url, data, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_upload_is_resumed_at_the_server_offset(self):
+        created = self.create_upload()
+        self.assertEqual(created.status_code, 201)
+        url = created['Location']
+        self.assertEqual(self.client.head(url)['Upload-Offset'], '0')
+
+        self.assertEqual(self.patch(url, 0, b'0123').status_code, 204)
+        # A retried request with the old offset is rejected with the current one
+        conflict = self.patch(url, 0, b'0123')
+        self.assertEqual((conflict.status_code, conflict['Upload-Offset']), (409, '4'))
+        head = self.client.head(url)
+        self.assertEqual((head['Upload-Offset'], head['Upload-Length']), ('4', '10'))
+
+        self.assertEqual(self.patch(url, 4, b'456789')['Upload-Offset'], '10')
+        with open(ResumableUpload.objects.get(id=created.data['upload_id']).path, 'rb') as f:
+            self.assertEqual(f.read(), b'0123456789')
+
+    def test_oversized_uploads_are_rejected(self):
+        with override_settings(INTERVIEW_UPLOAD_MAX_SIZE=100):
+            self.assertEqual(self.create_upload(length=101).status_code, 413)
+        url = self.create_upload(length=4)['Location']
+        self.assertEqual(self.patch(url, 0, b'01234').status_code, 413)
+        self.assertEqual(self.client.head(url)['Upload-Offset'], '0')
+
+    def test_finalize_is_idempotent(self):
+        created = self.create_upload(length=4)
+        finalize_url = f"/call/uploads/{created.data['upload_id']}/finalize/"
+        self.assertEqual(self.client.post(finalize_url).status_code, 409)  # Nothing received yet
+
+        self.patch(created['Location'], 0, b'0123')
+        first = self.client.post(finalize_url)
+        second = self.client.post(finalize_url)
+        self.assertEqual((first.status_code, second.status_code), (202, 202))
+        self.assertEqual(first.data['job_id'], second.data['job_id'])
+        self.assertEqual(ProcessingJob.objects.filter(interview=self.interview).count(), 1)
+        self.assertEqual(self.patch(created['Location'], 4, b'').status_code, 409)  # Finalized
+
+
+class MediaResponseTests(SimpleTestCase):
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = os.path.join(directory, 'recording.mp4')
+        with open(self.path, 'wb') as f:
+            f.write(bytes(range(100)))
+
+    def get(self, **headers):
+        return media_response(RequestFactory().get('/', headers=headers), self.path)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))  # Several ranges: whole file
+        self.assertIs(parse_range('bytes=100-', 100), False)
+        self.assertIs(parse_range('bytes=-0', 100), False)
+
+    def test_range_request(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+        unsatisfiable = self.get(Range='bytes=200-')
+        self.assertEqual((unsatisfiable.status_code, unsatisfiable['Content-Range']), (416, 'bytes */100'))
+
+    def test_outdated_if_range_sends_the_whole_file(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=etag).status_code, 206)
+        response = self.get(Range='bytes=0-9', If_Range='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+
+
+class InterviewRecordingTests(InterviewTestCase):
+    def test_join_is_queued_once_while_the_player_polls(self):
+        path = os.path.join(self.media_root, 'chunk.webm')
+        open(path, 'wb').close()
+        self.interview.chunks.create(seq=1, path=path, size=0)
+        self.client.force_authenticate(self.user)
+
+        with mock.patch('call.tasks.concatenate_interview_recording.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            responses = [self.client.get(f'/call/interviews/{self.interview.id}/recording/') for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [409] * 3)
+        delay.assert_called_once_with(self.interview.id)
+
+
+class BlobStoreTests(InterviewTestCase):
+    def write(self, name, content):
+        path = os.path.join(self.media_root, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_identical_files_share_one_blob_until_the_last_release(self):
+        first, blob = ingest(self.write('first.webm', b'recording'))
+        second, _ = ingest(self.write('second.webm', b'recording'))
+        stored = blob_path(blob.sha256)
+        self.assertTrue(os.path.samefile(first, stored) and os.path.samefile(second, stored))
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release(first)
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(stored))
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release(second, checksum=blob.sha256)
+        self.assertFalse(os.path.exists(stored))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_different_content_is_stored_separately(self):
+        _, first = ingest(self.write('first.webm', b'one'))
+        _, second = ingest(self.write('second.webm', b'two'))
+        self.assertNotEqual(first.sha256, second.sha256)
+        self.assertEqual(list(MediaBlob.objects.values_list('refcount', flat=True)), [1, 1])
+
+
+class InterviewMetricsTests(InterviewTestCase):
+    def test_cache_counters_are_exposed_to_staff(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/call/metrics/').status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        metrics = self.client.get('/call/metrics/').data
+        self.assertEqual(set(metrics['caches']), {'transcripts', 'scores', 'non_verbal', 'reports'})
+        self.assertEqual(set(metrics['caches']['scores']), {'hits', 'misses', 'hit_rate'})
+
+
+class InterviewReportTests(InterviewTestCase):
+    def setUp(self):
+        super().setUp()
+        EvaluationResult.objects.create(interview=self.interview, non_verbal_scores={}, final_report='')
+        self.url = f'/call/report/{self.applicant.id}/'
+
+    def test_unchanged_report_is_revalidated_with_304(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        # A new answer score is a new report version
+        QuestionScore.objects.create(interview=self.interview, question_index=0, question='Q1?', score=7.0)
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+        self.assertEqual(changed.data['data']['verbal_scores'], {'Q1?': 7.0})
+
+    def test_other_companies_cannot_read_the_report(self):
+        other = User.objects.create_user('other', password='secret')
+        Company.objects.create(user=other, name='Other', email='hr@other.test')
+        self.client.force_authenticate(other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response)
+
+
+@mock.patch('call.tasks.probe_duration', return_value=1.0)
+class QuestionScoreTests(InterviewTestCase):
+    def job(self, question, **fields):
+        return ProcessingJob.objects.create(interview=self.interview, question=question, video_path='answer.webm', **fields)
+
+    def test_rescored_answer_replaces_its_score(self, probe_duration):
+        for evaluation in ('6', '8.5'):
+            job = self.job('Q2?')
+            with mock.patch('call.tasks.extract_audio_and_process', return_value='My answer'), \
+                    mock.patch('call.tasks.calculate_candidate_score', return_value={'evaluation': evaluation}):
+                process_interview_chunk(str(job.id))
+
+        score = QuestionScore.objects.get(interview=self.interview)
+        self.assertEqual((score.question_index, score.score, score.processing_job_id), (1, 8.5, job.id))
+        # The report shows the score before the final report exists
+        self.assertEqual(EvaluationResult.objects.get(interview=self.interview).verbal_scores, {'Q2?': 8.5})
+
+    def test_failed_scoring_fails_the_job(self, probe_duration):
+        job = self.job('Q1?')
+        with mock.patch('call.tasks.extract_audio_and_process', return_value='My answer'), \
+                mock.patch('call.tasks.calculate_candidate_score', return_value={'error': 'Candidate evaluation failed'}):
+            process_interview_chunk(str(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('Failed', 'Candidate evaluation failed'))
+        self.assertFalse(QuestionScore.objects.exists())
+
+    def test_batched_scores_are_upserted_together(self, probe_duration):
+        QuestionScore.objects.create(interview=self.interview, question_index=0, question='Q1?', score=2.0)
+        for question in ('Q1?', 'Q2?'):
+            self.job(question, status='Completed', result={'transcript': f'Answer to {question}'})
+
+        scores = {'Q1?': {'evaluation': '9'}, 'Q2?': {'evaluation': '4'}}
+        with mock.patch('call.tasks.calculate_candidate_scores', return_value=scores), \
+                mock.patch('call.tasks.generate_interview_report.delay') as generate_report:
+            score_interview(self.interview.id)
+
+        self.assertEqual(
+            list(QuestionScore.objects.order_by('question_index').values_list('question', 'score')),
+            [('Q1?', 9.0), ('Q2?', 4.0)],
+        )
+        generate_report.assert_called_once_with(self.interview.id)
+
+    def test_batched_answers_that_failed_are_retried(self, probe_duration):
+        for question in ('Q1?', 'Q2?'):
+            self.job(question, status='Completed', result={'transcript': f'Answer to {question}'})
+
+        scores = {'Q1?': {'evaluation': '9'}, 'Q2?': {'error': 'Candidate evaluation failed'}}
+        with mock.patch('call.tasks.calculate_candidate_scores', return_value=scores), \
+                mock.patch('call.tasks.generate_interview_report.delay') as generate_report, \
+                mock.patch.object(score_interview, 'retry', side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                score_interview(self.interview.id)
+
+        retry.assert_called_once()
+        generate_report.assert_not_called()
+        self.assertEqual(list(QuestionScore.objects.values_list('question', 'score')), [('Q1?', 9.0)])
+        self.assertNotIn('score', ProcessingJob.objects.get(question='Q2?').result)  # Picked up by the retry
+
+
+class InferenceSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        # 100 tokens per second, one call at a time
+        self.scheduler = InferenceScheduler(tokens_per_minute=6000, max_concurrency=1)
+        self.addCleanup(self.scheduler.close)
+
+    def test_throttled_report_call_holds_no_slot(self):
+        async def call(name):
+            return name
+
+        self.assertEqual(self.scheduler.submit(call, 'first', priority=PRIORITY_REPORT, tokens=6000).result(1), 'first')
+        # Needs a full minute of budget; it waits without taking the only slot
+        report = self.scheduler.submit(call, 'report', priority=PRIORITY_REPORT, tokens=6000)
+        self.addCleanup(report.cancel)
+        score = self.scheduler.submit(call, 'score', priority=PRIORITY_INTERACTIVE, tokens=10)
+        self.assertEqual(score.result(timeout=2), 'score')
+        self.assertFalse(report.done())
+        metrics = self.scheduler.metrics()
+        self.assertEqual((metrics['in_flight'], metrics['throttled_waiting']), (0, 1))
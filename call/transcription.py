@@ -0,0 +1,91 @@
+# call/transcription.py
+"""
+Parallel transcription of segmented recordings.
+
+call.audio.prepare_speech splits long recordings at pauses; the segments are
+transcribed concurrently, at most INTERVIEW_SEGMENTATION['WORKERS'] at a time
+per recording (the inference scheduler still caps the process as a whole),
+and stitched back together in order with their timestamps.
+"""
+import asyncio
+import concurrent.futures
+from django.conf import settings
+from .inference import atranscribe, submit_transcription
+
+
+def stitch_segments(segments, texts):
+    """
+    Joins segment transcripts in recording order.
+
+    Args:
+        segments: List of (start seconds, end seconds or None, upload) as returned by prepare_speech
+        texts: Transcript of each segment, in the same order
+
+    Returns:
+        Tuple of (full transcript, list of {"start", "end", "text"} dicts)
+    """
+    timeline = [
+        {
+            "start": round(start, 3),
+            "end": round(end, 3) if end is not None else None,
+            "text": text.strip(),
+        }
+        for (start, end, _), text in zip(segments, texts)
+    ]
+    return " ".join(part["text"] for part in timeline if part["text"]), timeline
+
+
+def transcribe_segments(segments, model, workers=None):
+    """
+    Transcribes segments concurrently and stitches the results.
+
+    Args:
+        segments: List of (start seconds, end seconds or None, upload) as returned by prepare_speech
+        model: Speech-to-text model name
+        workers: Maximum segments in flight, defaults to INTERVIEW_SEGMENTATION['WORKERS']
+
+    Returns:
+        Tuple of (full transcript, list of {"start", "end", "text"} dicts). Raises if any segment fails.
+    """
+    workers = max(1, workers or settings.INTERVIEW_SEGMENTATION["WORKERS"])
+    texts = [None] * len(segments)
+    in_flight = {}
+    pending = iter(enumerate(segments))
+    try:
+        for index, (_, _, upload) in pending:
+            in_flight[submit_transcription(upload, model)] = index
+            if len(in_flight) >= workers:
+                break
+        while in_flight:
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                texts[in_flight.pop(future)] = future.result()
+                next_segment = next(pending, None)
+                if next_segment is not None:
+                    index, (_, _, upload) = next_segment
+                    in_flight[submit_transcription(upload, model)] = index
+    finally:
+        for future in in_flight:
+            future.cancel()
+    return stitch_segments(segments, texts)
+
+
+async def atranscribe_segments(segments, model, workers=None, on_segment=None):
+    """
+    Async variant of transcribe_segments. `on_segment`, an optional coroutine
+    function, is awaited with each {"start", "end", "text"} dict as soon as that
+    segment is transcribed, in completion order.
+    """
+    semaphore = asyncio.Semaphore(max(1, workers or settings.INTERVIEW_SEGMENTATION["WORKERS"]))
+
+    async def transcribe_one(segment):
+        _, _, upload = segment
+        async with semaphore:
+            text = await atranscribe(upload, model)
+        if on_segment is not None:
+            _, (part,) = stitch_segments([segment], [text])
+            await on_segment(part)
+        return text
+
+    texts = await asyncio.gather(*(transcribe_one(segment) for segment in segments))
+    return stitch_segments(segments, texts)
@@ -0,0 +1,143 @@
+# call/uploadhandlers.py
+import hashlib
+import logging
+import os
+import time
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.http import UnreadablePostError
+
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_upload_path(upload_dir, file_name):
+    """Returns a new path for an uploaded recording in `upload_dir`, creating the directory if needed."""
+    os.makedirs(upload_dir, exist_ok=True)
+    timestamp = int(time.time() * 1000)  # Milliseconds for uniqueness
+    return os.path.join(upload_dir, f"video_chunk_{timestamp}_{file_name}")
+
+
+def file_sha256(path):
+    """Returns the hex SHA-256 digest of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def append_upload_data(path, offset, stream, length, block_size=64 * 1024):
+    """
+    Writes up to `length` bytes from `stream` into `path` starting at `offset`.
+    Anything past `offset` (left by an earlier interrupted request) is discarded
+    first. If the client disconnects midway, the bytes received so far are kept.
+
+    Returns:
+        Number of bytes written
+    """
+    written = 0
+    with open(path, "r+b") as destination:
+        destination.truncate(offset)
+        destination.seek(offset)
+        while stream is not None and written < length:
+            try:
+                data = stream.read(min(block_size, length - written))
+            except (OSError, UnreadablePostError) as e:
+                logger.info(f"Upload to {path} interrupted after {written} bytes: {e}")
+                break
+            if not data:
+                break
+            destination.write(data)
+            written += len(data)
+    return written
+
+
+class StoredUploadedFile(UploadedFile):
+    """
+    An uploaded file that was streamed straight to its permanent location.
+
+    Besides the usual UploadedFile attributes it exposes the final ``path`` and
+    the SHA-256 ``checksum`` computed while the upload was being written.
+    """
+
+    def __init__(self, path, name, content_type, size, charset, content_type_extra, checksum):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.path = path
+        self.checksum = checksum
+
+    def open(self, mode="rb"):
+        self.file = open(self.path, mode)
+        return self
+
+    def chunks(self, chunk_size=None):
+        if self.file is None or self.file.closed:
+            self.open()
+        return super().chunks(chunk_size)
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class InterviewChunkUploadHandler(FileUploadHandler):
+    """
+    Upload handler that writes an interview recording directly into the
+    interview's storage directory, hashing it in the same pass.
+
+    Only the configured form field is intercepted; every other file is passed
+    on to the default handlers untouched.
+    """
+
+    def __init__(self, upload_dir, field_name="video_file", request=None):
+        super().__init__(request)
+        self.upload_dir = upload_dir
+        self.target_field = field_name
+        self.activated = False
+        self.destination = None
+        self.path = None
+        self.hasher = None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.activated = field_name == self.target_field and self.destination is None
+        if not self.activated:
+            return
+
+        self.path = chunk_upload_path(self.upload_dir, file_name)
+        self.destination = open(self.path, "wb")
+        self.hasher = hashlib.sha256()
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.activated:
+            return raw_data
+        self.destination.write(raw_data)
+        self.hasher.update(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.activated:
+            return None
+        self.activated = False
+        self.destination.close()
+        logger.debug(f"Stored upload {self.file_name} at {self.path} ({file_size} bytes)")
+        return StoredUploadedFile(
+            path=self.path,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+            checksum=self.hasher.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        if self.destination is not None and not self.destination.closed:
+            self.destination.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+                logger.info(f"Removed partially uploaded file {self.path}")
@@ -3,6 +3,13 @@ from django.urls import path, include
 from .views import (
     StartInterview,
     InterviewProcessingAPI,
+    InterviewProcessingStatusAPI,
+    ResumableUploadCreateAPI,
+    ResumableUploadAPI,
+    ResumableUploadFinalizeAPI,
+    InterviewRecordingAPI,
+    InterviewChunkMediaAPI,
+    InterviewMetricsAPI,
     InterviewReport,
 )
 
@@ -12,5 +19,14 @@ urlpatterns = [
     ### Candidate login via linkedin
     # path('start-interview/', StartInterview.as_view(), name='start-interview'),
     path('process/', InterviewProcessingAPI.as_view(), name='interview_process'),
+    path('process/<uuid:job_id>/', InterviewProcessingStatusAPI.as_view(), name='interview_process_status'),
+    # Resumable uploads: create, PATCH/HEAD the upload URL, then finalize
+    path('uploads/', ResumableUploadCreateAPI.as_view(), name='interview_upload_create'),
+    path('uploads/<uuid:upload_id>/', ResumableUploadAPI.as_view(), name='interview_upload'),
+    path('uploads/<uuid:upload_id>/finalize/', ResumableUploadFinalizeAPI.as_view(), name='interview_upload_finalize'),
+    # Recruiter playback (HTTP Range)
+    path('interviews/<int:interview_id>/recording/', InterviewRecordingAPI.as_view(), name='interview_recording'),
+    path('interviews/<int:interview_id>/chunks/<int:seq>/', InterviewChunkMediaAPI.as_view(), name='interview_chunk_media'),
+    path('metrics/', InterviewMetricsAPI.as_view(), name='interview_metrics'),
     path('report/<int:applicant_response_id>/',InterviewReport.as_view(),name='interview-report')
 ]
\ No newline at end of file
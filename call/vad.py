@@ -0,0 +1,171 @@
+# call/vad.py
+"""
+Energy / zero-crossing voice-activity detection on 16-bit mono PCM.
+
+Interview chunks contain long pauses (thinking time, reading the question).
+Silent spans longer than MIN_SILENCE_MS are shortened to MIN_SILENCE_MS before
+the audio is sent to speech-to-text, and chunks without any speech are not
+sent at all. Long recordings are split at pauses into bounded segments that
+can be transcribed in parallel. Everything is vectorized over fixed-size
+frames with NumPy.
+"""
+import numpy as np
+
+
+DEFAULT_OPTIONS = {
+    "FRAME_MS": 30,  # Analysis frame length
+    "ENERGY_MARGIN_DB": 12.0,  # Speech must be this much louder than the noise floor
+    "MIN_ENERGY_DBFS": -50.0,  # Frames quieter than this are always silence
+    "ZCR_THRESHOLD": 0.25,  # Zero-crossing rate of unvoiced speech (fricatives) in slightly quieter frames
+    "PADDING_MS": 200,  # Speech is extended by this much on both sides so word edges are kept
+    "MIN_SILENCE_MS": 400,  # Pauses are shortened to this length
+}
+
+
+def _frames(samples, frame_length):
+    count = len(samples) // frame_length
+    return samples[:count * frame_length].reshape(count, frame_length)
+
+
+def speech_mask(samples, sample_rate, **options):
+    """
+    Classifies fixed-size frames of `samples` as speech or silence.
+
+    A frame is speech when its energy is ENERGY_MARGIN_DB above the noise floor
+    (the 10th percentile of frame energies), or when it is within 6 dB of that
+    and has a high zero-crossing rate. A chunk whose frame energies spread less
+    than ENERGY_MARGIN_DB has no quiet frames to estimate the floor from (e.g.
+    continuous speech over steady background noise); there, every frame above
+    MIN_ENERGY_DBFS counts. The mask is then dilated by PADDING_MS.
+
+    Args:
+        samples: 1-D int16 NumPy array
+        sample_rate: Samples per second
+        **options: Overrides of DEFAULT_OPTIONS
+
+    Returns:
+        Tuple of (boolean NumPy array with one entry per frame, frame length in samples)
+    """
+    options = {**DEFAULT_OPTIONS, **options}
+    frame_length = max(1, int(sample_rate * options["FRAME_MS"] / 1000))
+    frames = _frames(samples.astype(np.float32) / 32768.0, frame_length)
+    if not len(frames):
+        return np.zeros(0, dtype=bool), frame_length
+
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    energy_db = 20 * np.log10(np.maximum(rms, 1e-10))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+
+    noise_floor, loud = np.percentile(energy_db, [10, 90])
+    if loud - noise_floor < options["ENERGY_MARGIN_DB"]:
+        threshold = options["MIN_ENERGY_DBFS"]  # Uniform level: only the absolute gate applies
+    else:
+        threshold = max(noise_floor + options["ENERGY_MARGIN_DB"], options["MIN_ENERGY_DBFS"])
+    mask = (energy_db >= threshold) | (
+        (energy_db >= threshold - 6.0)
+        & (energy_db >= options["MIN_ENERGY_DBFS"])
+        & (zcr >= options["ZCR_THRESHOLD"])
+    )
+
+    padding = int(options["PADDING_MS"] / options["FRAME_MS"])
+    if padding and mask.any():
+        # Dilate: a frame is kept when any frame within `padding` of it is speech
+        kernel = np.ones(2 * padding + 1, dtype=np.int32)
+        mask = np.convolve(mask.astype(np.int32), kernel, mode="same") > 0
+    return mask, frame_length
+
+
+def _keep_mask(mask, options):
+    # Keep speech frames plus the first MIN_SILENCE_MS of every pause; leading silence is dropped
+    max_silent_frames = int(options["MIN_SILENCE_MS"] / options["FRAME_MS"])
+    run_start = np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+    keep = mask | (np.arange(len(mask)) - run_start <= max_silent_frames)
+    keep[run_start < 0] = False
+    return keep
+
+
+def _apply_keep(samples, keep, frame_length):
+    frame_keep = np.repeat(keep, frame_length)[:len(samples)]
+    # The incomplete last frame follows the decision of the frame before it
+    tail = np.full(len(samples) - len(frame_keep), keep[-1] if len(keep) else False, dtype=bool)
+    return samples[np.concatenate([frame_keep, tail])]
+
+
+def _stats(duration, kept, mask):
+    return {
+        "duration": round(duration, 3),
+        "kept_duration": round(kept, 3),
+        "speech_ratio": round(float(mask.mean()), 3) if len(mask) else 0.0,
+        "trimmed_ratio": round(1 - kept / duration, 3) if duration else 0.0,
+    }
+
+
+def trim_silence(samples, sample_rate, **options):
+    """
+    Shortens pauses longer than MIN_SILENCE_MS to MIN_SILENCE_MS.
+
+    Args:
+        samples: 1-D int16 NumPy array
+        sample_rate: Samples per second
+        **options: Overrides of DEFAULT_OPTIONS
+
+    Returns:
+        Tuple of (trimmed int16 samples, stats dict with duration, kept duration,
+        speech ratio and trimmed ratio). The trimmed samples are empty when the
+        chunk contains no speech.
+    """
+    options = {**DEFAULT_OPTIONS, **options}
+    mask, frame_length = speech_mask(samples, sample_rate, **options)
+    trimmed = _apply_keep(samples, _keep_mask(mask, options), frame_length) if mask.any() else samples[:0]
+    return trimmed, _stats(len(samples) / sample_rate, len(trimmed) / sample_rate, mask)
+
+
+def split_on_silence(samples, sample_rate, max_segment_seconds, **options):
+    """
+    Splits a recording into segments of at most `max_segment_seconds` that end
+    in pauses, and trims the pauses inside each segment like trim_silence.
+    A segment is cut in the middle of the last pause before the limit, or at
+    the limit itself when the speaker never pauses.
+
+    Args:
+        samples: 1-D int16 NumPy array
+        sample_rate: Samples per second
+        max_segment_seconds: Upper bound of a segment's length in the recording
+        **options: Overrides of DEFAULT_OPTIONS
+
+    Returns:
+        Tuple of (list of (start seconds, end seconds, trimmed int16 samples) in
+        order, stats dict as returned by trim_silence). Segments without speech
+        are left out.
+    """
+    options = {**DEFAULT_OPTIONS, **options}
+    mask, frame_length = speech_mask(samples, sample_rate, **options)
+    keep = _keep_mask(mask, options)
+    max_frames = max(1, int(max_segment_seconds * sample_rate / frame_length))
+    frame_count = len(mask)
+    speech_frames = np.flatnonzero(mask)
+
+    segments = []
+    kept = 0
+    position = speech_frames[0] if len(speech_frames) else frame_count
+    while position < frame_count:
+        limit = min(position + max_frames, frame_count)
+        cut = limit
+        if limit < frame_count:
+            silent = np.flatnonzero(~mask[position + 1:limit]) + position + 1
+            if len(silent):
+                # Middle of the last pause inside the window
+                breaks = np.flatnonzero(np.diff(silent) != 1)
+                pause_start = silent[breaks[-1] + 1] if len(breaks) else silent[0]
+                cut = (pause_start + silent[-1]) // 2 + 1
+        start_sample = position * frame_length
+        end_sample = len(samples) if cut >= frame_count else cut * frame_length
+        segment = _apply_keep(samples[start_sample:end_sample], keep[position:cut], frame_length)
+        if len(segment) and mask[position:cut].any():
+            segments.append((float(start_sample / sample_rate), float(end_sample / sample_rate), segment))
+            kept += len(segment)
+        following = speech_frames[speech_frames >= cut]
+        position = following[0] if len(following) else frame_count
+
+    return segments, _stats(len(samples) / sample_rate, kept / sample_rate, mask)
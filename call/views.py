@@ -1,25 +1,71 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Interview, EvaluationResult
-from .serializers import InterviewSerializer, EvaluationResultSerializer
+from .models import Interview, InterviewChunk, EvaluationResult, ProcessingJob, ResumableUpload
+from .serializers import InterviewSerializer, EvaluationResultSerializer, ProcessingJobSerializer
 from rest_framework import status
-import tempfile
 import os
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.text import get_valid_filename
 from rest_framework import permissions
-from .serializers import InterviewSerializer
-import time
 from Job_opening.models import JobOpening, ApplicantResponse
-from Job_opening.serializers import JobDescriptionSerializer
-from django.core.exceptions import ObjectDoesNotExist
-from .services import(
-    extract_audio_and_process,
-    speech_to_text,
-    calculate_candidate_score,
-)
-from .final_report_gen import(
-    generate_final_report,
-)
+from .blobstore import ingest
+from .cache import get_result_cache
+from .consumers import connection_metrics
+from .media import media_response
+from .scheduler import get_scheduler
+from .tasks import analyze_non_verbal, process_interview_chunk, queue_recording_join
+from .uploadhandlers import InterviewChunkUploadHandler, append_upload_data, chunk_upload_path, file_sha256
+
+
+def parse_bool(value):
+    """Interpret form-encoded booleans such as "true", "1" or "false"."""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "1", "yes", "on")
+
+def queue_chunk_processing(interview, question, question_index, path, size, checksum, final_flag):
+    """
+    Registers a fully uploaded chunk and queues its processing once the transaction commits.
+    The file is added to the blob store first, so a re-sent recording shares the stored copy.
+    
+    Returns:
+        The ProcessingJob tracking the chunk
+    """
+    path, _ = ingest(path, checksum)
+
+    # Register the chunk with a single insert; its sequence number follows upload order
+    chunk = InterviewChunk.register(interview, path=path, size=size, checksum=checksum, question=question)
+
+    # Transcription, scoring and report generation run on the Celery worker
+    job = ProcessingJob.objects.create(
+        interview=interview,
+        chunk=chunk,
+        question=question,
+        question_index=question_index,
+        video_path=path,
+        checksum=checksum,
+        final_flag=final_flag,
+    )
+    transaction.on_commit(lambda: process_interview_chunk.delay(str(job.id)))
+    if settings.INTERVIEW_NON_VERBAL["ENABLED"]:
+        transaction.on_commit(lambda: analyze_non_verbal.delay(str(job.id)))
+    if final_flag:
+        # The last chunk is in; join the recording for playback
+        queue_recording_join(interview.id)
+    return job
+
+
+def processing_accepted_response(request, job):
+    return Response({
+        "message": "Video queued for processing",
+        "job_id": str(job.id),
+        "status_url": request.build_absolute_uri(reverse('interview_process_status', kwargs={'job_id': job.id})),
+    }, status=status.HTTP_202_ACCEPTED)
 
 class StartInterview(APIView):
     
@@ -50,7 +96,7 @@ class InterviewProcessingAPI(APIView):
           - audio_data: Base64 encoded audio data
           
         Returns:
-          - Processed QA pairs extracted from the interview
+          - 202 with the id of the processing job and a URL to poll its status
         """
         
         interview_id = request.query_params.get('interview_id')
@@ -63,101 +109,35 @@ class InterviewProcessingAPI(APIView):
         except Interview.DoesNotExist:
             return Response({"error": "Interview not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        # Stream the upload straight into the interview's storage directory,
+        # hashing it on the way, instead of spooling it to a temporary file first
+        upload_dir = os.path.join(settings.MEDIA_ROOT, 'interview', str(interview_id))
+        request.upload_handlers.insert(0, InterviewChunkUploadHandler(upload_dir, request=request._request))
+
         if 'video_file' not in request.FILES:
             return Response({"error": "video_file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        uploaded_video = request.FILES['video_file']
+        video_path = uploaded_video.path
         question = request.data.get('question',None)
         if not question:
+            os.remove(video_path)
             return Response({"error":"Question is required"}, status=status.HTTP_400_BAD_REQUEST)
         applicant_response = interview.applicant_job_pipeline_id  # This gets the ApplicantResponse object
         job_opening = applicant_response.jobId
         if question not in job_opening.questions:
+            os.remove(video_path)
             return Response({"error":"Question doesn't exist"}, status=status.HTTP_400_BAD_REQUEST)
-        job_description = JobDescriptionSerializer(job_opening).data
-        video_file = request.FILES['video_file']
-        
-        # Define storage directory
-        upload_dir = os.path.join(settings.MEDIA_ROOT, 'interview', str(interview_id))
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Generate unique filename for the video chunk
-        timestamp = int(time.time() * 1000)  # Milliseconds for uniqueness
-        video_filename = f"video_chunk_{timestamp}_{video_file.name}"
-        video_path = os.path.join(upload_dir, video_filename)
-        
-        # Save the video file
-        with open(video_path, 'wb+') as f:
-            for chunk in video_file.chunks():
-                f.write(chunk)
-        video_file = interview.video_file
-        video_file.append(video_path)
-        videos = {
-            'video_file': video_file
-        }
-        # Update Interview model’s video_file JSON field
-        interview_serializer = InterviewSerializer(interview,data=videos, partial=True)
-        if interview_serializer.is_valid():
-            interview_serializer.save()
-        else:
-            print(interview_serializer.errors)
-            return Response({"error": "Failed to update the video list"}, status=status.HTTP_400_BAD_REQUEST)
-        try:    
-                if 'video_file' in request.FILES:
-                    # Handle video processing
-                    video_file = request.FILES['video_file']
-                    
-                    # Save the uploaded video to a temporary file
-                    temp_video_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-                    for chunk in video_file.chunks():
-                        temp_video_file.write(chunk)
-                    temp_video_file.close()
-                    
-                    try:
-                        # Process the video file
-                        audio_text = extract_audio_and_process(temp_video_file.name)
-                        score = calculate_candidate_score(job_description, question, audio_text)
-                        try:
-                            evaluation_result = EvaluationResult.objects.get(interview=interview)
-                        except ObjectDoesNotExist:
-                            # If it does not exist, create a new instance
-                            evaluation_result = EvaluationResult.objects.create(interview=interview, verbal_scores={}, non_verbal_scores={}, final_report="")
-                        finally:
-                            existing_scores = evaluation_result.verbal_scores
-                            existing_scores[question] = score.get("evaluation",0)
-                            evaluation_result.verbal_scores = existing_scores
-                            evaluation_result.save()
-                        print("Final flag: ",request.data.get('final_flag'))
-                        if request.data.get('final_flag', False):
-                            try:
-                                evaluation_result = EvaluationResult.objects.get(interview=interview)
-                                final_report = generate_final_report(evaluation_result,job_description)
-                                evaluation_result.final_report = final_report
-                                evaluation_result.save()
-                            except ObjectDoesNotExist:
-                                return Response({"error":"Cannot generate report on empty records"}, status=status.HTTP_400_BAD_REQUEST)
-                            except Exception as e:
-                                print(f"An error occurred while generating the final report: {e}")
-                        # Return the extracted QA pairs
-                        return Response({"message":"Video processed successfully"
-                            }, status=status.HTTP_200_OK)
-                    finally:
-                        # Clean up the temporary file
-                        if os.path.exists(temp_video_file.name):
-                            os.remove(temp_video_file.name)
-                            print(f"Removed temporary video file: {temp_video_file.name}")
-                
-                else:
-                    return Response({
-                        'error': 'No audio_data or video_file provided',
-                        'required_params': ['audio_data OR video_file']
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                    
-        except Exception as e:
-            import traceback
-            traceback_str = traceback.format_exc()
-            return Response({
-                'error': str(e),
-                'traceback': traceback_str
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        job = queue_chunk_processing(
+            interview,
+            question=question,
+            question_index=job_opening.questions.index(question),
+            path=video_path,
+            size=uploaded_video.size,
+            checksum=uploaded_video.checksum,
+            final_flag=parse_bool(request.data.get('final_flag', False)),
+        )
+        return processing_accepted_response(request, job)
 
 
     # def process_audio(self, audio_data):
@@ -197,16 +177,284 @@ class InterviewProcessingAPI(APIView):
     #             os.remove(temp_audio_path)
     #             print(f"Deleted temporary audio file: {temp_audio_path}")
 
+class InterviewProcessingStatusAPI(APIView):
+    """
+    API view for polling the state of a queued interview chunk.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, job_id):
+        try:
+            job = ProcessingJob.objects.get(id=job_id)
+        except ProcessingJob.DoesNotExist:
+            return Response({"error": "Processing job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ProcessingJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+TUS_HEADERS = {"Tus-Resumable": "1.0.0"}
+
+
+def _upload_url(request, upload):
+    return request.build_absolute_uri(reverse('interview_upload', kwargs={'upload_id': upload.id}))
+
+
+class ResumableUploadCreateAPI(APIView):
+    """
+    Starts a resumable (tus-style) upload of an interview chunk.
+
+    Accepts:
+      - interview_id: Query parameter
+      - Upload-Length: Header (or `length` field) with the total size in bytes
+      - question, final_flag, filename: Form or JSON fields
+
+    Returns:
+      - 201 with the upload URL in the Location header. Send the file with
+        PATCH requests to that URL, then POST to its finalize/ URL.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        interview_id = request.query_params.get('interview_id')
+        if not interview_id:
+            return Response({"error": "interview_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            interview = Interview.objects.select_related('applicant_job_pipeline_id__jobId').get(id=interview_id)
+        except (Interview.DoesNotExist, ValueError):
+            return Response({"error": "Interview not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            length = int(request.headers.get('Upload-Length') or request.data.get('length'))
+        except (TypeError, ValueError):
+            return Response({"error": "Upload-Length is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0 or length > settings.INTERVIEW_UPLOAD_MAX_SIZE:
+            return Response({"error": f"Upload-Length must be between 1 and {settings.INTERVIEW_UPLOAD_MAX_SIZE} bytes"},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        question = request.data.get('question', None)
+        if not question:
+            return Response({"error": "Question is required"}, status=status.HTTP_400_BAD_REQUEST)
+        questions = interview.applicant_job_pipeline_id.jobId.questions
+        if question not in questions:
+            return Response({"error": "Question doesn't exist"}, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = get_valid_filename(os.path.basename(request.data.get('filename') or 'recording.webm'))
+        path = chunk_upload_path(os.path.join(settings.MEDIA_ROOT, 'interview', str(interview.id)), filename)
+        open(path, 'wb').close()
+
+        upload = ResumableUpload.objects.create(
+            interview=interview,
+            question=question,
+            question_index=questions.index(question),
+            final_flag=parse_bool(request.data.get('final_flag', False)),
+            path=path,
+            length=length,
+        )
+        url = _upload_url(request, upload)
+        return Response(
+            {"upload_id": str(upload.id), "upload_url": url, "offset": 0, "length": length},
+            status=status.HTTP_201_CREATED,
+            headers={"Location": url, "Upload-Offset": "0", **TUS_HEADERS},
+        )
+
+
+class ResumableUploadAPI(APIView):
+    """
+    HEAD returns the number of bytes received so far in Upload-Offset.
+    PATCH appends the request body (Content-Type: application/offset+octet-stream)
+    at the Upload-Offset given by the client, which must match the server's offset.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def head(self, request, upload_id):
+        try:
+            upload = ResumableUpload.objects.get(id=upload_id)
+        except ResumableUpload.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND, headers=TUS_HEADERS)
+        return Response(status=status.HTTP_200_OK, headers={
+            "Upload-Offset": str(upload.offset),
+            "Upload-Length": str(upload.length),
+            "Cache-Control": "no-store",
+            **TUS_HEADERS,
+        })
+
+    def patch(self, request, upload_id):
+        if request.content_type != 'application/offset+octet-stream':
+            return Response({"error": "Content-Type must be application/offset+octet-stream"},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, headers=TUS_HEADERS)
+        try:
+            client_offset = int(request.headers['Upload-Offset'])
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response({"error": "Upload-Offset is required"}, status=status.HTTP_400_BAD_REQUEST, headers=TUS_HEADERS)
+        if content_length > settings.INTERVIEW_UPLOAD_MAX_CHUNK_SIZE:
+            return Response({"error": f"Send at most {settings.INTERVIEW_UPLOAD_MAX_CHUNK_SIZE} bytes per request"},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, headers=TUS_HEADERS)
+
+        # The row lock serializes concurrent PATCH requests for the same upload
+        with transaction.atomic():
+            try:
+                upload = ResumableUpload.objects.select_for_update().get(id=upload_id)
+            except ResumableUpload.DoesNotExist:
+                return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND, headers=TUS_HEADERS)
+            if upload.processing_job_id:
+                return Response({"error": "Upload is already finalized"}, status=status.HTTP_409_CONFLICT, headers=TUS_HEADERS)
+            if client_offset != upload.offset:
+                return Response({"error": "Upload-Offset does not match the received bytes"}, status=status.HTTP_409_CONFLICT,
+                                headers={"Upload-Offset": str(upload.offset), **TUS_HEADERS})
+            if upload.offset + content_length > upload.length:
+                return Response({"error": "Request body exceeds the declared Upload-Length"},
+                                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, headers=TUS_HEADERS)
+
+            upload.offset += append_upload_data(upload.path, upload.offset, request.stream, content_length)
+            upload.save(update_fields=['offset', 'updated_at'])
+
+        return Response(status=status.HTTP_204_NO_CONTENT, headers={"Upload-Offset": str(upload.offset), **TUS_HEADERS})
+
+
+class ResumableUploadFinalizeAPI(APIView):
+    """
+    Completes a resumable upload and queues the chunk for processing.
+    Finalizing twice returns the same processing job.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, upload_id):
+        with transaction.atomic():
+            try:
+                upload = ResumableUpload.objects.select_for_update().select_related('processing_job').get(id=upload_id)
+            except ResumableUpload.DoesNotExist:
+                return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+            if upload.processing_job:
+                return processing_accepted_response(request, upload.processing_job)
+            if upload.offset != upload.length:
+                return Response({"error": f"Upload is incomplete ({upload.offset} of {upload.length} bytes received)"},
+                                status=status.HTTP_409_CONFLICT, headers={"Upload-Offset": str(upload.offset)})
+
+            upload.processing_job = queue_chunk_processing(
+                upload.interview,
+                question=upload.question,
+                question_index=upload.question_index,
+                path=upload.path,
+                size=upload.length,
+                checksum=file_sha256(upload.path),
+                final_flag=upload.final_flag,
+            )
+            upload.path = upload.processing_job.video_path
+            upload.save(update_fields=['processing_job', 'path', 'updated_at'])
+        return processing_accepted_response(request, upload.processing_job)
+
+
+def recruiter_interview(request, interview_id):
+    """Returns the interview if it belongs to a job opening of the requesting company, else None."""
+    return Interview.objects.filter(
+        id=interview_id,
+        applicant_job_pipeline_id__jobId__company__user=request.user,
+    ).first()
+
+
+class InterviewRecordingAPI(APIView):
+    """
+    Streams the whole interview (all chunks joined) with HTTP Range support.
+
+    Returns:
+      - 200/206 with the recording
+      - 409 while the recording is still being joined, with the chunk URLs to play meanwhile
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, interview_id):
+        interview = recruiter_interview(request, interview_id)
+        if not interview:
+            return Response({"error": "Interview not found"}, status=status.HTTP_404_NOT_FOUND)
+        if interview.recording_ready and os.path.exists(interview.recording_path):
+            return media_response(request, interview.recording_path)
+
+        chunks = list(interview.chunks.order_by('seq').values_list('seq', flat=True))
+        if not chunks:
+            return Response({"error": "No recording uploaded"}, status=status.HTTP_404_NOT_FOUND)
+        queue_recording_join(interview.id)
+        return Response({
+            "error": "Recording is being prepared",
+            "chunks": [
+                request.build_absolute_uri(reverse('interview_chunk_media', kwargs={'interview_id': interview.id, 'seq': seq}))
+                for seq in chunks
+            ],
+        }, status=status.HTTP_409_CONFLICT)
+
+
+class InterviewChunkMediaAPI(APIView):
+    """Streams one uploaded chunk of an interview with HTTP Range support."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, interview_id, seq):
+        interview = recruiter_interview(request, interview_id)
+        chunk = interview and interview.chunks.filter(seq=seq).first()
+        if not chunk or not os.path.exists(chunk.path):
+            return Response({"error": "Chunk not found"}, status=status.HTTP_404_NOT_FOUND)
+        return media_response(request, chunk.path)
+
+
+class InterviewMetricsAPI(APIView):
+    """
+    Staff-only snapshot of this process: queue depth and lag of every open
+    interview websocket, the inference scheduler's counters and the hit/miss
+    counters of every result cache.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "connections": connection_metrics(),
+            "inference": get_scheduler().metrics(),
+            "caches": {namespace: get_result_cache(namespace).stats() for namespace in settings.INFERENCE_CACHES},
+        }, status=status.HTTP_200_OK)
+
+
 class InterviewReport(APIView):
+    """
+    Evaluation report of a candidate's interview.
+
+    The serialized report is cached per version (EvaluationResult.updated_at)
+    and sent with an ETag and Last-Modified, so a dashboard refresh costs one
+    query and, when the browser revalidates, an empty 304.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, applicant_response_id):
         if not applicant_response_id:
             return Response({"error":"Job ID is required"}, status=status.HTTP_400_BAD_REQUEST)
-        candidate = ApplicantResponse.objects.filter(id=applicant_response_id).first()
+        # The candidate, its first interview's report and the report version in one query, limited to the recruiter's company
+        candidate = (
+            ApplicantResponse.objects
+            .filter(id=applicant_response_id, jobId__company__user=request.user)
+            .order_by("interview__id")
+            .values(report_id=F("interview__evaluationresult__id"), updated_at=F("interview__evaluationresult__updated_at"))
+            .first()
+        )
         if not candidate:
             return Response({"error":"Candidate application doesn't exist"}, status=status.HTTP_400_BAD_REQUEST)
-        interview = Interview.objects.filter(applicant_job_pipeline_id=applicant_response_id).first()
-        report = EvaluationResult.objects.filter(interview=interview).first()
-        return Response({"data":EvaluationResultSerializer(report).data},status=status.HTTP_200_OK)
+        report_id, updated_at = candidate["report_id"], candidate["updated_at"]
+        if report_id is None:
+            return Response({"data":EvaluationResultSerializer(None).data},status=status.HTTP_200_OK)
+
+        validators = {
+            "ETag": quote_etag(f"{report_id}-{updated_at.timestamp():.6f}"),
+            "Last-Modified": http_date(updated_at.timestamp()),
+            "Cache-Control": "private, no-cache",  # Revalidate on every view
+        }
+        response = get_conditional_response(
+            request, etag=validators["ETag"], last_modified=int(updated_at.timestamp())
+        )
+        if response is None:
+            report_cache = get_result_cache("reports")
+            cache_key = f"{report_id}:{updated_at.isoformat()}"
+            cache_tag = f"evaluation:{report_id}"
+            data = report_cache.get(cache_key, tag=cache_tag)
+            if data is None:
+                data = dict(EvaluationResultSerializer(EvaluationResult.objects.filter(id=report_id).first()).data)
+                report_cache.set(cache_key, data, tag=cache_tag)
+            response = Response({"data":data},status=status.HTTP_200_OK)
+        for header, value in validators.items():
+            response[header] = value
+        return response
         
\ No newline at end of file
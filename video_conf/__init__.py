@@ -1,4 +1,4 @@
-# # video_conf/__init__.py
-# from .celery import app as celery_app
+# video_conf/__init__.py
+from .celery import app as celery_app
 
-# __all__ = ('celery_app',)
\ No newline at end of file
+__all__ = ('celery_app',)
@@ -42,8 +42,8 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    # 'daphne',
-    # 'channels',
+    'daphne',  # ASGI runserver; must come before django.contrib.staticfiles
+    'channels',
     'django.contrib.staticfiles',
     'rest_framework',
     'django_crontab',
@@ -53,13 +53,18 @@ INSTALLED_APPS = [
     'corsheaders',
     ]
 
-# # Celery Configuration
-# CELERY_BROKER_URL = 'redis://localhost:6379/0'  # Redis as the broker
-# CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'  # Store task results (optional)
-# CELERY_ACCEPT_CONTENT = ['json']  # Task serialization
-# CELERY_TASK_SERIALIZER = 'json'
-# CELERY_RESULT_SERIALIZER = 'json'
-# CELERY_TIMEZONE = 'UTC'
+# Celery Configuration
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')  # Redis as the broker
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')  # Store task results (optional)
+CELERY_ACCEPT_CONTENT = ['json']  # Task serialization
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = 'UTC'
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)  # Run tasks inline (local development without a worker)
+CELERY_TASK_ROUTES = {
+    # CPU bound video analysis can be given its own workers, e.g. `celery -A video_conf worker -Q video`
+    'call.tasks.analyze_non_verbal': {'queue': config('CELERY_NON_VERBAL_QUEUE', default='celery')},
+}
 
 
 MIDDLEWARE = [
@@ -77,6 +82,7 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_METHODS = [
     "DELETE",
     "GET",
+    "HEAD",
     "OPTIONS",
     "PATCH",
     "POST",
@@ -90,6 +96,21 @@ CORS_ALLOW_HEADERS = [
     "origin",
     "x-csrftoken",
     "x-requested-with",
+    "upload-length",  # Resumable interview uploads
+    "upload-offset",
+    "tus-resumable",
+    "range",  # Recording playback
+    "if-range",
+]
+
+CORS_EXPOSE_HEADERS = [
+    "location",
+    "upload-offset",
+    "upload-length",
+    "tus-resumable",
+    "accept-ranges",
+    "content-range",
+    "content-length",
 ]
 
 ROOT_URLCONF = 'video_conf.urls'
@@ -122,13 +143,26 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'video_conf.wsgi.application'
 
-# ASGI_APPLICATION = 'video_conf.asgi.application'
+ASGI_APPLICATION = 'video_conf.asgi.application'
 
-# CHANNEL_LAYERS = {
-#     'default': {
-#         'BACKEND': 'channels.layers.InMemoryChannelLayer',
-#     },
-# }
+# Channel layer of the websocket consumers: Redis when deployed, 'memory://' for tests and single-process development
+CHANNEL_LAYER_URL = config('CHANNEL_LAYER_URL', default='redis://localhost:6379/1')
+if CHANNEL_LAYER_URL.startswith('memory://'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [CHANNEL_LAYER_URL],
+                'capacity': config('CHANNEL_LAYER_CAPACITY', default=100, cast=int),  # Messages buffered per channel
+            },
+        },
+    }
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -139,16 +173,6 @@ WSGI_APPLICATION = 'video_conf.wsgi.application'
 #     }
 # }
 
-
-# CHANNEL_LAYERS = {
-#     "default": {
-#         "BACKEND": "channels_redis.core.RedisChannelLayer",
-#         "CONFIG": {
-#             "hosts": [("127.0.0.1", 6379)],
-#         },
-#     },
-# }
-
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -201,6 +225,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "blobs": {"BACKEND": "call.blobstore.BlobStorage"},  # Deduplicated uploads (CVs), see call/blobstore.py
+}
+
 # Database
 DATABASES = {
     'default': {
@@ -222,4 +252,113 @@ EMAIL_APP_PASSWORD = config('GMAIL_APP_PASS', default = '')
 
 
 OPEN_AI_KEY = config('OPEN_AI_KEY', default = '')
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='')  # Point at a local stub server, e.g. http://localhost:8080/v1
+OPENAI_TIMEOUT = config('OPENAI_TIMEOUT', default=60.0, cast=float)  # Seconds per request
+OPENAI_CONNECT_TIMEOUT = config('OPENAI_CONNECT_TIMEOUT', default=5.0, cast=float)
+OPENAI_MAX_RETRIES = config('OPENAI_MAX_RETRIES', default=2, cast=int)
+OPENAI_MAX_CONNECTIONS = config('OPENAI_MAX_CONNECTIONS', default=20, cast=int)  # Shared connection pool size per process
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = config('OPENAI_MAX_KEEPALIVE_CONNECTIONS', default=10, cast=int)
+OPENAI_KEEPALIVE_EXPIRY = config('OPENAI_KEEPALIVE_EXPIRY', default=30.0, cast=float)  # Seconds an idle connection is kept open
+
+# Concurrency and rate budget for LLM calls, per process (see call/scheduler.py); 0 disables a limit
+INFERENCE_SCHEDULER = {
+    'REQUESTS_PER_MINUTE': config('INFERENCE_REQUESTS_PER_MINUTE', default=500, cast=int),
+    'TOKENS_PER_MINUTE': config('INFERENCE_TOKENS_PER_MINUTE', default=40000, cast=int),
+    'MAX_CONCURRENCY': config('INFERENCE_MAX_CONCURRENCY', default=8, cast=int),
+}
+
+# Speech-to-text/LLM backend (see call/backends.py). Use 'call.backends.StubBackend' for offline load tests
+INFERENCE_BACKEND = {
+    'BACKEND': config('INFERENCE_BACKEND', default='call.backends.OpenAIBackend'),
+    'OPTIONS': {
+        # Only used by the stub backend
+        'SEED': config('INFERENCE_STUB_SEED', default=0, cast=int),
+        'ERROR_RATE': config('INFERENCE_STUB_ERROR_RATE', default=0.0, cast=float),  # 0-1
+        'TRANSCRIBE_LATENCY': {
+            'DISTRIBUTION': 'lognormal',
+            'MEDIAN': config('INFERENCE_STUB_TRANSCRIBE_LATENCY', default=1.5, cast=float),  # seconds
+            'SIGMA': 0.4,
+        },
+        'COMPLETE_LATENCY': {
+            'DISTRIBUTION': 'lognormal',
+            'MEDIAN': config('INFERENCE_STUB_COMPLETE_LATENCY', default=0.8, cast=float),  # seconds
+            'SIGMA': 0.4,
+        },
+    },
+}
+
+# Caches for inference results keyed by content hash (see call/cache.py)
+INFERENCE_CACHES = {
+    'transcripts': {
+        'BACKEND': config('TRANSCRIPT_CACHE_BACKEND', default='call.cache.DatabaseCacheBackend'),  # or call.cache.DjangoCacheBackend
+        'TIMEOUT': config('TRANSCRIPT_CACHE_TIMEOUT', default=60 * 60 * 24 * 30, cast=int),  # Seconds
+        'MAX_ENTRIES': config('TRANSCRIPT_CACHE_MAX_ENTRIES', default=10000, cast=int),  # Least recently used entries are evicted
+    },
+    'scores': {
+        'BACKEND': config('SCORE_CACHE_BACKEND', default='call.cache.DatabaseCacheBackend'),
+        'TIMEOUT': config('SCORE_CACHE_TIMEOUT', default=60 * 60 * 24 * 30, cast=int),
+        'MAX_ENTRIES': config('SCORE_CACHE_MAX_ENTRIES', default=50000, cast=int),
+    },
+    'non_verbal': {
+        'BACKEND': config('NON_VERBAL_CACHE_BACKEND', default='call.cache.DatabaseCacheBackend'),
+        'TIMEOUT': config('NON_VERBAL_CACHE_TIMEOUT', default=60 * 60 * 24 * 30, cast=int),
+        'MAX_ENTRIES': config('NON_VERBAL_CACHE_MAX_ENTRIES', default=10000, cast=int),  # Keyed by the recording's content hash
+    },
+    'reports': {
+        'BACKEND': config('REPORT_CACHE_BACKEND', default='call.cache.DjangoCacheBackend'),  # Serialized InterviewReport payloads; a database cache would cost the query it saves
+        'TIMEOUT': config('REPORT_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int),
+    },
+}
+
+# Resumable interview uploads (see ResumableUploadCreateAPI)
+INTERVIEW_UPLOAD_MAX_SIZE = config('INTERVIEW_UPLOAD_MAX_SIZE', default=2 * 1024 ** 3, cast=int)  # Bytes per recording
+INTERVIEW_UPLOAD_MAX_CHUNK_SIZE = config('INTERVIEW_UPLOAD_MAX_CHUNK_SIZE', default=16 * 1024 ** 2, cast=int)  # Bytes per PATCH request
+
+# Recruiter playback of interview recordings (see call/media.py)
+INTERVIEW_MEDIA_SENDFILE = config('INTERVIEW_MEDIA_SENDFILE', default='')  # '', 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd)
+INTERVIEW_MEDIA_ACCEL_PREFIX = config('INTERVIEW_MEDIA_ACCEL_PREFIX', default='/protected-media/')  # nginx internal location aliased to MEDIA_ROOT
+
+# Audio sent to speech-to-text is piped from ffmpeg in memory (see call/audio.py)
+INTERVIEW_STT_AUDIO_FORMAT = config('INTERVIEW_STT_AUDIO_FORMAT', default='opus')  # 'opus', 'flac' or 'wav' (16 kHz mono)
+# Voice-activity detection before speech-to-text: long pauses are shortened, silent chunks are not sent (see call/vad.py)
+INTERVIEW_VAD = {
+    'ENABLED': config('INTERVIEW_VAD_ENABLED', default=True, cast=bool),
+    'OPTIONS': {
+        'ENERGY_MARGIN_DB': config('INTERVIEW_VAD_ENERGY_MARGIN_DB', default=12.0, cast=float),  # Speech level above the noise floor
+        'MIN_SILENCE_MS': config('INTERVIEW_VAD_MIN_SILENCE_MS', default=400, cast=int),  # Pauses are shortened to this length
+        'PADDING_MS': config('INTERVIEW_VAD_PADDING_MS', default=200, cast=int),  # Audio kept around detected speech
+    },
+}
+# Long recordings are split at pauses and the segments transcribed concurrently (see call/transcription.py)
+INTERVIEW_SEGMENTATION = {
+    'MAX_SEGMENT_SECONDS': config('INTERVIEW_MAX_SEGMENT_SECONDS', default=120.0, cast=float),  # Keeps uploads well below the STT file size limit
+    'WORKERS': config('INTERVIEW_TRANSCRIPTION_WORKERS', default=4, cast=int),  # Segments of one recording in flight at once
+}
+
+# Live interview transcription over the websocket consumer
+INTERVIEW_INCREMENTAL_TRANSCRIPTION = config('INTERVIEW_INCREMENTAL_TRANSCRIPTION', default=True, cast=bool)  # Only transcribe newly received audio
+INTERVIEW_MIN_SEGMENT_SECONDS = config('INTERVIEW_MIN_SEGMENT_SECONDS', default=2.0, cast=float)  # Wait for at least this much new audio
+INTERVIEW_QA_WINDOW_SEGMENTS = config('INTERVIEW_QA_WINDOW_SEGMENTS', default=6, cast=int)  # Transcript segments sent to QA extraction
+INTERVIEW_WS_QUEUE_SIZE = config('INTERVIEW_WS_QUEUE_SIZE', default=8, cast=int)  # Pending work items per websocket connection; more are dropped
+INTERVIEW_WS_LIVE_SCORES = config('INTERVIEW_WS_LIVE_SCORES', default=True, cast=bool)  # Score QA pairs over the websocket as soon as they are extracted
+# Binary audio frames are cut into utterances and transcribed one by one (see call/audio_stream.py)
+INTERVIEW_LIVE_AUDIO = {
+    'MAX_UTTERANCE_SECONDS': config('INTERVIEW_LIVE_MAX_UTTERANCE_SECONDS', default=15.0, cast=float),  # Size of the ring buffer
+    'END_SILENCE_MS': config('INTERVIEW_LIVE_END_SILENCE_MS', default=600, cast=int),  # Pause that ends an utterance
+    'MIN_UTTERANCE_MS': config('INTERVIEW_LIVE_MIN_UTTERANCE_MS', default=300, cast=int),  # Shorter noises are not transcribed
+}
+
+# Non-verbal video analysis of uploaded interview chunks (see call/nonverbal.py)
+INTERVIEW_NON_VERBAL = {
+    'ENABLED': config('INTERVIEW_NON_VERBAL_ENABLED', default=True, cast=bool),
+    'MAX_FPS': config('INTERVIEW_NON_VERBAL_MAX_FPS', default=1.0, cast=float),  # Upper bound of sampled keyframes per second
+    'FRAME_WIDTH': 160,  # Keyframes are downscaled to this size before analysis
+    'FRAME_HEIGHT': 120,
+    'BATCH_SIZE': 64,  # Frames analyzed per NumPy batch
+}
+
+# Answer scoring for uploaded interview chunks
+INTERVIEW_SCORING_MODE = config('INTERVIEW_SCORING_MODE', default='per_chunk')  # 'per_chunk' or 'batched' (score all answers on final_flag)
+INTERVIEW_SCORING_BATCH_SIZE = config('INTERVIEW_SCORING_BATCH_SIZE', default=0, cast=int)  # Answers per request in batched mode, 0 for all at once
+
 FRONTEND_HOST= config('FRONTEND_HOST', default="http://localhost:5173")
\ No newline at end of file